@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from accounts.stats import recompute_user_stats
+
+
+class Command(BaseCommand):
+    help = 'ユーザーの集計値（予約数・紹介成功数・獲得バッジ・未読通知数）を実データから再計算します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='バッジ更新のバッチサイズ（既定1000）')
+
+    def handle(self, *args, **options):
+        updated = recompute_user_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{updated} 件のユーザーの集計値を再計算しました'))
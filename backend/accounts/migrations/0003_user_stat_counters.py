@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:42
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_stats(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Badge = apps.get_model('accounts', 'Badge')
+    Appointment = apps.get_model('bookings', 'Appointment')
+    Referral = apps.get_model('referrals', 'Referral')
+
+    def count(queryset, field):
+        counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    User.objects.update(
+        booking_count=count(Appointment.objects.all(), 'customer'),
+        successful_referral_count=count(Referral.objects.filter(is_successful=True), 'referrer'),
+    )
+
+    summaries = {}
+    for badge in Badge.objects.order_by('user_id', 'id'):
+        summaries.setdefault(badge.user_id, []).append({'id': badge.id, 'badge_type': badge.badge_type})
+    for user_id, summary in summaries.items():
+        User.objects.filter(pk=user_id).update(badge_summary=summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_salon_user_is_manager_user_is_owner_stylistprofile'),
+        ('bookings', '0005_booking_hot_path_indexes'),
+        ('referrals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='badge_summary',
+            field=models.JSONField(blank=True, default=list, verbose_name='獲得バッジ'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='booking_count',
+            field=models.IntegerField(default=0, verbose_name='予約数'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='successful_referral_count',
+            field=models.IntegerField(default=0, verbose_name='紹介成功数'),
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
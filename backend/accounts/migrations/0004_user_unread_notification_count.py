@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_notification_count(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Notification = apps.get_model('notifications', 'Notification')
+
+    counts = Notification.objects.filter(user=OuterRef('pk'), read=False).order_by().values('user').annotate(
+        count=Count('pk')
+    ).values('count')
+    User.objects.update(unread_notification_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_stat_counters'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notification_count',
+            field=models.IntegerField(default=0, verbose_name='未読通知数'),
+        ),
+        migrations.RunPython(backfill_unread_notification_count, migrations.RunPython.noop),
+    ]
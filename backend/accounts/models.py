@@ -39,6 +39,14 @@ class User(AbstractUser):
         null=True,
         verbose_name='プロフィール画像'
     )
+    
+    # シリアライズ用の集計値（シグナルで同じトランザクション内に更新。
+    # 一括更新などでずれた場合は recompute_user_stats コマンドで再計算する）
+    booking_count = models.IntegerField(default=0, verbose_name='予約数')
+    successful_referral_count = models.IntegerField(default=0, verbose_name='紹介成功数')
+    badge_summary = models.JSONField(default=list, blank=True, verbose_name='獲得バッジ')
+    unread_notification_count = models.IntegerField(default=0, verbose_name='未読通知数')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from cier_project.serializers import SparseFieldsetsMixin
 from .models import User, Badge, Salon, StylistProfile
 
 
@@ -48,9 +49,32 @@ class UserLoginSerializer(serializers.Serializer):
             raise serializers.ValidationError('ユーザー名とパスワードの両方を入力してください。')
 
 
-class UserSerializer(serializers.ModelSerializer):
-    total_bookings = serializers.SerializerMethodField()
-    referral_count = serializers.SerializerMethodField()
+BADGE_NAMES = dict(Badge.BADGE_TYPE_CHOICES)
+
+
+def badges_for(user):
+    """獲得バッジ一覧（User.badge_summary から作成するためクエリは発行しない）"""
+    return [
+        {'id': b['id'], 'name': BADGE_NAMES.get(b['badge_type'], b['badge_type']), 'icon': '🏆'}
+        for b in user.badge_summary
+    ]
+
+
+class UserSummarySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """ネストした箇所で使うユーザーの概要表現（?expand= で詳細表現に差し替え可能）"""
+    display_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'display_name', 'profile_image']
+    
+    def get_display_name(self, obj):
+        return obj.get_full_name() or obj.username
+
+
+class UserSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    total_bookings = serializers.IntegerField(source='booking_count', read_only=True)
+    referral_count = serializers.IntegerField(source='successful_referral_count', read_only=True)
     badges = serializers.SerializerMethodField()
     can_manage_staff = serializers.SerializerMethodField()
     stylist_profile = serializers.SerializerMethodField()
@@ -66,30 +90,29 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
     
-    def get_total_bookings(self, obj):
-        # 予約数を取得
-        from bookings.models import Appointment
-        return Appointment.objects.filter(customer=obj).count()
-    
-    def get_referral_count(self, obj):
-        # 紹介数を取得
-        return obj.referrals_made.filter(is_successful=True).count()
-    
     def get_badges(self, obj):
-        # バッジを取得
-        badges = obj.badges.all()
-        return [{'id': b.id, 'name': b.get_badge_type_display(), 'icon': '🏆'} for b in badges]
+        return badges_for(obj)
     
     def get_can_manage_staff(self, obj):
         return obj.can_manage_staff()
     
     def get_stylist_profile(self, obj):
-        if hasattr(obj, 'new_stylist_profile'):
-            return StylistProfileSerializer(obj.new_stylist_profile).data
+        # スタイリスト以外はプロフィールを持たないため逆参照のクエリを発行しない
+        if obj.user_type == 'stylist' and hasattr(obj, 'new_stylist_profile'):
+            serializer = StylistProfileSerializer(obj.new_stylist_profile)
+            # ?fields= / ?expand= を stylist_profile.* として適用する
+            serializer.bind('stylist_profile', self)
+            return serializer.data
         return None
 
 
-class SalonSerializer(serializers.ModelSerializer):
+class SalonSummarySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Salon
+        fields = ['id', 'name']
+
+
+class SalonSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     stylists_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -105,9 +128,9 @@ class SalonSerializer(serializers.ModelSerializer):
         return obj.stylists.filter(is_active=True).count()
 
 
-class StylistProfileSerializer(serializers.ModelSerializer):
-    user_info = UserSerializer(source='user', read_only=True)
-    salon_info = SalonSerializer(source='salon', read_only=True)
+class StylistProfileSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    user_info = UserSummarySerializer(source='user', read_only=True)
+    salon_info = SalonSummarySerializer(source='salon', read_only=True)
     
     class Meta:
         model = StylistProfile
@@ -118,6 +141,7 @@ class StylistProfileSerializer(serializers.ModelSerializer):
             'user_info', 'salon_info', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+        expandable_fields = {'user_info': UserSerializer, 'salon_info': SalonSerializer}
 
 
 class StylistManagementSerializer(serializers.ModelSerializer):
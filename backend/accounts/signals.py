@@ -0,0 +1,34 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from bookings.models import Appointment
+from .models import Badge
+from .stats import adjust_counter, refresh_badge_summary
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_customer(sender, instance, **kwargs):
+    # 遅延読み込みのフィールドには触れない
+    instance._original_customer_id = instance.__dict__.get('customer_id')
+
+
+@receiver(post_save, sender=Appointment)
+def count_booking(sender, instance, created, **kwargs):
+    """予約作成時（または顧客の付け替え時）に予約数を更新"""
+    original_customer_id = None if created else instance._original_customer_id
+    if original_customer_id != instance.customer_id:
+        adjust_counter(original_customer_id, 'booking_count', -1)
+        adjust_counter(instance.customer_id, 'booking_count', 1)
+    instance._original_customer_id = instance.customer_id
+
+
+@receiver(post_delete, sender=Appointment)
+def uncount_booking(sender, instance, **kwargs):
+    adjust_counter(instance.customer_id, 'booking_count', -1)
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_delete, sender=Badge)
+def update_badge_summary(sender, instance, **kwargs):
+    """バッジの獲得・削除時に獲得バッジ一覧を更新（referral_count の更新のみなら不要）"""
+    if kwargs.get('created', True):
+        refresh_badge_summary(instance.user_id)
@@ -0,0 +1,96 @@
+"""
+ユーザーの集計値（予約数・紹介成功数・獲得バッジ・未読通知数）の更新
+
+User の booking_count / successful_referral_count / badge_summary / unread_notification_count はシグナルから
+F() による差分更新で保守し、シリアライズ時に集計クエリを発行しないようにする。
+"""
+from django.db.models import Count, F, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+from .models import User, Badge
+
+
+def adjust_counter(user_id, field, delta):
+    """集計値を delta だけ増減（呼び出し元のトランザクション内で実行される）"""
+    if user_id is None or not delta:
+        return
+    User.objects.filter(pk=user_id).update(**{field: F(field) + delta})
+
+
+def increment_counter(user_id, field, delta=1):
+    """
+    集計値を delta だけ増減し、(変更前, 変更後) の値を返す（ユーザーがいなければ None）
+
+    行ロックを取ってから読み・書きするため、同時に増減されても変更前後の値が重ならない。
+    select_for_update を使うので transaction.atomic() の中で呼ぶこと。
+    """
+    current = User.objects.select_for_update().filter(pk=user_id).values_list(field, flat=True).first()
+    if current is None:
+        return None
+    User.objects.filter(pk=user_id).update(**{field: F(field) + delta})
+    return current, current + delta
+
+
+def adjust_counters(user_ids, field, delta):
+    """複数ユーザーの集計値を1回の UPDATE で delta だけ増減"""
+    if not user_ids or not delta:
+        return 0
+    return User.objects.filter(pk__in=user_ids).update(**{field: F(field) + delta})
+
+
+def badge_summary_for(badges):
+    return [{'id': badge.id, 'badge_type': badge.badge_type} for badge in badges]
+
+
+def refresh_badge_summary(user_id):
+    """ユーザーの獲得バッジ一覧を再作成"""
+    badges = Badge.objects.filter(user_id=user_id).order_by('id')
+    User.objects.filter(pk=user_id).update(badge_summary=badge_summary_for(badges))
+
+
+def refresh_badge_summaries(user_ids=None, batch_size=1000):
+    """獲得バッジ一覧をまとめて再作成（user_ids 省略時は全ユーザー）。変更のあったユーザーだけ更新する"""
+    badges = Badge.objects.order_by('user_id', 'id')
+    users = User.objects.only('id', 'badge_summary')
+    if user_ids is not None:
+        badges = badges.filter(user_id__in=user_ids)
+        users = users.filter(pk__in=user_ids)
+
+    badges_by_user = {}
+    for badge in badges:
+        badges_by_user.setdefault(badge.user_id, []).append(badge)
+
+    changed = []
+    for user in users.iterator(chunk_size=batch_size):
+        summary = badge_summary_for(badges_by_user.get(user.id, []))
+        if user.badge_summary != summary:
+            user.badge_summary = summary
+            changed.append(user)
+    User.objects.bulk_update(changed, ['badge_summary'], batch_size=batch_size)
+
+
+def _count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def recompute_user_stats(batch_size=1000):
+    """
+    全ユーザーの集計値を実データから再計算（ずれの修復用）
+
+    件数は相関サブクエリによる1回の UPDATE、バッジは一括読み込みして bulk_update する。
+    更新したユーザー数を返す。
+    """
+    from bookings.models import Appointment
+    from notifications.models import Notification
+    from referrals.models import Referral
+
+    updated = User.objects.update(
+        booking_count=_count_subquery(Appointment.objects.all(), 'customer'),
+        successful_referral_count=_count_subquery(Referral.objects.filter(is_successful=True), 'referrer'),
+        unread_notification_count=_count_subquery(Notification.objects.filter(read=False), 'user'),
+    )
+    refresh_badge_summaries(batch_size=batch_size)
+    return updated
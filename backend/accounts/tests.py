@@ -1,3 +1,63 @@
+from io import StringIO
+from datetime import timedelta
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from bookings.models import Appointment, Stylist, Service
+from referrals.models import ReferralLink, Referral
+from .models import User, Badge
+from .serializers import UserSerializer
 
-# Create your tests here.
+
+class UserStatCountersTest(TestCase):
+    """User の集計カラムがシグナルで保守され、シリアライズ時にクエリが発行されないことを確認"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer')
+        self.stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.stylist = Stylist.objects.create(user=self.stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+
+    def book(self, hours):
+        return Appointment.objects.create(
+            customer=self.customer,
+            stylist=self.stylist,
+            service=self.service,
+            appointment_date=timezone.now() + timedelta(hours=hours),
+            total_amount=self.service.price
+        )
+
+    def test_counters_follow_changes(self):
+        first = self.book(1)
+        self.book(3)
+        link = ReferralLink.objects.create(referrer=self.customer)
+        referral = Referral.objects.create(
+            referrer=self.customer, referred_user=self.stylist_user, referral_link=link
+        )
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.booking_count, 2)
+        self.assertEqual(self.customer.successful_referral_count, 0)
+
+        referral.is_successful = True
+        referral.save()
+        Badge.objects.get_or_create(user=self.customer, badge_type='bronze')
+        first.delete()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.booking_count, 1)
+        self.assertEqual(self.customer.successful_referral_count, 1)
+        self.assertEqual([b['badge_type'] for b in self.customer.badge_summary], ['bronze'])
+
+        with self.assertNumQueries(0):
+            data = UserSerializer(self.customer).data
+        self.assertEqual(data['total_bookings'], 1)
+        self.assertEqual(data['referral_count'], 1)
+        self.assertEqual([b['name'] for b in data['badges']], ['ブロンズ'])
+
+    def test_recompute_repairs_drift(self):
+        self.book(1)
+        User.objects.update(booking_count=99, badge_summary=[{'id': 0, 'badge_type': 'gold'}])
+
+        call_command('recompute_user_stats', stdout=StringIO())
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.booking_count, 1)
+        self.assertEqual(self.customer.badge_summary, [])
@@ -32,7 +32,7 @@ def register(request):
         user = serializer.save()
         refresh = RefreshToken.for_user(user)
         return Response({
-            'user': UserSerializer(user).data,
+            'user': UserSerializer(user, context={'request': request}).data,
             'tokens': {
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -50,7 +50,7 @@ def login(request):
         user = serializer.validated_data['user']
         refresh = RefreshToken.for_user(user)
         return Response({
-            'user': UserSerializer(user).data,
+            'user': UserSerializer(user, context={'request': request}).data,
             'tokens': {
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -63,7 +63,7 @@ def login(request):
 @permission_classes([IsAuthenticated])
 def profile(request):
     """プロフィール取得"""
-    serializer = UserSerializer(request.user)
+    serializer = UserSerializer(request.user, context={'request': request})
     return Response(serializer.data)
 
 
@@ -71,7 +71,7 @@ def profile(request):
 @permission_classes([IsAuthenticated])
 def update_profile(request):
     """プロフィール更新"""
-    serializer = UserSerializer(request.user, data=request.data, partial=True)
+    serializer = UserSerializer(request.user, data=request.data, partial=True, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -133,7 +133,7 @@ def update_staff_role(request, user_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    serializer = UserSerializer(target_user, data=request.data, partial=True)
+    serializer = UserSerializer(target_user, data=request.data, partial=True, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -187,7 +187,7 @@ def available_stylists(request):
     available_profiles = StylistProfile.objects.filter(
         is_active=True,
         accepts_walk_ins=True
-    ).order_by('priority_level')
+    ).select_related('user', 'salon').order_by('priority_level')
     
     # 時間チェック
     available_profiles = [
@@ -195,7 +195,7 @@ def available_stylists(request):
         if profile.is_available_at(target_datetime)
     ]
     
-    serializer = StylistProfileSerializer(available_profiles, many=True)
+    serializer = StylistProfileSerializer(available_profiles, many=True, context={'request': request})
     return Response(serializer.data)
 
 
@@ -242,7 +242,7 @@ def auto_assign_stylist(request):
             
             if not existing_appointment:
                 return Response({
-                    'stylist': StylistProfileSerializer(profile).data,
+                    'stylist': StylistProfileSerializer(profile, context={'request': request}).data,
                     'assigned': True
                 })
     
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Service, Stylist, Appointment, StylistService, StylistBookingLink, ManualAppointment
+from .models import Service, Stylist, Appointment, StylistService, StylistBookingLink, ManualAppointment, StylistDayOccupancy
 
 
 @admin.register(Service)
@@ -46,3 +46,11 @@ class ManualAppointmentAdmin(admin.ModelAdmin):
     search_fields = ['customer_name', 'customer_phone', 'stylist__user__username']
     date_hierarchy = 'appointment_date'
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(StylistDayOccupancy)
+class StylistDayOccupancyAdmin(admin.ModelAdmin):
+    list_display = ['stylist', 'date', 'updated_at']
+    list_filter = ['stylist']
+    date_hierarchy = 'date'
+    readonly_fields = ['bitmap', 'updated_at']
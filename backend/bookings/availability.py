@@ -0,0 +1,395 @@
+"""
+予約可能時間の計算エンジン
+
+スタイリストの1日分の予約（Appointment + ManualAppointment）を1クエリで読み込み、
+ソート済みの「埋まっている時間帯」リストに変換してから、時間枠を線形スイープで生成する。
+複数スタイリストをまとめて判定する場合は、1日をセル単位に区切った占有ビットマップ
+（Pythonのint）に変換し、ビット演算で全時間枠を一度に判定する。
+日別の占有ビットマップは StylistDayOccupancy に保存され、複数日のカレンダーは
+保存済みビットマップの読み込みだけで計算できる。
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import F, FilteredRelation, IntegerField, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import StylistProfile
+from .models import Appointment, ManualAppointment, Stylist, StylistService, StylistDayOccupancy
+
+
+# 営業時間の設定 (9:00 - 18:00)
+BUSINESS_START = time(9, 0)
+BUSINESS_END = time(18, 0)
+
+# 時間枠の刻み（分）
+SLOT_INTERVAL_MINUTES = 30
+
+# 時間を占有する予約ステータス
+ACTIVE_STATUSES = ['RESERVED', 'PAID']
+
+# 占有ビットマップの1セルあたりの分数（ビットiは 00:00 + i * CELL_MINUTES 分からのセル）
+CELL_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+BITMAP_BYTES = -(-CELLS_PER_DAY // 8)
+
+
+def day_bounds(day):
+    """指定日の [00:00, 翌00:00) をタイムゾーン付き日時で返す"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def appointment_duration():
+    """予約の所要時間（スタイリスト固有の設定 → サービス標準の順）を求める式"""
+    stylist_duration = StylistService.objects.filter(
+        stylist=OuterRef('stylist'),
+        service=OuterRef('service')
+    ).values('duration_minutes')[:1]
+    return Coalesce(
+        Subquery(stylist_duration),
+        F('service__duration_minutes'),
+        output_field=IntegerField()
+    )
+
+
+def load_busy_intervals(stylist_ids, start, end, exclude_appointment=None, exclude_manual_appointment=None):
+    """
+    指定スタイリストの [start, end) に開始する予約を1クエリで取得し、
+    スタイリストIDごとの BusySchedule を返す
+
+    exclude_appointment / exclude_manual_appointment には時間変更中の予約のIDを指定する。
+    """
+    appointments = Appointment.objects.filter(
+        stylist_id__in=stylist_ids,
+        appointment_date__gte=start,
+        appointment_date__lt=end,
+        status__in=ACTIVE_STATUSES
+    ).exclude(
+        pk=exclude_appointment
+    ).annotate(
+        duration=appointment_duration()
+    ).order_by().values_list('stylist_id', 'appointment_date', 'duration')
+
+    manual_appointments = ManualAppointment.objects.filter(
+        stylist_id__in=stylist_ids,
+        appointment_date__gte=start,
+        appointment_date__lt=end
+    ).exclude(
+        pk=exclude_manual_appointment
+    ).annotate(
+        duration=F('duration_minutes')
+    ).order_by().values_list('stylist_id', 'appointment_date', 'duration')
+
+    intervals = defaultdict(list)
+    for stylist_id, appointment_start, duration in appointments.union(manual_appointments, all=True):
+        intervals[stylist_id].append(
+            (appointment_start, appointment_start + timedelta(minutes=duration))
+        )
+
+    return {
+        stylist_id: BusySchedule(intervals.get(stylist_id, []))
+        for stylist_id in stylist_ids
+    }
+
+
+class BusySchedule:
+    """開始時刻でソート・マージ済みの埋まっている時間帯"""
+
+    def __init__(self, intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        self.intervals = merged
+        self._starts = [start for start, _ in merged]
+
+    def __iter__(self):
+        return iter(self.intervals)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def is_free(self, start, end):
+        """[start, end) がどの予約とも重ならないか"""
+        index = bisect_right(self._starts, start) - 1
+        if index >= 0 and self.intervals[index][1] > start:
+            return False
+        next_index = index + 1
+        return next_index >= len(self.intervals) or self.intervals[next_index][0] >= end
+
+    def free_slots(self, day, duration_minutes, opening=BUSINESS_START, closing=BUSINESS_END,
+                   interval_minutes=SLOT_INTERVAL_MINUTES):
+        """
+        営業時間内の空き時間枠を (開始, 終了) のリストで返す
+
+        時間枠と予約はどちらも開始時刻順なので、予約側のポインタを進めながら
+        1回のスイープで判定できる。
+        """
+        duration = timedelta(minutes=duration_minutes)
+        step = timedelta(minutes=interval_minutes)
+        current = timezone.make_aware(datetime.combine(day, opening))
+        end_of_day = timezone.make_aware(datetime.combine(day, closing))
+
+        slots = []
+        index = 0
+        while current + duration <= end_of_day:
+            slot_end = current + duration
+            # この枠より前に終わる予約は以降の枠にも影響しない
+            while index < len(self.intervals) and self.intervals[index][1] <= current:
+                index += 1
+            if index >= len(self.intervals) or self.intervals[index][0] >= slot_end:
+                slots.append((current, slot_end))
+            current += step
+        return slots
+
+
+def get_busy_schedule(stylist, day):
+    """スタイリストの1日分の BusySchedule を取得"""
+    start, end = day_bounds(day)
+    return load_busy_intervals([stylist.id], start, end)[stylist.id]
+
+
+def format_slot(slot_start, slot_end):
+    """時間枠をAPIレスポンス用の辞書に変換"""
+    slot_start = timezone.localtime(slot_start)
+    slot_end = timezone.localtime(slot_end)
+    return {
+        'start_time': slot_start.strftime('%H:%M'),
+        'end_time': slot_end.strftime('%H:%M'),
+        'display': f"{slot_start.strftime('%H:%M')} - {slot_end.strftime('%H:%M')}"
+    }
+
+
+def minutes_to_cells(minutes):
+    """分数をセル数に切り上げ"""
+    return -(-minutes // CELL_MINUTES)
+
+
+def time_to_cell(value):
+    """時刻を 00:00 からのセル番号に変換（切り捨て）"""
+    return (value.hour * 60 + value.minute) // CELL_MINUTES
+
+
+def range_mask(first_cell, last_cell):
+    """セル [first_cell, last_cell) のビットを立てたマスク"""
+    first_cell = max(first_cell, 0)
+    last_cell = min(last_cell, CELLS_PER_DAY)
+    if last_cell <= first_cell:
+        return 0
+    return ((1 << (last_cell - first_cell)) - 1) << first_cell
+
+
+def time_window_mask(opening, closing):
+    """[opening, closing) の時間帯のマスク"""
+    return range_mask(time_to_cell(opening), time_to_cell(closing))
+
+
+def occupancy_bitmap(schedule, day_start):
+    """
+    BusySchedule を1日分の占有ビットマップに変換
+
+    予約がセルの一部でも占めていればそのセルは埋まっているとみなす。
+    """
+    bitmap = 0
+    for start, end in schedule:
+        start_minutes = (start - day_start).total_seconds() / 60
+        end_minutes = (end - day_start).total_seconds() / 60
+        bitmap |= range_mask(
+            int(start_minutes // CELL_MINUTES),
+            int(-(-end_minutes // CELL_MINUTES))
+        )
+    return bitmap
+
+
+def free_start_bitmap(occupancy, allowed, duration_cells):
+    """
+    所要時間分のセルが連続して空いている開始セルのビットマップ
+
+    free の各ビットについて free >> k (k = 1..duration_cells-1) とのANDを取ると、
+    ビットiが立つのはセル i..i+duration_cells-1 がすべて空いている場合に限られる。
+    """
+    free = allowed & ~occupancy
+    starts = free
+    for offset in range(1, duration_cells):
+        starts &= free >> offset
+        if not starts:
+            break
+    return starts
+
+
+def slot_start_cells(opening=BUSINESS_START, closing=BUSINESS_END, interval_minutes=SLOT_INTERVAL_MINUTES):
+    """時間枠の開始セル番号の一覧"""
+    step = interval_minutes // CELL_MINUTES
+    return list(range(time_to_cell(opening), time_to_cell(closing), step))
+
+
+def cell_to_time(cell):
+    """セル番号を時刻に変換"""
+    minutes = cell * CELL_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def walk_in_start_bitmaps(day, service):
+    """
+    指名なし予約を受け付けているスタイリストごとに、サービスの所要時間分
+    連続して空いている開始セルのビットマップを返す（優先度順の {user_id: bitmap}）
+
+    スタイリスト数に関わらずクエリ数は一定。
+    """
+    profiles = list(
+        StylistProfile.objects.filter(
+            is_active=True,
+            accepts_walk_ins=True
+        ).order_by('priority_level').values_list(
+            'user_id', 'working_hours_start', 'working_hours_end'
+        )
+    )
+    if not profiles:
+        return {}
+
+    # プロフィールに対応するスタイリストと、このサービスの個別設定を1クエリで取得
+    stylists = Stylist.objects.filter(
+        user_id__in=[user_id for user_id, _, _ in profiles]
+    ).annotate(
+        offer=FilteredRelation('stylist_services', condition=Q(stylist_services__service=service))
+    ).values_list('user_id', 'id', 'offer__duration_minutes', 'offer__is_available')
+    stylist_by_user = {
+        user_id: (stylist_id, duration, is_available)
+        for user_id, stylist_id, duration, is_available in stylists
+    }
+
+    day_start, day_end = day_bounds(day)
+    schedules = load_busy_intervals(
+        [stylist_id for stylist_id, _, _ in stylist_by_user.values()],
+        day_start,
+        day_end
+    )
+    business_hours = time_window_mask(BUSINESS_START, BUSINESS_END)
+
+    bitmaps = {}
+    for user_id, working_start, working_end in profiles:
+        stylist_id, duration, is_available = stylist_by_user.get(user_id, (None, None, None))
+        if is_available is False:
+            # このサービスを提供しないスタイリスト
+            continue
+        occupancy = occupancy_bitmap(schedules[stylist_id], day_start) if stylist_id else 0
+        allowed = business_hours & time_window_mask(working_start, working_end)
+        bitmaps[user_id] = free_start_bitmap(
+            occupancy,
+            allowed,
+            minutes_to_cells(duration or service.duration_minutes)
+        )
+    return bitmaps
+
+
+def format_cell_slot(day, cell, duration_minutes):
+    """開始セルと所要時間から時間枠の辞書を作成"""
+    slot_start = timezone.make_aware(datetime.combine(day, cell_to_time(cell)))
+    return format_slot(slot_start, slot_start + timedelta(minutes=duration_minutes))
+
+
+def free_cell_slots(day, occupancy, duration_minutes):
+    """占有ビットマップから営業時間内の空き時間枠を生成"""
+    starts = free_start_bitmap(
+        occupancy,
+        time_window_mask(BUSINESS_START, BUSINESS_END),
+        minutes_to_cells(duration_minutes)
+    )
+    return [
+        format_cell_slot(day, cell, duration_minutes)
+        for cell in slot_start_cells()
+        if starts >> cell & 1
+    ]
+
+
+def bitmap_to_bytes(bitmap):
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def daily_bitmaps(schedule):
+    """BusySchedule を開始日（ローカル日付）ごとの占有ビットマップに分割"""
+    by_day = defaultdict(list)
+    for start, end in schedule:
+        by_day[timezone.localdate(start)].append((start, end))
+    return {
+        day: occupancy_bitmap(intervals, day_bounds(day)[0])
+        for day, intervals in by_day.items()
+    }
+
+
+def refresh_day_occupancy(stylist_id, day):
+    """
+    スタイリストの1日分の占有ビットマップを再計算して保存
+
+    予約がなくなった日は行を削除する（行がない日は空きとして扱われる）。
+    スタイリスト削除時のカスケード中に呼ばれても孤立した行が残らない。
+    """
+    start, end = day_bounds(day)
+    schedule = load_busy_intervals([stylist_id], start, end)[stylist_id]
+    bitmap = occupancy_bitmap(schedule, start)
+    if not bitmap:
+        StylistDayOccupancy.objects.filter(stylist_id=stylist_id, date=day).delete()
+        return
+    StylistDayOccupancy.objects.update_or_create(
+        stylist_id=stylist_id,
+        date=day,
+        defaults={'bitmap': bitmap_to_bytes(bitmap)}
+    )
+
+
+def rebuild_occupancy(start_day, end_day, stylist_ids=None):
+    """
+    [start_day, end_day] の占有ビットマップをまとめて再構築
+
+    予約は範囲全体を1クエリで読み込み、既存行を削除してから bulk_create する。
+    作成した行数を返す。
+    """
+    if stylist_ids is None:
+        stylist_ids = list(Stylist.objects.values_list('id', flat=True))
+    start = day_bounds(start_day)[0]
+    end = day_bounds(end_day)[1]
+    schedules = load_busy_intervals(stylist_ids, start, end)
+
+    rows = [
+        StylistDayOccupancy(stylist_id=stylist_id, date=day, bitmap=bitmap_to_bytes(bitmap))
+        for stylist_id, schedule in schedules.items()
+        for day, bitmap in daily_bitmaps(schedule).items()
+    ]
+    StylistDayOccupancy.objects.filter(
+        stylist_id__in=stylist_ids,
+        date__gte=start_day,
+        date__lte=end_day
+    ).delete()
+    StylistDayOccupancy.objects.bulk_create(rows)
+    return len(rows)
+
+
+def rebuild_future_occupancy(stylist_ids):
+    """
+    今日以降に保存済みの占有ビットマップを再構築（所要時間の設定が変わった場合）
+
+    行がない日は予約がないため、保存済みの最終日までを対象にする。
+    """
+    today = timezone.localdate()
+    last_day = StylistDayOccupancy.objects.filter(
+        stylist_id__in=stylist_ids,
+        date__gte=today
+    ).aggregate(last_day=Max('date'))['last_day']
+    if last_day:
+        rebuild_occupancy(today, last_day, stylist_ids=stylist_ids)
+
+
+def load_day_occupancies(stylist_id, start_day, end_day):
+    """保存済みの占有ビットマップを {date: bitmap} で返す（行がない日は空き）"""
+    rows = StylistDayOccupancy.objects.filter(
+        stylist_id=stylist_id,
+        date__gte=start_day,
+        date__lte=end_day
+    ).values_list('date', 'bitmap')
+    return {day: int.from_bytes(bytes(bitmap), 'little') for day, bitmap in rows}
@@ -0,0 +1,96 @@
+"""
+ブッキングコードからのスタイリスト情報取得
+
+SNS で共有されたリンクにアクセスが集中するため、応答をプロセス内の LRU キャッシュに保持する。
+エントリにはキャッシュフレームワーク上のバージョントークンを添えて保存し、取得のたびに
+トークンを照合する。別プロセスでの変更（シグナルによるトークンの差し替え）がすぐに反映されるのは
+トークンが共有キャッシュ（Redis など）にある場合に限られる。プロセス内メモリのキャッシュでは
+トークンもプロセスごとになるため、その構成は1ワーカーでしか動かせない（settings.WEB_CONCURRENCY を参照）。
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import cache as booking_link_cache
+from .models import StylistBookingLink, StylistService
+from .serializers import StylistSerializer
+
+
+class LRUCache:
+    """スレッドセーフな最大件数付き LRU"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+payloads = LRUCache(getattr(settings, 'BOOKING_CODE_LRU_SIZE', 1024))
+
+
+def load_booking_link(unique_code):
+    """有効なブッキングリンクを、シリアライズに必要な関連ごと3クエリで取得（なければ None）"""
+    return StylistBookingLink.objects.select_related('stylist__user').prefetch_related(
+        'stylist__services',
+        Prefetch('stylist__stylist_services', queryset=StylistService.objects.select_related('service'))
+    ).filter(unique_code=unique_code, is_active=True).first()
+
+
+def build_payload(booking_link, request):
+    return {
+        'stylist': StylistSerializer(booking_link.stylist, context={'request': request}).data,
+        'booking_settings': {
+            'max_advance_days': booking_link.max_advance_days,
+            'allow_guest_booking': booking_link.allow_guest_booking
+        }
+    }
+
+
+def get_booking_code_payload(unique_code, request):
+    """
+    (payload, etag) を返す。コードが無効なら None
+
+    キーにはホストとクエリ文字列も含める（画像URLの絶対化や ?fields= で内容が変わるため）。
+    トークンは DB を読む前に取得するので、読み込み中に変更があっても古い内容が新しいトークンで保存されることはない。
+    """
+    # ?expand= はユーザーの集計値など無効化の対象外のデータを含むため毎回生成する
+    cacheable = 'expand' not in request.query_params
+    version = booking_link_cache.booking_link_version(unique_code)
+    key = (unique_code, request.get_host(), request.META.get('QUERY_STRING', ''))
+    entry = payloads.get(key) if cacheable else None
+    if entry is not None and entry[0] == version:
+        return entry[1], entry[2]
+
+    booking_link = load_booking_link(unique_code)
+    if booking_link is None:
+        return None
+    payload = build_payload(booking_link, request)
+    etag = '"%s"' % hashlib.sha256(
+        json.dumps(payload, cls=JSONEncoder, sort_keys=True).encode()
+    ).hexdigest()[:32]
+    if cacheable:
+        payloads.set(key, (version, payload, etag))
+    return payload, etag
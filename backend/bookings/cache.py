@@ -0,0 +1,154 @@
+"""
+予約可能時間・公開カタログのリードスルーキャッシュ
+
+予約可能時間は (スタイリスト, 日付, 所要時間) ごと、公開カタログ（サービス・スタイリスト一覧）は
+レンダリング済みの応答ごとに Django のキャッシュフレームワークへ保存する。
+キャッシュキーにはバージョントークンを含め、予約などの書き込み時にはトークンを
+差し替えることで、該当する結果だけを確実に無効化する（パターン削除は使わない）。
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[getattr(settings, 'AVAILABILITY_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 300)
+
+
+def _stylist_version_key(stylist_id):
+    return f'availability:version:stylist:{stylist_id}'
+
+
+def _day_version_key(stylist_id, day):
+    return f'availability:version:day:{stylist_id}:{day.isoformat()}'
+
+
+WALK_IN_VERSION_KEY = 'availability:version:walk-in'
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+BOOKING_LINKS_VERSION_KEY = 'booking-link:version'
+
+
+def _booking_link_version_key(unique_code):
+    return f'booking-link:version:{unique_code}'
+
+
+def _walk_in_day_version_key(day):
+    return f'availability:version:walk-in:{day.isoformat()}'
+
+
+def _get_versions(keys):
+    """
+    バージョントークンをまとめて取得
+
+    キーが存在しない（未作成・追い出された）場合は新しいトークンを作るので、
+    過去に使われたトークンが再利用されて古い結果が返ることはない。
+    """
+    cache = _cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(*keys):
+    """バージョントークンを差し替え、コミット後にもう一度差し替える"""
+    def bump():
+        _cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+    bump()
+    # コミット前のスナップショットから計算された結果が再度キャッシュされていても無効にする
+    transaction.on_commit(bump)
+
+
+def _read_through(key, compute):
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, _timeout())
+    return value
+
+
+def get_stylist_slots(stylist_id, day, duration_minutes, compute):
+    """スタイリストの空き時間枠をキャッシュ経由で取得"""
+    stylist_version, day_version = _get_versions([
+        _stylist_version_key(stylist_id),
+        _day_version_key(stylist_id, day),
+    ])
+    key = (
+        f'availability:slots:{stylist_id}:{day.isoformat()}:{duration_minutes}'
+        f':{stylist_version}:{day_version}'
+    )
+    return _read_through(key, compute)
+
+
+def get_walk_in_times(day, service_id, compute):
+    """指名なし予約の空き時間をキャッシュ経由で取得"""
+    walk_in_version, day_version = _get_versions([
+        WALK_IN_VERSION_KEY,
+        _walk_in_day_version_key(day),
+    ])
+    key = f'availability:walk-in:{day.isoformat()}:{service_id}:{walk_in_version}:{day_version}'
+    return _read_through(key, compute)
+
+
+def invalidate_stylist_day(stylist_id, day):
+    """予約の追加・変更・削除時：該当スタイリスト・日付と指名なし予約の同日分を無効化"""
+    _bump(_day_version_key(stylist_id, day), _walk_in_day_version_key(day))
+
+
+def invalidate_stylist(stylist_id):
+    """所要時間などの設定変更時：スタイリストの全日付と指名なし予約全体を無効化"""
+    _bump(_stylist_version_key(stylist_id), WALK_IN_VERSION_KEY)
+
+
+def invalidate_walk_in():
+    """勤務時間・指名なし受付などの変更時：指名なし予約全体を無効化"""
+    _bump(WALK_IN_VERSION_KEY)
+
+
+def catalog_key(variant):
+    """公開カタログのスナップショットのキー（応答を計算する前に取得しておくこと）"""
+    version, = _get_versions([CATALOG_VERSION_KEY])
+    digest = hashlib.sha256(variant.encode()).hexdigest()[:32]
+    return f'catalog:snapshot:{version}:{digest}'
+
+
+def get_catalog_snapshot(key):
+    return _cache().get(key)
+
+
+def set_catalog_snapshot(key, snapshot):
+    _cache().set(key, snapshot, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+
+
+def invalidate_catalog():
+    """サービス・スタイリスト・スタイリストのユーザー情報の変更時：公開カタログ全体を無効化"""
+    _bump(CATALOG_VERSION_KEY)
+
+
+def booking_link_version(unique_code):
+    """ブッキングコードの応答のバージョン（プロセス内 LRU のエントリの有効性確認に使う）"""
+    return tuple(_get_versions([BOOKING_LINKS_VERSION_KEY, _booking_link_version_key(unique_code)]))
+
+
+def invalidate_booking_link(*unique_codes):
+    """ブッキングリンク・スタイリスト・提供サービスの変更時：該当コードの応答を無効化"""
+    if unique_codes:
+        _bump(*[_booking_link_version_key(code) for code in unique_codes])
+
+
+def invalidate_booking_links():
+    """サービスの変更時：全ブッキングコードの応答を無効化"""
+    _bump(BOOKING_LINKS_VERSION_KEY)
@@ -0,0 +1,67 @@
+"""
+公開カタログ（サービス一覧・スタイリスト一覧）のスナップショット配信
+
+予約導線の最初に必ず呼ばれる未認証の GET を、レンダリング済みのバイト列としてキャッシュから返す。
+スナップショットはバージョントークン付きのキーに保存し、Service / Stylist / StylistService と
+スタイリストの User が変更されるとシグナルからトークンを差し替えて作り直させる。
+ETag は本文のハッシュなので、どのプロセスが作ったスナップショットでも同じ内容なら同じ値になる。
+トークンの差し替えを全ワーカーに届けるため、複数ワーカーでは共有キャッシュが必須
+（settings.WEB_CONCURRENCY > 1 でプロセス内メモリのキャッシュは設定時に拒否される）。
+"""
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from cier_project.conditional import patch_revalidation_headers
+from . import cache as catalog_cache
+
+
+class CatalogSnapshotMixin:
+    """ListAPIView の GET をカタログのスナップショットから返す"""
+
+    def snapshot_page(self, request):
+        """
+        スナップショットを使う場合のページ番号（使わない場合は None）
+
+        スナップショットはページ番号ごとに1つだけ作り、任意のクエリ文字列でキャッシュが増えないようにする。
+        ?page= 以外のパラメータ（?fields= / ?expand= など）や正規形でないページ番号は毎回生成する
+        （?expand= はユーザーの集計値などカタログの無効化対象外のデータも含む）。
+        """
+        page_query_param = getattr(self.paginator, 'page_query_param', 'page')
+        if set(request.query_params) - {page_query_param}:
+            return None
+        page = request.query_params.get(page_query_param, '1')
+        if not page.isdigit() or page != str(int(page)) or int(page) < 1:
+            return None
+        return int(page)
+
+    def get(self, request, *args, **kwargs):
+        page = self.snapshot_page(request)
+        if request.accepted_renderer.format != 'json' or page is None:
+            return super().get(request, *args, **kwargs)
+
+        # 本文の next / previous はリクエストのスキームとホストを含む絶対 URL のため、キーにも含める
+        # （ホストは ALLOWED_HOSTS で検証済みなのでキーの数は増えすぎない）
+        origin = request.build_absolute_uri('/')
+        key = catalog_cache.catalog_key(f'{type(self).__name__}:{origin}:{page}:{request.accepted_media_type}')
+        snapshot = catalog_cache.get_catalog_snapshot(key)
+        if snapshot is None:
+            response = self.finalize_response(request, super().get(request, *args, **kwargs), *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.render()
+            snapshot = (
+                '"%s"' % hashlib.sha256(response.content).hexdigest()[:32],
+                response['Content-Type'],
+                response.content,
+            )
+            catalog_cache.set_catalog_snapshot(key, snapshot)
+
+        etag, content_type, content = snapshot
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        response = get_conditional_response(request, etag=etag, response=response)
+        patch_revalidation_headers(response, max_age=settings.CATALOG_MAX_AGE)
+        return response
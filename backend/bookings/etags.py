@@ -0,0 +1,90 @@
+"""
+読み取り専用 GET の ETag の元になるバージョン
+
+各関数はビューと同じ引数を受け取り、応答の内容に影響する行の max(updated_at) と件数を返す。
+パラメータが不正な場合は None を返し、ビュー側でエラー応答を返させる。
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from cier_project.conditional import table_version
+from accounts.models import StylistProfile
+from .availability import day_bounds
+from .models import Service, Appointment, ManualAppointment, StylistService
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def booked_version(start, end=None, stylist_id=None):
+    """[start, end) に開始する予約・手動予約のバージョン（end を省略すると start 以降すべて）"""
+    versions = []
+    for model in (Appointment, ManualAppointment):
+        queryset = model.objects.filter(appointment_date__gte=start)
+        if end is not None:
+            queryset = queryset.filter(appointment_date__lt=end)
+        if stylist_id is not None:
+            queryset = queryset.filter(stylist_id=stylist_id)
+        versions.append(table_version(queryset))
+    return tuple(versions)
+
+
+def available_slots_version(request):
+    day = parse_date(request.GET.get('date'))
+    stylist_id = request.GET.get('stylist_id')
+    service_id = request.GET.get('service_id')
+    if day is None or not (str(stylist_id).isdigit() and str(service_id).isdigit()):
+        return None
+
+    day_start, day_end = day_bounds(day)
+    return (
+        table_version(
+            StylistService.objects.filter(stylist_id=stylist_id, service_id=service_id),
+            'updated_at', 'service__updated_at', 'stylist__updated_at', 'stylist__user__updated_at'
+        ),
+        # 前日から続く長時間の予約も対象にする
+        booked_version(day_start - timedelta(days=1), day_end, stylist_id=int(stylist_id)),
+    )
+
+
+def availability_calendar_version(request):
+    stylist_id = request.GET.get('stylist_id')
+    service_id = request.GET.get('service_id')
+    if not (str(stylist_id).isdigit() and str(service_id).isdigit()):
+        return None
+
+    # 表示期間は今日を起点にクランプされるため日付も含める
+    today = timezone.localdate()
+    start_date = parse_date(request.GET.get('start_date')) if request.GET.get('start_date') else today
+    if start_date is None:
+        return None
+    start, _ = day_bounds(max(start_date, today))
+    return (
+        today,
+        table_version(
+            StylistService.objects.filter(stylist_id=stylist_id, service_id=service_id),
+            'updated_at', 'service__updated_at', 'stylist__updated_at',
+            'stylist__user__updated_at', 'stylist__booking_link__updated_at'
+        ),
+        booked_version(start - timedelta(days=1), stylist_id=int(stylist_id)),
+    )
+
+
+def walk_in_times_version(request):
+    day = parse_date(request.GET.get('date'))
+    service_id = request.GET.get('service_id')
+    if day is None or not str(service_id).isdigit():
+        return None
+
+    day_start, day_end = day_bounds(day)
+    return (
+        table_version(StylistProfile.objects.all()),
+        table_version(StylistService.objects.filter(service_id=service_id)),
+        table_version(Service.objects.filter(pk=service_id)),
+        booked_version(day_start - timedelta(days=1), day_end),
+    )
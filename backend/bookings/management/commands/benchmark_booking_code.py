@@ -0,0 +1,69 @@
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from accounts.models import User
+from bookings.booking_codes import payloads
+from bookings.models import Service, Stylist, StylistService, StylistBookingLink
+from bookings.views import get_stylist_by_booking_code
+
+
+class Command(BaseCommand):
+    help = (
+        'ブッキングコード取得の応答時間を、同じコードへの逐次の連続アクセスで計測します（データはロールバックされます）。'
+        '1スレッドで順に呼び出すため、同時アクセス時のスループットではなく1リクエストあたりの処理時間の比較です'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='連続アクセスのリクエスト数（既定500）')
+        parser.add_argument('--services', type=int, default=12, help='スタイリストの提供サービス数（既定12）')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            booking_link, user = self.create_fixture(options['services'])
+            for label, clear_lru in (('LRU なし', True), ('LRU あり', False)):
+                self.run_sequential(label, booking_link.unique_code, user, options['requests'], clear_lru)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def create_fixture(service_count):
+        user = User.objects.create_user(
+            username='benchmark-stylist', first_name='花子', last_name='佐藤', user_type='stylist'
+        )
+        stylist = Stylist.objects.create(user=user, bio='カラーが得意です', experience_years=8)
+        for i in range(service_count):
+            service = Service.objects.create(
+                name=f'メニュー{i}', description='説明' * 10, duration_minutes=30 + i * 10, price=Decimal('5000.00')
+            )
+            stylist.services.add(service)
+            StylistService.objects.create(stylist=stylist, service=service, duration_minutes=30 + i * 10)
+        return StylistBookingLink.objects.create(stylist=stylist), user
+
+    def run_sequential(self, label, code, user, count, clear_lru):
+        factory = APIRequestFactory()
+        payloads.clear()
+        timings = []
+        queries = 0
+        for _ in range(count):
+            if clear_lru:
+                payloads.clear()
+            request = factory.get(f'/api/bookings/booking-code/{code}/')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = get_stylist_by_booking_code(request, booking_code=code)
+                response.render()
+                timings.append(time.perf_counter() - started)
+            queries += len(context.captured_queries)
+            assert response.status_code == 200
+
+        timings.sort()
+        percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+        self.stdout.write(
+            f'{label:<8} p50 {percentile(0.5):7.3f} ms  p95 {percentile(0.95):7.3f} ms  '
+            f'p99 {percentile(0.99):7.3f} ms  mean {statistics.mean(timings) * 1000:7.3f} ms  '
+            f'{queries / count:.1f} queries/req  {count / sum(timings):,.0f} req/s'
+        )
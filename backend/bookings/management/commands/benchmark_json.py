@@ -0,0 +1,93 @@
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from accounts.models import User
+from bookings.models import Appointment, Service, Stylist
+from bookings.serializers import AppointmentListSerializer
+from cier_project.parsers import ORJSONParser
+from cier_project.renderers import ORJSONRenderer
+
+
+def build_appointments(count):
+    """予約一覧と同じ形の未保存インスタンス（DBには書き込まない）"""
+    start = timezone.now()
+    service = Service(id=1, name='カット＋カラー', description='ダメージレスカラー', duration_minutes=90, price=Decimal('12800.00'))
+    stylist = Stylist(id=1, user=User(id=1, username='stylist', first_name='花子', last_name='佐藤', user_type='stylist'), bio='カラーが得意です', experience_years=8)
+    appointments = []
+    for i in range(count):
+        customer = User(
+            id=i + 2, username=f'customer{i}', first_name='太郎', last_name='山田', email=f'customer{i}@example.com',
+            phone_number='090-1234-5678', booking_count=i % 12, successful_referral_count=i % 3,
+            badge_summary=[{'id': i, 'badge_type': 'bronze'}] if i % 3 else []
+        )
+        appointments.append(Appointment(
+            id=i + 1, customer=customer, stylist=stylist, service=service,
+            appointment_date=start + timedelta(minutes=30 * i), status='RESERVED',
+            total_amount=Decimal('12800.00'), notes='前回と同じ色で', created_at=start, updated_at=start
+        ))
+    return appointments
+
+
+def build_raw_rows(count):
+    """Decimal / datetime / UUID をそのまま含むレスポンス（シリアライザーを通さないビュー相当）"""
+    start = timezone.now()
+    return [
+        {
+            'id': i, 'code': uuid.uuid4(), 'appointment_date': start + timedelta(minutes=30 * i),
+            'total_amount': Decimal('12800.00'), 'price': Decimal('9800.50'), 'status': 'RESERVED',
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = '標準の JSONRenderer/JSONParser と orjson 版のエンコード・デコード時間を予約一覧のデータで比較します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='1レスポンスあたりの予約件数（既定100）')
+        parser.add_argument('--iterations', type=int, default=200, help='計測回数（既定200）')
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+        payloads = {
+            '予約一覧': {
+                'next': None,
+                'next_cursor': 'eyJ2IjoiMjAyNi0xMC0xOFQxMDowMDowMCswOTowMCIsImlkIjoxMjN9',
+                'results': AppointmentListSerializer(
+                    build_appointments(rows), many=True
+                ).data,
+            },
+            'Decimal/datetime/UUID を含む行': build_raw_rows(rows),
+        }
+        for name, payload in payloads.items():
+            self.stdout.write(f'{name}（{rows}件 × {iterations}回）')
+            standard = self.measure(JSONRenderer(), JSONParser(), payload, iterations)
+            fast = self.measure(ORJSONRenderer(), ORJSONParser(), payload, iterations)
+            for label, (encode, decode, size) in (('json', standard), ('orjson', fast)):
+                self.stdout.write(
+                    f'  {label:<7} encode {encode * 1000:8.3f} ms  decode {decode * 1000:8.3f} ms  {size} bytes'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'  encode {standard[0] / fast[0]:.1f}倍 / decode {standard[1] / fast[1]:.1f}倍'
+            ))
+
+    @staticmethod
+    def measure(renderer, parser, payload, iterations):
+        """1回あたりのエンコード・デコード時間（秒、最良値）と出力サイズ"""
+        body = renderer.render(payload)
+        encode = decode = float('inf')
+        for _ in range(iterations):
+            started = time.perf_counter()
+            renderer.render(payload)
+            encode = min(encode, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            parser.parse(BytesIO(body))
+            decode = min(decode, time.perf_counter() - started)
+        return encode, decode, len(body)
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'スタイリストの日別占有ビットマップを予約データから再構築します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='開始日 (YYYY-MM-DD、既定は今日)')
+        parser.add_argument('--days', type=int, default=90, help='再構築する日数（既定90日）')
+        parser.add_argument('--stylist', type=int, action='append', dest='stylist_ids', help='対象スタイリストID（複数指定可）')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = (
+                datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+                if options['start_date'] else timezone.localdate()
+            )
+        except ValueError:
+            raise CommandError('開始日の形式が正しくありません (YYYY-MM-DD)')
+        end_date = start_date + timedelta(days=options['days'] - 1)
+
+        created = rebuild_occupancy(start_date, end_date, stylist_ids=options['stylist_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{start_date} 〜 {end_date} の占有ビットマップを {created} 件再構築しました'
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-18 13:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_manualappointment_stylistbookinglink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StylistDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日付')),
+                ('bitmap', models.BinaryField(verbose_name='占有ビットマップ')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stylist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_occupancies', to='bookings.stylist')),
+            ],
+            options={
+                'verbose_name': 'スタイリスト日別占有状況',
+                'verbose_name_plural': 'スタイリスト日別占有状況',
+                'unique_together': {('stylist', 'date')},
+            },
+        ),
+    ]
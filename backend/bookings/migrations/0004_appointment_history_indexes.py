@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 13:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_stylistdayoccupancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['stylist', '-appointment_date', '-id'], name='appt_stylist_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['customer', '-appointment_date', '-id'], name='appt_customer_history_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_appointment_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['stylist', 'appointment_date', 'status'], include=('service',), name='appt_stylist_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='manualappointment',
+            index=models.Index(fields=['stylist', 'appointment_date'], include=('duration_minutes',), name='manual_appt_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stylistservice',
+            index=models.Index(fields=['stylist', 'service', 'is_available'], include=('duration_minutes',), name='stylist_service_lookup_idx'),
+        ),
+    ]
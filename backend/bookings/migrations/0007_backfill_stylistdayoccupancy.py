@@ -0,0 +1,88 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import migrations
+from django.db.models import F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+# bookings.availability と同じ形式のビットマップを作る（後の変更でこのマイグレーションが壊れないよう、
+# 必要な定数と計算はここに複製し、モデルは apps.get_model の履歴モデルだけを使う）
+ACTIVE_STATUSES = ['RESERVED', 'PAID']
+CELL_MINUTES = 5
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+BITMAP_BYTES = -(-CELLS_PER_DAY // 8)
+
+
+def range_mask(first_cell, last_cell):
+    """セル [first_cell, last_cell) のビットを立てたマスク"""
+    first_cell = max(first_cell, 0)
+    last_cell = min(last_cell, CELLS_PER_DAY)
+    if last_cell <= first_cell:
+        return 0
+    return ((1 << (last_cell - first_cell)) - 1) << first_cell
+
+
+def occupancy_bytes(intervals, day):
+    """開始日が day の予約 [(開始, 終了)] を1日分の占有ビットマップ（bytes）に変換"""
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    bitmap = 0
+    for start, end in intervals:
+        start_minutes = (start - day_start).total_seconds() / 60
+        end_minutes = (end - day_start).total_seconds() / 60
+        bitmap |= range_mask(int(start_minutes // CELL_MINUTES), int(-(-end_minutes // CELL_MINUTES)))
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def backfill_day_occupancy(apps, schema_editor):
+    """
+    0003 で作成した日別占有ビットマップを、今日以降の既存予約から作成する
+
+    カレンダーは保存済みの行だけを読むため、行がないと既存予約の時間が空きとして表示される。
+    """
+    Appointment = apps.get_model('bookings', 'Appointment')
+    ManualAppointment = apps.get_model('bookings', 'ManualAppointment')
+    StylistService = apps.get_model('bookings', 'StylistService')
+    StylistDayOccupancy = apps.get_model('bookings', 'StylistDayOccupancy')
+
+    today = timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today, time.min))
+    stylist_duration = StylistService.objects.filter(
+        stylist=OuterRef('stylist'),
+        service=OuterRef('service')
+    ).values('duration_minutes')[:1]
+    appointments = Appointment.objects.filter(
+        appointment_date__gte=start,
+        status__in=ACTIVE_STATUSES
+    ).annotate(
+        duration=Coalesce(Subquery(stylist_duration), F('service__duration_minutes'), output_field=IntegerField())
+    ).values_list('stylist_id', 'appointment_date', 'duration')
+    manual_appointments = ManualAppointment.objects.filter(
+        appointment_date__gte=start
+    ).values_list('stylist_id', 'appointment_date', 'duration_minutes')
+
+    # (スタイリスト, 開始日) ごとの予約
+    intervals = defaultdict(list)
+    for queryset in (appointments, manual_appointments):
+        for stylist_id, appointment_start, duration in queryset.order_by().iterator():
+            intervals[stylist_id, timezone.localdate(appointment_start)].append(
+                (appointment_start, appointment_start + timedelta(minutes=duration))
+            )
+
+    rows = [
+        StylistDayOccupancy(stylist_id=stylist_id, date=day, bitmap=occupancy_bytes(day_intervals, day))
+        for (stylist_id, day), day_intervals in intervals.items()
+    ]
+    StylistDayOccupancy.objects.filter(date__gte=today).delete()
+    StylistDayOccupancy.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_service_stylist_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_day_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_backfill_stylistdayoccupancy'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='stylistservice',
+            name='stylist_service_lookup_idx',
+        ),
+    ]
@@ -14,6 +14,7 @@ class Service(models.Model):
     )
     is_active = models.BooleanField(default=True, verbose_name='有効')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - ¥{self.price}"
@@ -39,6 +40,7 @@ class Stylist(models.Model):
     )
     is_available = models.BooleanField(default=True, verbose_name='予約受付中')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"スタイリスト: {self.user.username}"
@@ -80,6 +82,7 @@ class StylistService(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
+        # (stylist, service) の検索は unique_together の索引を使う（1行に絞れるため追加の索引は不要）
         unique_together = ['stylist', 'service']
         verbose_name = 'スタイリストサービス'
         verbose_name_plural = 'スタイリストサービス'
@@ -146,6 +149,17 @@ class Appointment(models.Model):
     
     class Meta:
         ordering = ['-appointment_date']
+        indexes = [
+            # 予約履歴のカーソルページネーション用
+            models.Index(fields=['stylist', '-appointment_date', '-id'], name='appt_stylist_history_idx'),
+            models.Index(fields=['customer', '-appointment_date', '-id'], name='appt_customer_history_idx'),
+            # 空き時間計算・重複チェック用（スタイリスト×日時範囲×ステータス）
+            models.Index(
+                fields=['stylist', 'appointment_date', 'status'],
+                include=['service'],
+                name='appt_stylist_schedule_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.customer.username} - {self.service.name} ({self.appointment_date})"
@@ -246,8 +260,41 @@ class ManualAppointment(models.Model):
     
     class Meta:
         ordering = ['-appointment_date']
+        indexes = [
+            # 空き時間計算・重複チェック用（スタイリスト×日時範囲）
+            models.Index(
+                fields=['stylist', 'appointment_date'],
+                include=['duration_minutes'],
+                name='manual_appt_schedule_idx'
+            ),
+        ]
         verbose_name = '手動予約'
         verbose_name_plural = '手動予約'
     
     def __str__(self):
         return f"{self.customer_name} - {self.service.name} ({self.appointment_date})"
+
+
+class StylistDayOccupancy(models.Model):
+    """スタイリストの日別占有ビットマップ（予約カレンダー用に予約の保存・削除時に更新）"""
+    stylist = models.ForeignKey(
+        Stylist,
+        on_delete=models.CASCADE,
+        related_name='day_occupancies'
+    )
+    date = models.DateField(verbose_name='日付')
+    bitmap = models.BinaryField(verbose_name='占有ビットマップ')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['stylist', 'date']
+        verbose_name = 'スタイリスト日別占有状況'
+        verbose_name_plural = 'スタイリスト日別占有状況'
+    
+    def __str__(self):
+        return f"{self.stylist.user.username} - {self.date}"
+    
+    @property
+    def occupancy(self):
+        """ビットマップをint（ビットiがi番目のセル）として返す"""
+        return int.from_bytes(bytes(self.bitmap), 'little')
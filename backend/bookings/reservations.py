@@ -0,0 +1,111 @@
+"""
+予約枠の確保（同時予約による二重予約の防止）
+
+予約の作成・時間変更は reserve_slot() を通して行う。トランザクション内で最初にスタイリスト行を
+ロックしてから重複をチェックして書き込むため、同じスタイリストへの予約処理は直列化され、
+Appointment / ManualAppointment の時間帯が重なる行は作られない。
+
+- PostgreSQL など SELECT ... FOR UPDATE に対応したDBでは行ロックを取得する
+- SQLite では行ロックがないため、スタイリスト行への空更新で書き込みロックを先に取得する
+  （トランザクションの最初の文にすることで、古いスナップショットでの読み込みが起こらない）
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import StylistProfile
+from .availability import load_busy_intervals
+from .models import Stylist, StylistService
+
+
+class SlotUnavailable(Exception):
+    """指定した時間帯がすでに埋まっている"""
+
+
+def lock_stylist(stylist_id):
+    """スタイリスト行をロックし、同じスタイリストへの予約処理を直列化する（トランザクション内で呼ぶこと）"""
+    if connection.features.has_select_for_update:
+        list(Stylist.objects.select_for_update().filter(pk=stylist_id).values_list('pk', flat=True))
+    else:
+        Stylist.objects.filter(pk=stylist_id).update(is_available=F('is_available'))
+
+
+def service_duration(stylist_id, service):
+    """スタイリスト固有の所要時間（未設定の場合はサービス標準）"""
+    duration = StylistService.objects.filter(
+        stylist_id=stylist_id,
+        service=service
+    ).values_list('duration_minutes', flat=True).first()
+    return duration or service.duration_minutes
+
+
+def is_slot_free(stylist_id, start, duration_minutes, exclude_appointment=None, exclude_manual_appointment=None):
+    """[start, start + duration) が既存の予約と重ならないか"""
+    end = start + timedelta(minutes=duration_minutes)
+    # 前日から続く長時間の予約も対象にする
+    schedule = load_busy_intervals(
+        [stylist_id],
+        start - timedelta(days=1),
+        end,
+        exclude_appointment=exclude_appointment,
+        exclude_manual_appointment=exclude_manual_appointment
+    )[stylist_id]
+    return schedule.is_free(start, end)
+
+
+def reserve_slot(stylist_id, start, duration_minutes, save, exclude_appointment=None, exclude_manual_appointment=None):
+    """
+    スタイリストをロックして空きを確認してから save() を実行し、その戻り値を返す
+
+    時間帯が埋まっている場合は SlotUnavailable を送出し、何も書き込まない。
+    """
+    with transaction.atomic():
+        lock_stylist(stylist_id)
+        if not is_slot_free(
+            stylist_id, start, duration_minutes,
+            exclude_appointment=exclude_appointment,
+            exclude_manual_appointment=exclude_manual_appointment
+        ):
+            raise SlotUnavailable
+        return save()
+
+
+def reserve_walk_in(service, start, save):
+    """
+    指名なし予約：優先度順にスタイリストの確保を試み、最初に確保できたスタイリストで
+    save(stylist) を実行してその戻り値を返す
+
+    勤務時間内に所要時間が収まり、時間帯が空いているスタイリストがいなければ SlotUnavailable を送出する。
+    """
+    local_start = timezone.localtime(start)
+    profiles = StylistProfile.objects.filter(
+        is_active=True,
+        accepts_walk_ins=True
+    ).select_related('user').order_by('priority_level')
+
+    for profile in profiles:
+        # 対応するStylistモデルを取得または作成
+        stylist, created = Stylist.objects.get_or_create(
+            user=profile.user,
+            defaults={
+                'bio': profile.bio,
+                'experience_years': profile.experience_years,
+                'is_available': True
+            }
+        )
+        offer = StylistService.objects.filter(stylist=stylist, service=service).first()
+        if offer and not offer.is_available:
+            continue
+        duration = offer.duration_minutes if offer else service.duration_minutes
+        local_end = local_start + timedelta(minutes=duration)
+        if local_start.time() < profile.working_hours_start or local_end.time() > profile.working_hours_end:
+            continue
+
+        try:
+            return reserve_slot(stylist.id, start, duration, lambda: save(stylist))
+        except SlotUnavailable:
+            continue
+
+    raise SlotUnavailable
@@ -1,15 +1,18 @@
 from rest_framework import serializers
 from .models import Service, Stylist, Appointment, StylistService, StylistBookingLink, ManualAppointment
-from accounts.serializers import UserSerializer
+from accounts.models import User
+from accounts.serializers import UserSerializer, UserSummarySerializer, badges_for
+from cier_project.serializers import SparseFieldsetsMixin
+from referrals.models import REFERRAL_CODE_LENGTH
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
         fields = ['id', 'name', 'description', 'duration_minutes', 'price', 'is_active']
 
 
-class StylistServiceSerializer(serializers.ModelSerializer):
+class StylistServiceSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """スタイリスト固有のサービス情報"""
     service = ServiceSerializer(read_only=True)
     effective_price = serializers.ReadOnlyField()
@@ -19,14 +22,15 @@ class StylistServiceSerializer(serializers.ModelSerializer):
         fields = ['id', 'service', 'duration_minutes', 'price_override', 'effective_price', 'is_available']
 
 
-class StylistSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+class StylistSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    user = UserSummarySerializer(read_only=True)
     services = ServiceSerializer(many=True, read_only=True)  # 後で廃止予定
     stylist_services = StylistServiceSerializer(many=True, read_only=True)  # 新しいフィールド
     
     class Meta:
         model = Stylist
         fields = ['id', 'user', 'bio', 'experience_years', 'services', 'stylist_services', 'is_available']
+        expandable_fields = {'user': UserSerializer}
 
 
 class AppointmentCreateSerializer(serializers.ModelSerializer):
@@ -34,7 +38,7 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         choices=[('online', 'オンライン決済'), ('in_person', '店舗支払い')],
         write_only=True
     )
-    referral_code = serializers.UUIDField(write_only=True, required=False)
+    referral_code = serializers.CharField(max_length=REFERRAL_CODE_LENGTH, write_only=True, required=False)
     start_time = serializers.CharField(write_only=True)
     guest_info = serializers.DictField(write_only=True, required=False)
     
@@ -62,8 +66,8 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
-    customer = UserSerializer(read_only=True)
+class AppointmentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    customer = UserSummarySerializer(read_only=True)
     stylist = StylistSerializer(read_only=True)
     service = ServiceSerializer(read_only=True)
     
@@ -74,6 +78,60 @@ class AppointmentSerializer(serializers.ModelSerializer):
             'status', 'requires_payment', 'total_amount', 'notes',
             'created_at', 'updated_at'
         ]
+        expandable_fields = {'customer': UserSerializer}
+
+
+class AppointmentCustomerSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """予約一覧用の顧客情報（集計値は User の集計カラムから取得）"""
+    total_bookings = serializers.IntegerField(source='booking_count', read_only=True)
+    referral_count = serializers.IntegerField(source='successful_referral_count', read_only=True)
+    badges = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'user_type',
+            'phone_number', 'first_name', 'last_name',
+            'profile_image', 'total_bookings', 'referral_count', 'badges'
+        ]
+    
+    def get_badges(self, obj):
+        return badges_for(obj)
+
+
+class AppointmentStylistSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """予約一覧用のスタイリスト情報"""
+    user = UserSummarySerializer(read_only=True)
+    
+    class Meta:
+        model = Stylist
+        fields = ['id', 'user', 'bio', 'experience_years', 'is_available']
+        expandable_fields = {'user': UserSerializer}
+
+
+class AppointmentListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """
+    予約一覧用の軽量シリアライザー
+
+    queryset は with_list_relations() で関連データを読み込んでおくこと。
+    行数に関わらずクエリ数は一定になる。顧客の集計値は ?expand=customer で返す。
+    """
+    customer = UserSummarySerializer(read_only=True)
+    stylist = AppointmentStylistSerializer(read_only=True)
+    service = ServiceSerializer(read_only=True)
+    
+    class Meta:
+        model = Appointment
+        fields = [
+            'id', 'customer', 'stylist', 'service', 'appointment_date',
+            'status', 'requires_payment', 'total_amount', 'notes',
+            'created_at', 'updated_at'
+        ]
+        expandable_fields = {'customer': AppointmentCustomerSerializer}
+    
+    @staticmethod
+    def with_list_relations(queryset):
+        return queryset.select_related('customer', 'stylist__user', 'service')
 
 
 class StylistBookingLinkSerializer(serializers.ModelSerializer):
@@ -0,0 +1,139 @@
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Service, Stylist, Appointment, ManualAppointment, StylistService, StylistBookingLink
+from .availability import ACTIVE_STATUSES, day_bounds, rebuild_future_occupancy, refresh_day_occupancy
+from . import cache as availability_cache
+from accounts.models import User, StylistProfile
+
+
+def _occupancy_key(instance):
+    """(stylist_id, ローカル日付) を返す（遅延読み込みのフィールドには触れない）"""
+    stylist_id = instance.__dict__.get('stylist_id')
+    appointment_date = instance.__dict__.get('appointment_date')
+    if stylist_id is None or appointment_date is None:
+        return None
+    if timezone.is_aware(appointment_date):
+        appointment_date = timezone.localtime(appointment_date)
+    return stylist_id, appointment_date.date()
+
+
+@receiver(post_init, sender=Appointment)
+@receiver(post_init, sender=ManualAppointment)
+def remember_occupancy_key(sender, instance, **kwargs):
+    """日時やスタイリストが変更された場合に元の日も更新できるよう保持"""
+    instance._original_occupancy_key = _occupancy_key(instance)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=ManualAppointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=ManualAppointment)
+def update_day_occupancy(sender, instance, **kwargs):
+    """予約の保存・削除時に該当日の占有ビットマップを更新し、空き時間キャッシュを無効化"""
+    keys = {instance._original_occupancy_key, _occupancy_key(instance)}
+    keys.discard(None)
+    for stylist_id, day in keys:
+        refresh_day_occupancy(stylist_id, day)
+        availability_cache.invalidate_stylist_day(stylist_id, day)
+    instance._original_occupancy_key = _occupancy_key(instance)
+
+
+@receiver(post_save, sender=StylistService)
+@receiver(post_delete, sender=StylistService)
+def rebuild_stylist_occupancy(sender, instance, **kwargs):
+    """所要時間の変更は既存予約の占有時間に影響するため、今日以降の保存済み日を再構築"""
+    availability_cache.invalidate_stylist(instance.stylist_id)
+    rebuild_future_occupancy([instance.stylist_id])
+
+
+@receiver(post_init, sender=Service)
+def remember_service_duration(sender, instance, **kwargs):
+    instance._original_duration_minutes = instance.__dict__.get('duration_minutes')
+
+
+@receiver(post_save, sender=Service)
+def rebuild_service_occupancy(sender, instance, created, **kwargs):
+    """サービス標準の所要時間の変更は、個別設定のないスタイリストの予約の占有時間に影響する"""
+    if not created and instance.duration_minutes != instance._original_duration_minutes:
+        stylist_ids = list(Appointment.objects.filter(
+            service=instance,
+            appointment_date__gte=day_bounds(timezone.localdate())[0],
+            status__in=ACTIVE_STATUSES
+        ).order_by().values_list('stylist_id', flat=True).distinct())
+        for stylist_id in stylist_ids:
+            availability_cache.invalidate_stylist(stylist_id)
+        if stylist_ids:
+            rebuild_future_occupancy(stylist_ids)
+    instance._original_duration_minutes = instance.duration_minutes
+
+
+@receiver(post_save, sender=StylistProfile)
+@receiver(post_delete, sender=StylistProfile)
+def invalidate_walk_in_availability(sender, instance, **kwargs):
+    """勤務時間や指名なし受付の変更は指名なし予約の空き時間に影響する"""
+    availability_cache.invalidate_walk_in()
+
+
+
+@receiver(m2m_changed, sender=Stylist.services.through)
+def touch_stylist_services(sender, instance, action, **kwargs):
+    """旧 services の変更では auto_now が働かないため、変更した側（Stylist / Service）の updated_at を進める"""
+    if action.startswith('post_'):
+        type(instance).objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+        availability_cache.invalidate_catalog()
+        if isinstance(instance, Stylist):
+            invalidate_booking_codes(stylist_id=instance.pk)
+        else:
+            availability_cache.invalidate_booking_links()
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Stylist)
+@receiver(post_delete, sender=Stylist)
+@receiver(post_save, sender=StylistService)
+@receiver(post_delete, sender=StylistService)
+def invalidate_catalog_snapshot(sender, instance, **kwargs):
+    """サービス・スタイリスト一覧のスナップショットを作り直させる"""
+    availability_cache.invalidate_catalog()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_catalog_for_stylist_user(sender, instance, update_fields=None, **kwargs):
+    """スタイリストのユーザー情報はスタイリスト一覧に含まれる（ログイン時の last_login 更新は対象外）"""
+    if instance.user_type == 'stylist' and set(update_fields or ()) != {'last_login'}:
+        availability_cache.invalidate_catalog()
+        invalidate_booking_codes(stylist__user_id=instance.pk)
+
+
+def invalidate_booking_codes(**filters):
+    """条件に一致するブッキングリンクの応答（プロセス内 LRU）を無効化"""
+    codes = StylistBookingLink.objects.filter(**filters).values_list('unique_code', flat=True)
+    availability_cache.invalidate_booking_link(*codes)
+
+
+@receiver(post_save, sender=StylistBookingLink)
+@receiver(post_delete, sender=StylistBookingLink)
+def invalidate_booking_link(sender, instance, **kwargs):
+    availability_cache.invalidate_booking_link(instance.unique_code)
+
+
+@receiver(post_save, sender=Stylist)
+@receiver(post_delete, sender=Stylist)
+def invalidate_stylist_booking_link(sender, instance, **kwargs):
+    invalidate_booking_codes(stylist_id=instance.pk)
+
+
+@receiver(post_save, sender=StylistService)
+@receiver(post_delete, sender=StylistService)
+def invalidate_offer_booking_link(sender, instance, **kwargs):
+    invalidate_booking_codes(stylist_id=instance.stylist_id)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_all_booking_links(sender, instance, **kwargs):
+    """サービス名・料金はすべてのブッキングコードの応答に含まれうる"""
+    availability_cache.invalidate_booking_links()
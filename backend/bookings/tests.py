@@ -1,3 +1,805 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+import threading
+from importlib import import_module
+from unittest import mock
+from datetime import date, time, timedelta
+from unittest import skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User, Badge, Salon, StylistProfile
+from referrals.models import ReferralLink, Referral
+from . import cache as catalog_cache
+from .availability import (
+    ACTIVE_STATUSES, BusySchedule, day_bounds, free_start_bitmap, get_busy_schedule, load_day_occupancies,
+    occupancy_bitmap, range_mask, time_to_cell, walk_in_start_bitmaps
+)
+from .models import (
+    Service, Stylist, StylistService, StylistBookingLink, Appointment, ManualAppointment, StylistDayOccupancy
+)
 
-# Create your tests here.
+
+class AppointmentListQueryCountTest(TestCase):
+    """予約一覧のクエリ数が件数に依存しないことを確認"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.stylist_user = User.objects.create_user(
+            username='stylist', password='password123', user_type='stylist'
+        )
+        self.stylist = Stylist.objects.create(user=self.stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+        self.start = timezone.now() + timedelta(days=1)
+        self.customer_count = 0
+    
+    def create_appointments(self, count):
+        for i in range(count):
+            self.customer_count += 1
+            customer = User.objects.create_user(username=f'customer{self.customer_count}')
+            Badge.objects.create(user=customer, badge_type='bronze')
+            link = ReferralLink.objects.create(referrer=customer)
+            Referral.objects.create(
+                referrer=customer, referred_user=self.stylist_user,
+                referral_link=link, is_successful=True
+            )
+            Appointment.objects.create(
+                customer=customer,
+                stylist=self.stylist,
+                service=self.service,
+                appointment_date=self.start + timedelta(hours=self.customer_count),
+                total_amount=self.service.price
+            )
+    
+    def count_list_queries(self, params=None):
+        self.client.force_authenticate(self.stylist_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('appointment_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()['results']
+    
+    def test_query_count_is_constant(self):
+        self.create_appointments(1)
+        single_count, _ = self.count_list_queries()
+        
+        self.create_appointments(14)
+        many_count, data = self.count_list_queries()
+        
+        self.assertEqual(len(data), 15)
+        self.assertEqual(single_count, many_count)
+        self.assertEqual(many_count, 2)
+    
+    def test_customer_aggregates(self):
+        self.create_appointments(3)
+        count, data = self.count_list_queries({'expand': 'customer'})
+        
+        self.assertEqual(count, 2)
+        customer = data[0]['customer']
+        self.assertEqual(customer['total_bookings'], 1)
+        self.assertEqual(customer['referral_count'], 1)
+        self.assertEqual([b['name'] for b in customer['badges']], ['ブロンズ'])
+        self.assertEqual(data[0]['stylist']['user']['username'], 'stylist')
+    
+    def test_customer_summary_by_default(self):
+        self.create_appointments(1)
+        _, data = self.count_list_queries()
+        
+        self.assertEqual(
+            set(data[0]['customer']),
+            {'id', 'username', 'first_name', 'last_name', 'display_name', 'profile_image'}
+        )
+    
+    def test_sparse_fields(self):
+        self.create_appointments(2)
+        _, data = self.count_list_queries({'fields': 'id,customer.display_name,stylist.user.id'})
+        
+        self.assertEqual(set(data[0]), {'id', 'customer', 'stylist'})
+        self.assertEqual(data[0]['customer'], {'display_name': 'customer2'})
+        self.assertEqual(data[0]['stylist'], {'user': {'id': self.stylist_user.id}})
+
+
+class AppointmentListPaginationTest(TestCase):
+    """予約一覧のカーソルページネーションと絞り込み"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(username='customer')
+        stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.stylist = Stylist.objects.create(user=stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        self.base = timezone.make_aware(timezone.datetime(2030, 1, 10, 10, 0))
+        self.client.force_authenticate(self.customer)
+    
+    def create_appointment(self, appointment_date, status='RESERVED'):
+        return Appointment.objects.create(
+            customer=self.customer,
+            stylist=self.stylist,
+            service=self.service,
+            appointment_date=appointment_date,
+            status=status,
+            total_amount=self.service.price
+        )
+    
+    def test_walks_all_pages_without_duplicates(self):
+        expected = []
+        for day in range(5):
+            # 同じ日時の予約を含めて id での並びを確認
+            for _ in range(2):
+                expected.append(self.create_appointment(self.base + timedelta(days=day)).id)
+        expected.sort(key=lambda pk: (Appointment.objects.get(pk=pk).appointment_date, pk), reverse=True)
+        
+        seen = []
+        url = reverse('appointment_list') + '?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data['results']), 3)
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        
+        self.assertEqual(seen, expected)
+    
+    def test_status_and_date_filters(self):
+        self.create_appointment(self.base)
+        cancelled = self.create_appointment(self.base + timedelta(days=1), status='CANCELLED')
+        later = self.create_appointment(self.base + timedelta(days=2))
+        
+        response = self.client.get(reverse('appointment_list'), {'status': 'CANCELLED'})
+        self.assertEqual([item['id'] for item in response.json()['results']], [cancelled.id])
+        
+        response = self.client.get(reverse('appointment_list'), {'date_from': '2030-01-11', 'date_to': '2030-01-12'})
+        self.assertEqual([item['id'] for item in response.json()['results']], [later.id, cancelled.id])
+    
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('appointment_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    """同じ時間枠への同時予約で、成功するのが1件だけであることを確認"""
+    
+    THREADS = 8
+    
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('インメモリSQLiteではスレッドごとの接続を分けられないため')
+        stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.stylist = Stylist.objects.create(user=stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+        self.customers = [
+            User.objects.create_user(username=f'customer{i}') for i in range(self.THREADS)
+        ]
+        self.appointment_date = (timezone.localdate() + timedelta(days=1)).isoformat()
+    
+    def book(self, customer, start_time, barrier, results):
+        client = APIClient()
+        client.force_authenticate(customer)
+        try:
+            barrier.wait()
+            response = client.post(reverse('create_appointment'), {
+                'stylist': self.stylist.id,
+                'service': self.service.id,
+                'appointment_date': self.appointment_date,
+                'start_time': start_time,
+                'payment_method': 'in_person',
+            }, format='json')
+            results.append(response.status_code)
+        finally:
+            connection.close()
+    
+    def run_parallel(self, start_times):
+        barrier = threading.Barrier(len(start_times))
+        results = []
+        threads = [
+            threading.Thread(target=self.book, args=(customer, start_time, barrier, results))
+            for customer, start_time in zip(self.customers, start_times)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+    
+    def test_exactly_one_booking_succeeds(self):
+        results = self.run_parallel(['10:00'] * self.THREADS)
+        
+        self.assertEqual(results.count(200), 1, results)
+        self.assertEqual(results.count(409), self.THREADS - 1, results)
+        self.assertEqual(Appointment.objects.filter(stylist=self.stylist).count(), 1)
+    
+    def test_overlapping_slots_are_rejected(self):
+        # 60分のサービスなので 10:00 と 10:30 は重なる
+        results = self.run_parallel(['10:00', '10:30'])
+        
+        self.assertEqual(sorted(results), [200, 409])
+        self.assertEqual(Appointment.objects.filter(stylist=self.stylist).count(), 1)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN の出力形式は PostgreSQL 前提')
+class HotPathIndexUsageTest(TestCase):
+    """予約のホットパスのクエリが専用の索引を使うことを確認"""
+    
+    def explain(self, queryset):
+        # テーブルが小さいとシーケンシャルスキャンが選ばれるため、索引が使えるかだけを確認する
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+    
+    def test_schedule_query_uses_stylist_date_index(self):
+        start, end = day_bounds(date(2030, 1, 10))
+        plan = self.explain(Appointment.objects.filter(
+            stylist_id=1,
+            appointment_date__gte=start,
+            appointment_date__lt=end,
+            status__in=ACTIVE_STATUSES
+        ))
+        self.assertRegex(plan, 'appt_stylist_(schedule|history)_idx')
+    
+    def test_customer_history_uses_customer_index(self):
+        plan = self.explain(Appointment.objects.filter(customer_id=1).order_by('-appointment_date', '-id')[:20])
+        self.assertIn('appt_customer_history_idx', plan)
+    
+    def test_manual_schedule_query_uses_index(self):
+        start, end = day_bounds(date(2030, 1, 10))
+        plan = self.explain(ManualAppointment.objects.filter(
+            stylist_id=1,
+            appointment_date__gte=start,
+            appointment_date__lt=end
+        ))
+        self.assertIn('manual_appt_schedule_idx', plan)
+    
+    def test_stylist_service_lookup_uses_index(self):
+        plan = self.explain(StylistService.objects.filter(
+            stylist_id=1,
+            service_id=1,
+            is_available=True
+        ).values('duration_minutes'))
+        self.assertRegex(plan, 'stylist_id_service_id_.*_uniq')
+
+
+class ConditionalGetTest(TestCase):
+    """読み取り専用 GET の ETag / 304 / 圧縮"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.stylist = Stylist.objects.create(user=self.stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+        self.day = timezone.localdate() + timedelta(days=3)
+    
+    def test_service_list_not_modified(self):
+        response = self.client.get(reverse('service_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        etag = response['ETag']
+        
+        response = self.client.get(reverse('service_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        
+        self.service.price = 5500
+        self.service.save()
+        response = self.client.get(reverse('service_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_stylist_list_changes_with_legacy_services(self):
+        etag = self.client.get(reverse('stylist_list'))['ETag']
+        self.stylist.services.add(self.service)
+        response = self.client.get(reverse('stylist_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_available_slots_change_after_booking(self):
+        params = {'date': self.day.isoformat(), 'stylist_id': self.stylist.id, 'service_id': self.service.id}
+        etag = self.client.get(reverse('available_time_slots'), params)['ETag']
+        self.assertEqual(
+            self.client.get(reverse('available_time_slots'), params, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        
+        start, _ = day_bounds(self.day)
+        appointment = Appointment.objects.create(
+            customer=self.stylist_user, stylist=self.stylist, service=self.service,
+            appointment_date=start + timedelta(hours=10), total_amount=5000
+        )
+        etag = self.client.get(reverse('available_time_slots'), params, HTTP_IF_NONE_MATCH=etag)['ETag']
+        
+        # 削除では max(updated_at) は変わらないが件数で検知する
+        appointment.delete()
+        response = self.client.get(reverse('available_time_slots'), params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_invalid_parameters_have_no_etag(self):
+        response = self.client.get(reverse('available_time_slots'), {'date': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+    
+    def test_gzip(self):
+        for i in range(10):
+            Service.objects.create(name=f'メニュー{i}', description='説明' * 20, duration_minutes=30, price=3000)
+        response = self.client.get(reverse('service_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        etag = response['ETag']
+        
+        response = self.client.get(reverse('service_list'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class CatalogSnapshotTest(TestCase):
+    """公開カタログがレンダリング済みのスナップショットから返り、変更で作り直されることを確認"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.stylist = Stylist.objects.create(user=self.stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+    
+    def test_served_without_queries(self):
+        first = self.client.get(reverse('stylist_list'))
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('stylist_list'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second.json()['results'][0]['stylist_services'][0]['duration_minutes'], 60)
+    
+    def test_rebuilt_after_changes(self):
+        self.client.get(reverse('stylist_list'))
+        offer = StylistService.objects.get(stylist=self.stylist)
+        offer.duration_minutes = 90
+        offer.save()
+        data = self.client.get(reverse('stylist_list')).json()
+        self.assertEqual(data['results'][0]['stylist_services'][0]['duration_minutes'], 90)
+        
+        self.stylist_user.first_name = '花子'
+        self.stylist_user.save()
+        data = self.client.get(reverse('stylist_list')).json()
+        self.assertEqual(data['results'][0]['user']['first_name'], '花子')
+    
+    def test_cache_key_ignores_unknown_parameters(self):
+        with mock.patch.object(catalog_cache, 'set_catalog_snapshot', wraps=catalog_cache.set_catalog_snapshot) as store:
+            self.client.get(reverse('service_list'))
+            for i in range(5):
+                response = self.client.get(reverse('service_list'), {'x': i})
+                self.assertEqual(response.status_code, 200)
+            self.client.get(reverse('service_list'), {'page': '01'})
+            self.client.get(reverse('service_list'), {'page': 'abc'})
+        self.assertEqual(store.call_count, 1)
+        
+        with self.assertNumQueries(0):
+            self.client.get(reverse('service_list'), {'page': 1})
+    
+    def test_links_follow_request_origin(self):
+        # ページ送りの絶対 URL は、最初にスナップショットを作ったリクエストのホスト・スキームを使い回さない
+        Service.objects.bulk_create([
+            Service(name=f'サービス{i}', duration_minutes=30, price=1000) for i in range(20)
+        ])
+        first = self.client.get(reverse('service_list')).json()
+        self.assertTrue(first['next'].startswith('http://testserver/'))
+        second = self.client.get(reverse('service_list'), HTTP_HOST='localhost', secure=True).json()
+        self.assertTrue(second['next'].startswith('https://localhost/'))
+        self.assertTrue(self.client.get(reverse('service_list')).json()['next'].startswith('http://testserver/'))
+    
+    def test_login_does_not_invalidate(self):
+        self.client.get(reverse('service_list'))
+        self.stylist_user.last_login = timezone.now()
+        self.stylist_user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('service_list'))
+
+
+class BookingCodeLookupTest(TestCase):
+    """ブッキングコード取得がプロセス内 LRU から返り、変更で無効化されることを確認"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.stylist = Stylist.objects.create(user=self.stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        self.offer = StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+        self.link = StylistBookingLink.objects.create(stylist=self.stylist)
+        self.url = reverse('get_stylist_by_booking_code', args=[self.link.unique_code])
+        self.client.force_authenticate(self.stylist_user)
+    
+    def test_cached_after_first_hit(self):
+        with self.assertNumQueries(3):
+            first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(first.json(), second.json())
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_invalidated_on_changes(self):
+        self.client.get(self.url)
+        self.offer.duration_minutes = 90
+        self.offer.save()
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['stylist']['stylist_services'][0]['duration_minutes'], 90)
+        
+        self.service.name = 'カット（シャンプー込み）'
+        self.service.save()
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['stylist']['stylist_services'][0]['service']['name'], 'カット（シャンプー込み）')
+        
+        self.link.allow_guest_booking = False
+        self.link.save()
+        self.assertFalse(self.client.get(self.url).json()['booking_settings']['allow_guest_booking'])
+        
+        self.link.is_active = False
+        self.link.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class AvailabilitySweepTest(TestCase):
+    """予約の時間帯のマージと、線形スイープによる空き時間枠の生成"""
+    
+    def setUp(self):
+        self.day = date(2030, 1, 10)
+        self.day_start, _ = day_bounds(self.day)
+    
+    def at(self, hour, minute=0):
+        return self.day_start + timedelta(hours=hour, minutes=minute)
+    
+    def starts(self, schedule, duration_minutes):
+        return [
+            timezone.localtime(start).strftime('%H:%M')
+            for start, _ in schedule.free_slots(self.day, duration_minutes)
+        ]
+    
+    def test_overlapping_and_adjacent_intervals_are_merged(self):
+        schedule = BusySchedule([
+            (self.at(13), self.at(14)),
+            (self.at(10), self.at(11)),
+            (self.at(10, 30), self.at(12)),
+            (self.at(12), self.at(12, 30)),
+        ])
+        self.assertEqual(list(schedule), [(self.at(10), self.at(12, 30)), (self.at(13), self.at(14))])
+    
+    def test_free_slots_skip_overlapping_starts(self):
+        schedule = BusySchedule([(self.at(10), self.at(11)), (self.at(12, 15), self.at(13))])
+        starts = self.starts(schedule, 60)
+        
+        # 予約の終了時刻ちょうどに始まる枠・開始時刻ちょうどに終わる枠は空き
+        self.assertIn('09:00', starts)
+        self.assertIn('11:00', starts)
+        self.assertNotIn('09:30', starts)
+        self.assertNotIn('10:30', starts)
+        self.assertNotIn('11:30', starts)
+        self.assertNotIn('12:00', starts)
+        self.assertIn('13:00', starts)
+        # 閉店時刻を越える枠は出さない
+        self.assertEqual(starts[-1], '17:00')
+    
+    def test_matches_pairwise_check(self):
+        schedule = BusySchedule([
+            (self.at(8, 30), self.at(9, 20)),
+            (self.at(11, 10), self.at(11, 40)),
+            (self.at(11, 30), self.at(12, 10)),
+            (self.at(15, 45), self.at(16)),
+            (self.at(17, 50), self.at(19)),
+        ])
+        for duration in (30, 45, 60, 90, 120):
+            expected = []
+            current = self.at(9)
+            while current + timedelta(minutes=duration) <= self.at(18):
+                end = current + timedelta(minutes=duration)
+                if all(end <= busy_start or busy_end <= current for busy_start, busy_end in schedule):
+                    expected.append((current, end))
+                    self.assertTrue(schedule.is_free(current, end))
+                else:
+                    self.assertFalse(schedule.is_free(current, end))
+                current += timedelta(minutes=30)
+            self.assertEqual(schedule.free_slots(self.day, duration), expected, duration)
+    
+    def test_busy_schedule_from_database(self):
+        customer = User.objects.create_user(username='customer')
+        stylist = Stylist.objects.create(user=User.objects.create_user(username='stylist', user_type='stylist'))
+        service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        StylistService.objects.create(stylist=stylist, service=service, duration_minutes=90)
+        Appointment.objects.create(
+            customer=customer, stylist=stylist, service=service,
+            appointment_date=self.at(10), total_amount=5000
+        )
+        Appointment.objects.create(
+            customer=customer, stylist=stylist, service=service,
+            appointment_date=self.at(14), status='CANCELLED', total_amount=5000
+        )
+        ManualAppointment.objects.create(
+            stylist=stylist, service=service, customer_name='電話予約', created_by=stylist.user,
+            appointment_date=self.at(15), duration_minutes=45
+        )
+        
+        with self.assertNumQueries(1):
+            schedule = get_busy_schedule(stylist, self.day)
+        # スタイリスト固有の所要時間（90分）で埋まり、キャンセル済みの予約は空きになる
+        self.assertEqual(list(schedule), [(self.at(10), self.at(11, 30)), (self.at(15), self.at(15, 45))])
+
+
+class WalkInAvailabilityTest(TestCase):
+    """指名なし予約の占有ビットマップと空き時間"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.salon = Salon.objects.create(
+            name='CiER', address='東京都', phone_number='0312345678', email='salon@example.com'
+        )
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        self.customer = User.objects.create_user(username='customer')
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.day_start, _ = day_bounds(self.day)
+    
+    def create_stylist(self, username, priority_level=1, **profile):
+        user = User.objects.create_user(username=username, user_type='stylist')
+        StylistProfile.objects.create(user=user, salon=self.salon, priority_level=priority_level, **profile)
+        return Stylist.objects.create(user=user)
+    
+    def book(self, stylist, hour, minute=0):
+        return Appointment.objects.create(
+            customer=self.customer, stylist=stylist, service=self.service,
+            appointment_date=self.day_start + timedelta(hours=hour, minutes=minute), total_amount=5000
+        )
+    
+    def start_cells(self, bitmap):
+        return {cell for cell in range(bitmap.bit_length()) if bitmap >> cell & 1}
+    
+    def test_partial_cells_are_occupied(self):
+        schedule = BusySchedule([
+            (self.day_start + timedelta(hours=10, minutes=2), self.day_start + timedelta(hours=10, minutes=28))
+        ])
+        self.assertEqual(
+            occupancy_bitmap(schedule, self.day_start),
+            range_mask(time_to_cell(time(10, 0)), time_to_cell(time(10, 30)))
+        )
+    
+    def test_free_start_bitmap_requires_consecutive_cells(self):
+        allowed = range_mask(0, 12)
+        occupancy = range_mask(4, 6)
+        # 3セル分空いている開始セルは 0, 1 と 6..9 だけ
+        self.assertEqual(self.start_cells(free_start_bitmap(occupancy, allowed, 3)), {0, 1, 6, 7, 8, 9})
+    
+    def test_start_bitmaps_per_stylist(self):
+        busy = self.create_stylist('busy', priority_level=1)
+        late = self.create_stylist('late', priority_level=2, working_hours_start=time(13, 0))
+        self.create_stylist('no-walk-in', accepts_walk_ins=False)
+        not_offered = self.create_stylist('not-offered')
+        StylistService.objects.create(stylist=busy, service=self.service, duration_minutes=90)
+        StylistService.objects.create(stylist=not_offered, service=self.service, duration_minutes=60, is_available=False)
+        self.book(busy, 11)
+        
+        with self.assertNumQueries(3):
+            bitmaps = walk_in_start_bitmaps(self.day, self.service)
+        
+        self.assertEqual(list(bitmaps), [busy.user_id, late.user_id])
+        busy_starts = self.start_cells(bitmaps[busy.user_id])
+        # 90分の個別設定で 11:00-12:30 が埋まるため、9:30 開始までと 12:30 開始以降が空き
+        self.assertIn(time_to_cell(time(9, 30)), busy_starts)
+        self.assertNotIn(time_to_cell(time(9, 35)), busy_starts)
+        self.assertNotIn(time_to_cell(time(12, 0)), busy_starts)
+        self.assertIn(time_to_cell(time(12, 30)), busy_starts)
+        self.assertEqual(max(busy_starts), time_to_cell(time(16, 30)))
+        self.assertEqual(min(self.start_cells(bitmaps[late.user_id])), time_to_cell(time(13, 0)))
+    
+    def available_times(self, params):
+        response = self.client.get(reverse('get_available_walk_in_times'), params)
+        return [slot['time'] for slot in response.json()['available_times']]
+    
+    def test_available_times_union_of_stylists(self):
+        first = self.create_stylist('first')
+        second = self.create_stylist('second')
+        self.book(first, 10)
+        params = {'date': self.day.isoformat(), 'service_id': self.service.id}
+        
+        times = self.available_times(params)
+        self.assertIn('10:00', times)
+        
+        self.book(second, 10)
+        times = self.available_times(params)
+        self.assertNotIn('09:30', times)
+        self.assertNotIn('10:00', times)
+        self.assertIn('11:00', times)
+
+
+class AvailabilityCalendarTest(TestCase):
+    """保存済みの日別占有ビットマップと、それを読むカレンダー"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(username='customer')
+        self.stylist = Stylist.objects.create(user=User.objects.create_user(username='stylist', user_type='stylist'))
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        self.offer = StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+        self.day = timezone.localdate() + timedelta(days=2)
+        self.day_start, _ = day_bounds(self.day)
+    
+    def book(self, hour, **kwargs):
+        return Appointment.objects.create(
+            customer=self.customer, stylist=self.stylist, service=self.service,
+            appointment_date=self.day_start + timedelta(hours=hour), total_amount=5000, **kwargs
+        )
+    
+    def calendar_starts(self, day=None):
+        day = day or self.day
+        response = self.client.get(reverse('availability_calendar'), {
+            'stylist_id': self.stylist.id,
+            'service_id': self.service.id,
+            'start_date': day.isoformat(),
+            'end_date': day.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return [slot['start_time'] for slot in response.json()['days'][0]['available_slots']]
+    
+    def stored(self, day=None):
+        day = day or self.day
+        return load_day_occupancies(self.stylist.id, day, day).get(day, 0)
+    
+    def test_booking_changes_update_stored_bitmap(self):
+        appointment = self.book(10)
+        self.assertEqual(self.stored(), range_mask(time_to_cell(time(10, 0)), time_to_cell(time(11, 0))))
+        self.assertNotIn('10:00', self.calendar_starts())
+        
+        # 別の日への変更では元の日も空きに戻る
+        appointment.appointment_date += timedelta(days=1)
+        appointment.save()
+        self.assertEqual(StylistDayOccupancy.objects.filter(stylist=self.stylist, date=self.day).count(), 0)
+        self.assertIn('10:00', self.calendar_starts())
+        self.assertNotIn('10:00', self.calendar_starts(self.day + timedelta(days=1)))
+        
+        appointment.status = 'CANCELLED'
+        appointment.save()
+        self.assertFalse(StylistDayOccupancy.objects.filter(stylist=self.stylist).exists())
+    
+    def test_manual_appointments_occupy_cells(self):
+        manual = ManualAppointment.objects.create(
+            stylist=self.stylist, service=self.service, customer_name='電話予約', created_by=self.stylist.user,
+            appointment_date=self.day_start + timedelta(hours=14), duration_minutes=30
+        )
+        self.assertNotIn('14:00', self.calendar_starts())
+        manual.delete()
+        self.assertIn('14:00', self.calendar_starts())
+    
+    def test_duration_changes_rebuild_bitmaps(self):
+        self.book(10)
+        self.offer.duration_minutes = 90
+        self.offer.save()
+        self.assertEqual(self.stored(), range_mask(time_to_cell(time(10, 0)), time_to_cell(time(11, 30))))
+        
+        # 個別設定のない予約はサービス標準の所要時間に従う
+        self.offer.delete()
+        self.service.duration_minutes = 120
+        self.service.save()
+        self.assertEqual(self.stored(), range_mask(time_to_cell(time(10, 0)), time_to_cell(time(12, 0))))
+    
+    def test_backfill_migration(self):
+        self.book(10)
+        self.book(15, status='CANCELLED')
+        StylistDayOccupancy.objects.all().delete()
+        
+        # マイグレーション実行時と同じ履歴モデルで実行する
+        historical_apps = MigrationLoader(connection).project_state(
+            ('bookings', '0007_backfill_stylistdayoccupancy')
+        ).apps
+        migration = import_module('bookings.migrations.0007_backfill_stylistdayoccupancy')
+        migration.backfill_day_occupancy(historical_apps, None)
+        self.assertEqual(self.stored(), range_mask(time_to_cell(time(10, 0)), time_to_cell(time(11, 0))))
+    
+    def test_calendar_is_limited_to_bookable_range(self):
+        StylistBookingLink.objects.create(stylist=self.stylist, max_advance_days=3)
+        today = timezone.localdate()
+        response = self.client.get(reverse('availability_calendar'), {
+            'stylist_id': self.stylist.id,
+            'service_id': self.service.id,
+            'start_date': (today - timedelta(days=5)).isoformat(),
+            'end_date': (today + timedelta(days=30)).isoformat(),
+        })
+        days = [day['date'] for day in response.json()['days']]
+        self.assertEqual(days[0], today.isoformat())
+        self.assertEqual(days[-1], (today + timedelta(days=3)).isoformat())
+
+
+class AvailabilityCacheTest(TestCase):
+    """空き時間のキャッシュが書き込みで無効化され、予約済みの時間枠を返さないことを確認"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.customer = User.objects.create_user(username='customer')
+        salon = Salon.objects.create(name='CiER', address='東京都', phone_number='0312345678', email='salon@example.com')
+        stylist_user = User.objects.create_user(username='stylist', user_type='stylist')
+        self.profile = StylistProfile.objects.create(user=stylist_user, salon=salon)
+        self.stylist = Stylist.objects.create(user=stylist_user)
+        self.service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        self.offer = StylistService.objects.create(stylist=self.stylist, service=self.service, duration_minutes=60)
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.day_start, _ = day_bounds(self.day)
+    
+    def slots(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('available_time_slots'), {
+                'date': self.day.isoformat(), 'stylist_id': self.stylist.id, 'service_id': self.service.id
+            })
+        computed = any('UNION' in query['sql'] for query in context.captured_queries)
+        return [slot['start_time'] for slot in response.json()['available_slots']], computed
+    
+    def walk_in_times(self):
+        response = self.client.get(reverse('get_available_walk_in_times'), {
+            'date': self.day.isoformat(), 'service_id': self.service.id
+        })
+        return [slot['time'] for slot in response.json()['available_times']]
+    
+    def test_cached_until_booking(self):
+        starts, computed = self.slots()
+        self.assertTrue(computed)
+        self.assertIn('10:00', starts)
+        self.assertEqual(self.slots(), (starts, False))
+        
+        appointment = Appointment.objects.create(
+            customer=self.customer, stylist=self.stylist, service=self.service,
+            appointment_date=self.day_start + timedelta(hours=10), total_amount=5000
+        )
+        starts, computed = self.slots()
+        self.assertTrue(computed)
+        self.assertNotIn('10:00', starts)
+        
+        appointment.status = 'CANCELLED'
+        appointment.save()
+        self.assertIn('10:00', self.slots()[0])
+    
+    def test_manual_appointment_and_duration_changes(self):
+        self.slots()
+        ManualAppointment.objects.create(
+            stylist=self.stylist, service=self.service, customer_name='電話予約', created_by=self.stylist.user,
+            appointment_date=self.day_start + timedelta(hours=12), duration_minutes=30
+        )
+        starts, _ = self.slots()
+        self.assertNotIn('11:30', starts)
+        self.assertIn('11:00', starts)
+        
+        self.offer.duration_minutes = 90
+        self.offer.save()
+        self.assertNotIn('11:00', self.slots()[0])
+    
+    def test_walk_in_times_invalidated(self):
+        self.assertIn('10:00', self.walk_in_times())
+        Appointment.objects.create(
+            customer=self.customer, stylist=self.stylist, service=self.service,
+            appointment_date=self.day_start + timedelta(hours=10), total_amount=5000
+        )
+        self.assertNotIn('10:00', self.walk_in_times())
+        
+        self.profile.working_hours_start = time(13, 0)
+        self.profile.save()
+        self.assertNotIn('12:00', self.walk_in_times())
+    
+    def test_read_before_commit_is_not_reused(self):
+        def book_and_read():
+            Appointment.objects.create(
+                customer=self.customer, stylist=self.stylist, service=self.service,
+                appointment_date=self.day_start + timedelta(hours=10), total_amount=5000
+            )
+            # コミット前に読んだ結果がキャッシュされても、コミット時の差し替えで使われなくなる
+            self.assertNotIn('10:00', self.slots()[0])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            book_and_read()
+        self.assertTrue(self.slots()[1])
+    
+    def test_multiple_workers_require_shared_cache(self):
+        env = dict(os.environ, WEB_CONCURRENCY='2', DJANGO_SETTINGS_MODULE='cier_project.settings')
+        env.pop('CACHE_BACKEND', None)
+        result = subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup()'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('ImproperlyConfigured', result.stderr)
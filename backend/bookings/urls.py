@@ -7,6 +7,7 @@ urlpatterns = [
     path('appointments/', views.create_appointment, name='create_appointment'),
     path('appointments/list/', views.appointment_list, name='appointment_list'),
     path('appointments/available-slots/', views.get_available_time_slots, name='available_time_slots'),
+    path('appointments/availability-calendar/', views.get_availability_calendar, name='availability_calendar'),
     path('stripe/webhook/', views.stripe_webhook, name='stripe_webhook'),
     
     # ブッキングリンク管理
@@ -6,33 +6,55 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta, time
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from .models import Service, Stylist, Appointment, StylistService, StylistBookingLink, ManualAppointment
 from .serializers import (
     ServiceSerializer,
     StylistSerializer,
     AppointmentCreateSerializer,
     AppointmentSerializer,
+    AppointmentListSerializer,
     StylistBookingLinkSerializer,
     ManualAppointmentSerializer,
     ManualAppointmentCreateSerializer
 )
 from .permissions import IsAuthenticatedOrGuestWithReferral
-from referrals.models import ReferralLink, Referral
+from .availability import (
+    day_bounds,
+    get_busy_schedule,
+    format_slot,
+    walk_in_start_bitmaps,
+    slot_start_cells,
+    cell_to_time,
+    free_cell_slots,
+    load_day_occupancies
+)
+from . import cache as availability_cache
+from . import etags
+from .catalog import CatalogSnapshotMixin
+from .booking_codes import get_booking_code_payload
+from .reservations import SlotUnavailable, reserve_slot, reserve_walk_in, service_duration
+from referrals.codes import lookup_referral_code
+from referrals.models import Referral
+from cier_project.pagination import KeysetPagination
+from cier_project.conditional import conditional_get, patch_revalidation_headers
 import stripe
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(CatalogSnapshotMixin, generics.ListAPIView):
     """サービス一覧"""
-    queryset = Service.objects.filter(is_active=True)
+    queryset = Service.objects.filter(is_active=True).order_by('id')
     serializer_class = ServiceSerializer
     permission_classes = []
 
 
-class StylistListView(generics.ListAPIView):
+class StylistListView(CatalogSnapshotMixin, generics.ListAPIView):
     """スタイリスト一覧"""
-    queryset = Stylist.objects.filter(is_available=True)
+    queryset = Stylist.objects.filter(is_available=True).select_related('user').prefetch_related(
+        'services', 'stylist_services__service'
+    ).order_by('id')
     serializer_class = StylistSerializer
     permission_classes = []
 
@@ -50,51 +72,6 @@ def create_appointment(request):
         auto_assign = request.data.get('auto_assign', False)  # 自動割り当てフラグ
         pay_now = (payment_method == 'online')
         
-        # 自動割り当ての場合、スタイリストを自動選択
-        if auto_assign and not serializer.validated_data.get('stylist'):
-            from accounts.models import StylistProfile
-            
-            appointment_date = serializer.validated_data['appointment_date']
-            appointment_datetime = datetime.combine(appointment_date, start_time) if start_time else None
-            
-            if appointment_datetime:
-                # 利用可能なスタイリストを優先度順で取得
-                available_profiles = StylistProfile.objects.filter(
-                    is_active=True,
-                    accepts_walk_ins=True
-                ).order_by('priority_level')
-                
-                assigned_stylist = None
-                for profile in available_profiles:
-                    if profile.is_available_at(appointment_datetime):
-                        # 既存の予約をチェック
-                        existing_appointment = Appointment.objects.filter(
-                            stylist__user=profile.user,
-                            appointment_date=appointment_date,
-                            start_time=start_time
-                        ).exists()
-                        
-                        if not existing_appointment:
-                            # 対応するStylistモデルを取得または作成
-                            stylist, created = Stylist.objects.get_or_create(
-                                user=profile.user,
-                                defaults={
-                                    'bio': profile.bio,
-                                    'experience_years': profile.experience_years,
-                                    'is_available': True
-                                }
-                            )
-                            assigned_stylist = stylist
-                            break
-                
-                if assigned_stylist:
-                    serializer.validated_data['stylist'] = assigned_stylist
-                else:
-                    return Response({
-                        'error': '指定時間に利用可能なスタイリストがいません。',
-                        'available_times': []  # TODO: 利用可能な時間を提案
-                    }, status=status.HTTP_400_BAD_REQUEST)
-        
         # ゲスト予約の場合、一時的なユーザーを作成または取得
         customer = request.user
         if not request.user.is_authenticated and guest_info:
@@ -118,30 +95,72 @@ def create_appointment(request):
                         customer.profile.phone_number = guest_info.get('phone_number', '')
                         customer.profile.save()
         
-        # 基本的な予約作成
-        appointment = serializer.save(
-            customer=customer,
-            requires_payment=pay_now,
-            total_amount=serializer.validated_data['service'].price
-        )
+        # 日付と開始時刻から予約日時を確定
+        appointment_date = serializer.validated_data.pop('appointment_date')
+        if start_time:
+            try:
+                appointment_date = timezone.make_aware(datetime.combine(
+                    timezone.localtime(appointment_date).date(),
+                    datetime.strptime(start_time, '%H:%M').time()
+                ))
+            except ValueError:
+                return Response(
+                    {'error': '開始時刻の形式が正しくありません (HH:MM)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if appointment_date <= timezone.now():
+                return Response(
+                    {'error': '予約日時は現在時刻より後に設定してください。'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        service = serializer.validated_data['service']
+        
+        def save_appointment(stylist):
+            return serializer.save(
+                customer=customer,
+                stylist=stylist,
+                appointment_date=appointment_date,
+                requires_payment=pay_now,
+                total_amount=service.price
+            )
+        
+        # スタイリストをロックして空きを確認してから予約作成（同時予約による二重予約を防止）
+        if auto_assign and not serializer.validated_data.get('stylist'):
+            # 自動割り当ての場合、優先度順に空いているスタイリストを選択
+            try:
+                appointment = reserve_walk_in(service, appointment_date, save_appointment)
+            except SlotUnavailable:
+                return Response({
+                    'error': '指定時間に利用可能なスタイリストがいません。',
+                    'available_times': []  # TODO: 利用可能な時間を提案
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            stylist = serializer.validated_data['stylist']
+            try:
+                appointment = reserve_slot(
+                    stylist.id,
+                    appointment_date,
+                    service_duration(stylist.id, service),
+                    lambda: save_appointment(stylist)
+                )
+            except SlotUnavailable:
+                return Response(
+                    {'error': '指定の時間帯はすでに予約が入っています。'},
+                    status=status.HTTP_409_CONFLICT
+                )
         
         # 紹介コードの処理
         if referral_code:
-            try:
-                referral_link = ReferralLink.objects.get(
-                    referral_code=referral_code,
-                    is_active=True
+            referral_entry = lookup_referral_code(referral_code, verify=True)
+            if referral_entry and referral_entry['referrer_id'] != customer.pk:
+                referral = Referral.objects.create(
+                    referrer_id=referral_entry['referrer_id'],
+                    referred_user=customer,
+                    referral_link_id=referral_entry['link_id'],
+                    appointment=appointment,
+                    is_successful=True  # 予約完了時点で成功とみなす
                 )
-                if referral_link.referrer != customer:
-                    referral = Referral.objects.create(
-                        referrer=referral_link.referrer,
-                        referred_user=customer,
-                        referral_link=referral_link,
-                        appointment=appointment,
-                        is_successful=True  # 予約完了時点で成功とみなす
-                    )
-            except ReferralLink.DoesNotExist:
-                pass
         
         # 支払い処理
         if pay_now:
@@ -151,7 +170,7 @@ def create_appointment(request):
                     # 開発環境でのモック決済
                     mock_checkout_url = f'http://localhost:3001/checkout/mock?appointment_id={appointment.id}&amount={int(appointment.total_amount)}'
                     return Response({
-                        'appointment': AppointmentSerializer(appointment).data,
+                        'appointment': AppointmentSerializer(appointment, context={'request': request}).data,
                         'checkout_url': mock_checkout_url
                     })
                 else:
@@ -177,7 +196,7 @@ def create_appointment(request):
                     )
                     
                     return Response({
-                        'appointment': AppointmentSerializer(appointment).data,
+                        'appointment': AppointmentSerializer(appointment, context={'request': request}).data,
                         'checkout_url': checkout_session.url
                     })
             except Exception as e:
@@ -189,17 +208,23 @@ def create_appointment(request):
         else:
             # 支払いなしの場合はそのまま予約確定
             return Response({
-                'appointment': AppointmentSerializer(appointment).data,
+                'appointment': AppointmentSerializer(appointment, context={'request': request}).data,
                 'message': '予約が確定しました。お支払いは当日サロンでお願いします。'
             })
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AppointmentCursorPagination(KeysetPagination):
+    """予約履歴用のカーソルページネーション（(appointment_date, id) の降順）"""
+    ordering_field = 'appointment_date'
+    page_size = 20
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def appointment_list(request):
-    """予約一覧"""
+    """予約一覧（カーソルページネーション・ステータス/期間での絞り込み対応）"""
     if request.user.user_type == 'stylist':
         # スタイリストの場合、自分の予約を取得
         stylist = Stylist.objects.get(user=request.user)
@@ -208,8 +233,32 @@ def appointment_list(request):
         # 顧客の場合、自分の予約を取得
         appointments = Appointment.objects.filter(customer=request.user)
     
-    serializer = AppointmentSerializer(appointments, many=True)
-    return Response(serializer.data)
+    # フィルタリング（日付は索引を使えるよう半開区間の範囲条件にする）
+    status_filter = request.query_params.get('status')
+    date_from = request.query_params.get('date_from')
+    date_to = request.query_params.get('date_to')
+    
+    if status_filter:
+        appointments = appointments.filter(status__in=status_filter.split(','))
+    try:
+        if date_from:
+            day = datetime.strptime(date_from, '%Y-%m-%d').date()
+            appointments = appointments.filter(appointment_date__gte=day_bounds(day)[0])
+        if date_to:
+            day = datetime.strptime(date_to, '%Y-%m-%d').date()
+            appointments = appointments.filter(appointment_date__lt=day_bounds(day)[1])
+    except ValueError:
+        return Response(
+            {'error': '日付の形式が正しくありません (YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    paginator = AppointmentCursorPagination()
+    page = paginator.paginate_queryset(
+        AppointmentListSerializer.with_list_relations(appointments), request
+    )
+    serializer = AppointmentListSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['POST'])
@@ -253,6 +302,7 @@ def stripe_webhook(request):
 
 @api_view(['GET'])
 @permission_classes([])
+@conditional_get(etags.available_slots_version)
 def get_available_time_slots(request):
     """指定された日付、スタイリスト、サービスに対して利用可能な時間枠を返す"""
     date_str = request.GET.get('date')
@@ -266,7 +316,7 @@ def get_available_time_slots(request):
     
     try:
         appointment_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        stylist = Stylist.objects.get(id=stylist_id, is_available=True)
+        stylist = Stylist.objects.select_related('user').get(id=stylist_id, is_available=True)
         service = Service.objects.get(id=service_id, is_active=True)
         
         # スタイリスト固有のサービス設定を取得
@@ -274,7 +324,7 @@ def get_available_time_slots(request):
             stylist=stylist,
             service=service,
             is_available=True
-        ).first()
+        ).select_related('service').first()
         
         if not stylist_service:
             return Response({
@@ -286,57 +336,20 @@ def get_available_time_slots(request):
             'error': 'Invalid date, stylist, or service'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # 営業時間の設定 (9:00 - 18:00)
-    business_start = time(9, 0)
-    business_end = time(18, 0)
-    
     # スタイリスト固有の所要時間を使用
     service_duration = stylist_service.duration_minutes
     
-    # その日の既存の予約を取得
-    existing_appointments = Appointment.objects.filter(
-        stylist=stylist,
-        appointment_date__date=appointment_date,
-        status__in=['RESERVED', 'PAID']
-    ).order_by('appointment_date')
-    
-    # 利用可能な時間枠を生成
-    available_slots = []
-    current_time = datetime.combine(appointment_date, business_start)
-    end_of_day = datetime.combine(appointment_date, business_end)
-    
-    # 30分刻みで時間枠を生成
-    while current_time + timedelta(minutes=service_duration) <= end_of_day:
-        slot_start = current_time
-        slot_end = current_time + timedelta(minutes=service_duration)
-        
-        # この時間枠が既存の予約と重複していないかチェック
-        is_available = True
-        for appointment in existing_appointments:
-            # 既存予約の所要時間も考慮
-            existing_stylist_service = StylistService.objects.filter(
-                stylist=appointment.stylist,
-                service=appointment.service
-            ).first()
-            existing_duration = existing_stylist_service.duration_minutes if existing_stylist_service else appointment.service.duration_minutes
-            
-            existing_start = appointment.appointment_date
-            existing_end = existing_start + timedelta(minutes=existing_duration)
-            
-            # 時間枠の重複チェック
-            if (slot_start < existing_end and slot_end > existing_start):
-                is_available = False
-                break
-        
-        if is_available:
-            available_slots.append({
-                'start_time': slot_start.strftime('%H:%M'),
-                'end_time': slot_end.strftime('%H:%M'),
-                'display': f"{slot_start.strftime('%H:%M')} - {slot_end.strftime('%H:%M')}"
-            })
-        
-        # 次の30分刻みの時間に進む
-        current_time += timedelta(minutes=30)
+    # その日の既存の予約を1クエリで取得し、空き時間枠を線形スイープで生成（キャッシュ経由）
+    def compute_slots():
+        busy_schedule = get_busy_schedule(stylist, appointment_date)
+        return [
+            format_slot(slot_start, slot_end)
+            for slot_start, slot_end in busy_schedule.free_slots(appointment_date, service_duration)
+        ]
+    
+    available_slots = availability_cache.get_stylist_slots(
+        stylist.id, appointment_date, service_duration, compute_slots
+    )
     
     return Response({
         'available_slots': available_slots,
@@ -345,32 +358,67 @@ def get_available_time_slots(request):
         'stylist_name': stylist.user.username,
         'effective_price': stylist_service.effective_price
     })
+
+
+@api_view(['GET'])
+@permission_classes([])
+@conditional_get(etags.availability_calendar_version)
+def get_availability_calendar(request):
+    """指定期間（最大でブッキングリンクの最大事前予約日数まで）の日別空き時間枠を返す"""
+    stylist_id = request.GET.get('stylist_id')
+    service_id = request.GET.get('service_id')
+    start_date_str = request.GET.get('start_date')
+    end_date_str = request.GET.get('end_date')
     
-    # この時間枠が既存の予約と重複していないかチェック
-    is_available = True
-    for appointment in existing_appointments:
-        existing_start = appointment.appointment_date
-        existing_end = existing_start + timedelta(minutes=appointment.service.duration_minutes)
-        
-        # 時間枠の重複チェック
-        if (slot_start < existing_end and slot_end > existing_start):
-            is_available = False
-            break
-        
-        if is_available:
-            available_slots.append({
-                'start_time': slot_start.strftime('%H:%M'),
-                'end_time': slot_end.strftime('%H:%M'),
-                'display': f"{slot_start.strftime('%H:%M')} - {slot_end.strftime('%H:%M')}"
-            })
-        
-        # 次の30分刻みの時間に進む
-        current_time += timedelta(minutes=30)
+    if not all([stylist_id, service_id]):
+        return Response({
+            'error': 'stylist_id, service_id are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        stylist = Stylist.objects.select_related('user', 'booking_link').get(id=stylist_id, is_available=True)
+        stylist_service = StylistService.objects.select_related('service').get(
+            stylist=stylist,
+            service_id=service_id,
+            service__is_active=True,
+            is_available=True
+        )
+        today = timezone.localdate()
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else today
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else None
+    except (ValueError, Stylist.DoesNotExist, StylistService.DoesNotExist):
+        return Response({
+            'error': 'Invalid date, stylist, or service'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # 予約可能期間（今日からmax_advance_days日後まで）に制限
+    try:
+        max_advance_days = stylist.booking_link.max_advance_days
+    except StylistBookingLink.DoesNotExist:
+        max_advance_days = StylistBookingLink._meta.get_field('max_advance_days').default
+    last_bookable_date = today + timedelta(days=max_advance_days)
+    start_date = max(start_date, today)
+    end_date = min(end_date or last_bookable_date, last_bookable_date)
+    
+    service_duration = stylist_service.duration_minutes
+    occupancies = load_day_occupancies(stylist.id, start_date, end_date)
+    
+    days = []
+    day = start_date
+    while day <= end_date:
+        days.append({
+            'date': day.isoformat(),
+            'available_slots': free_cell_slots(day, occupancies.get(day, 0), service_duration)
+        })
+        day += timedelta(days=1)
     
     return Response({
-        'available_slots': available_slots,
+        'days': days,
+        'max_advance_days': max_advance_days,
         'service_duration': service_duration,
-        'service_name': service.name
+        'service_name': stylist_service.service.name,
+        'stylist_name': stylist.user.username,
+        'effective_price': stylist_service.effective_price
     })
 
 
@@ -418,25 +466,18 @@ def manage_booking_link(request):
 
 @api_view(['GET'])
 def get_stylist_by_booking_code(request, booking_code):
-    """ブッキングコードからスタイリスト情報を取得"""
-    try:
-        booking_link = StylistBookingLink.objects.get(
-            unique_code=booking_code,
-            is_active=True
-        )
-        serializer = StylistSerializer(booking_link.stylist)
-        return Response({
-            'stylist': serializer.data,
-            'booking_settings': {
-                'max_advance_days': booking_link.max_advance_days,
-                'allow_guest_booking': booking_link.allow_guest_booking
-            }
-        })
-    except StylistBookingLink.DoesNotExist:
+    """ブッキングコードからスタイリスト情報を取得（プロセス内 LRU キャッシュ経由）"""
+    result = get_booking_code_payload(booking_code, request)
+    if result is None:
         return Response(
             {'error': '無効なブッキングコードです'},
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    payload, etag = result
+    response = get_conditional_response(request, etag=etag, response=Response(payload, headers={'ETag': etag}))
+    patch_revalidation_headers(response, private=True)
+    return response
 
 
 # 手動予約管理のビュー
@@ -460,10 +501,19 @@ def manual_appointments(request):
         date_from = request.query_params.get('date_from')
         date_to = request.query_params.get('date_to')
         
-        if date_from:
-            appointments = appointments.filter(appointment_date__date__gte=date_from)
-        if date_to:
-            appointments = appointments.filter(appointment_date__date__lte=date_to)
+        # 日付は索引を使えるよう半開区間の範囲条件にする
+        try:
+            if date_from:
+                day = datetime.strptime(date_from, '%Y-%m-%d').date()
+                appointments = appointments.filter(appointment_date__gte=day_bounds(day)[0])
+            if date_to:
+                day = datetime.strptime(date_to, '%Y-%m-%d').date()
+                appointments = appointments.filter(appointment_date__lt=day_bounds(day)[1])
+        except ValueError:
+            return Response(
+                {'error': '日付の形式が正しくありません (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = ManualAppointmentSerializer(appointments, many=True)
         return Response(serializer.data)
@@ -472,10 +522,18 @@ def manual_appointments(request):
         # 手動予約を作成
         serializer = ManualAppointmentCreateSerializer(data=request.data)
         if serializer.is_valid():
-            manual_appointment = serializer.save(
-                stylist=stylist,
-                created_by=request.user
-            )
+            try:
+                manual_appointment = reserve_slot(
+                    stylist.id,
+                    serializer.validated_data['appointment_date'],
+                    serializer.validated_data['duration_minutes'],
+                    lambda: serializer.save(stylist=stylist, created_by=request.user)
+                )
+            except SlotUnavailable:
+                return Response(
+                    {'error': '指定の時間帯はすでに予約が入っています'},
+                    status=status.HTTP_409_CONFLICT
+                )
             
             # 通知を作成
             from notifications.views import create_notification
@@ -521,7 +579,19 @@ def manual_appointment_detail(request, appointment_id):
     elif request.method == 'PUT':
         serializer = ManualAppointmentSerializer(appointment, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                reserve_slot(
+                    stylist.id,
+                    serializer.validated_data.get('appointment_date', appointment.appointment_date),
+                    serializer.validated_data.get('duration_minutes', appointment.duration_minutes),
+                    serializer.save,
+                    exclude_manual_appointment=appointment.id
+                )
+            except SlotUnavailable:
+                return Response(
+                    {'error': '指定の時間帯はすでに予約が入っています'},
+                    status=status.HTTP_409_CONFLICT
+                )
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -535,7 +605,7 @@ def manual_appointment_detail(request, appointment_id):
 def create_walk_in_appointment(request):
     """指名なし予約専用エンドポイント（自動スタイリスト割り当て）"""
     from datetime import datetime
-    from accounts.models import StylistProfile, User
+    from accounts.models import User
     
     # 自動スタイリスト割り当てロジック
     appointment_date_str = request.data.get('appointment_date')
@@ -549,6 +619,8 @@ def create_walk_in_appointment(request):
     
     try:
         appointment_date = datetime.fromisoformat(appointment_date_str.replace('Z', '+00:00'))
+        if timezone.is_naive(appointment_date):
+            appointment_date = timezone.make_aware(appointment_date)
         service = Service.objects.get(id=service_id)
     except (ValueError, Service.DoesNotExist):
         return Response(
@@ -556,29 +628,6 @@ def create_walk_in_appointment(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # 利用可能なスタイリストを検索
-    available_profiles = StylistProfile.objects.filter(
-        is_active=True,
-        accepts_walk_ins=True
-    )
-    
-    best_stylist_user = None
-    for profile in available_profiles:
-        # 新しいAppointmentモデル（予定）を想定してUserを直接使用
-        # 実際のシステムでは、Appointmentモデルを新しいものに変更する必要があります
-        
-        # 仮想的な競合チェック（簡単版）
-        # 実際の本格運用時はより詳細なスケジュール管理が必要
-        
-        best_stylist_user = profile.user
-        break  # 最初に見つかったスタイリストを使用
-    
-    if not best_stylist_user:
-        return Response(
-            {'error': '利用可能なスタイリストがいません'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
     # walk-in予約用の簡単なユーザー作成（ゲストユーザー）
     try:
         customer_email = request.data.get('customer_email')
@@ -595,29 +644,28 @@ def create_walk_in_appointment(request):
             }
         )
         
-        # 古いStylistモデルが必要な場合は作成
-        stylist_obj, created = Stylist.objects.get_or_create(
-            user=best_stylist_user,
-            defaults={
-                'bio': f'{best_stylist_user.get_full_name()}のプロフィール',
-                'experience_years': 5,
-                'is_available': True
-            }
-        )
+        # 優先度順にスタイリストをロックして空きを確認し、最初に確保できたスタイリストで予約作成
+        def save_appointment(stylist):
+            return Appointment.objects.create(
+                customer=customer_user,
+                stylist=stylist,
+                service=service,
+                appointment_date=appointment_date,
+                status='RESERVED',
+                total_amount=service.price,
+                notes=request.data.get('notes', 'Walk-in予約（自動割り当て）'),
+                requires_payment=False
+            )
         
-        # 予約作成
-        appointment = Appointment.objects.create(
-            customer=customer_user,
-            stylist=stylist_obj,
-            service=service,
-            appointment_date=appointment_date,
-            status='RESERVED',
-            total_amount=service.price,
-            notes=request.data.get('notes', 'Walk-in予約（自動割り当て）'),
-            requires_payment=False
-        )
+        try:
+            appointment = reserve_walk_in(service, appointment_date, save_appointment)
+        except SlotUnavailable:
+            return Response(
+                {'error': '利用可能なスタイリストがいません'},
+                status=status.HTTP_409_CONFLICT
+            )
         
-        serializer = AppointmentSerializer(appointment)
+        serializer = AppointmentSerializer(appointment, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
         
     except Exception as e:
@@ -629,10 +677,9 @@ def create_walk_in_appointment(request):
 
 @api_view(['GET'])
 @permission_classes([])
+@conditional_get(etags.walk_in_times_version)
 def get_available_walk_in_times(request):
     """指名なし予約用の利用可能時間取得"""
-    from accounts.models import StylistProfile
-    
     date_str = request.GET.get('date')
     service_id = request.GET.get('service_id')
     
@@ -651,46 +698,24 @@ def get_available_walk_in_times(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # 利用可能なスタイリストを取得
-    available_profiles = StylistProfile.objects.filter(
-        is_active=True,
-        accepts_walk_ins=True
-    )
-    
-    available_times = []
-    time_slots = []
-    
-    # 9:00から18:00までの30分刻みのタイムスロットを生成
-    current_time = time(9, 0)
-    end_time = time(18, 0)
-    
-    while current_time < end_time:
-        time_slots.append(current_time)
-        current_time = (datetime.combine(appointment_date, current_time) + timedelta(minutes=30)).time()
-    
-    for time_slot in time_slots:
-        appointment_datetime = datetime.combine(appointment_date, time_slot)
-        
-        # 利用可能なスタイリストがいるかチェック
-        has_available_stylist = False
-        for profile in available_profiles:
-            if profile.is_available_at(appointment_datetime):
-                # 既存の予約をチェック（appointment_dateはDateTimeField）
-                existing_appointment = Appointment.objects.filter(
-                    stylist__user=profile.user,
-                    appointment_date=appointment_datetime
-                ).exists()
-                
-                if not existing_appointment:
-                    has_available_stylist = True
-                    break
+    # 全スタイリストの空き開始セルをORし、どれか1人でも所要時間分空いている枠を抽出（キャッシュ経由）
+    def compute_times():
+        available_starts = 0
+        for start_bitmap in walk_in_start_bitmaps(appointment_date, service).values():
+            available_starts |= start_bitmap
         
-        if has_available_stylist:
-            available_times.append({
-                'time': time_slot.strftime('%H:%M'),
-                'display': time_slot.strftime('%H:%M'),
-                'available': True
-            })
+        available_times = []
+        for cell in slot_start_cells():
+            if available_starts >> cell & 1:
+                time_slot = cell_to_time(cell)
+                available_times.append({
+                    'time': time_slot.strftime('%H:%M'),
+                    'display': time_slot.strftime('%H:%M'),
+                    'available': True
+                })
+        return available_times
+    
+    available_times = availability_cache.get_walk_in_times(appointment_date, service.id, compute_times)
     
     return Response({
         'date': date_str,
@@ -0,0 +1,62 @@
+"""
+読み取り専用 GET の条件付きレスポンス（ETag / 304 / Cache-Control）
+
+ビューの応答を作る前に、元になる行の max(updated_at) と件数から ETag を計算し、
+If-None-Match が一致すれば本体を生成せずに 304 を返す。件数を含めるのは削除を検知するため
+（削除では max(updated_at) が進まない）。Last-Modified は削除を表現できないため付けない。
+
+gzip 圧縮は GZipMiddleware が行う（圧縮時は ETag が弱い ETag になるが、If-None-Match は
+弱い比較のため 304 はそのまま返る）。
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+
+def table_version(queryset, *fields):
+    """queryset の各フィールド（既定は updated_at）の最大値と件数を1クエリで取得"""
+    fields = fields or ('updated_at',)
+    stats = queryset.order_by().aggregate(
+        count=Count('pk'),
+        **{f'latest_{i}': Max(field) for i, field in enumerate(fields)}
+    )
+    return tuple(stats[f'latest_{i}'] for i in range(len(fields))) + (stats['count'],)
+
+
+def patch_revalidation_headers(response, max_age=0, private=False):
+    """max-age を過ぎたら ETag で再検証させる Cache-Control / Vary を付ける"""
+    patch_cache_control(
+        response, max_age=max_age, must_revalidate=True,
+        **({'private': True} if private else {'public': True})
+    )
+    patch_vary_headers(response, ['Accept'] + (['Authorization'] if private else []))
+
+
+def conditional_get(version_func, max_age=0, private=False):
+    """
+    version_func(request, *args, **kwargs) が返す値から強い ETag を作るデコレーター
+
+    version_func が None を返した場合（不正なパラメータなど）は ETag を付けずにビューを実行する。
+    ETag にはパスとクエリ文字列、Accept ヘッダーも含めるため ?fields= やページごとに別の値になる。
+    """
+    def etag_func(request, *args, **kwargs):
+        version = version_func(request, *args, **kwargs)
+        if version is None:
+            return None
+        key = repr((request.get_full_path(), request.META.get('HTTP_ACCEPT', ''), version))
+        return '"%s"' % hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                patch_revalidation_headers(response, max_age=max_age, private=private)
+            return response
+        return wrapper
+    return decorator
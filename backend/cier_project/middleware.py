@@ -0,0 +1,32 @@
+import os
+
+from django.middleware.gzip import GZipMiddleware as BaseGZipMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class GZipMiddleware(BaseGZipMiddleware):
+    """
+    Django の GZipMiddleware から Server-Sent Events を除いたもの
+
+    非同期のストリーミングレスポンスはチャンクごとに独立した gzip になり、
+    イベントが小さいため圧縮の効果もないので、text/event-stream はそのまま返す。
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise の静的ファイル配信から、開発時の STATIC_ROOT の警告を除いたもの
+
+    DEBUG では静的ファイルを finders から直接配信し、collectstatic を実行しないため
+    STATIC_ROOT がないのが通常の状態になる。本番（finders を使わない場合）は従来どおり警告する。
+    """
+
+    def add_files(self, root, prefix=None):
+        if self.use_finders and root == self.static_root and not os.path.isdir(root):
+            return
+        super().add_files(root, prefix)
@@ -0,0 +1,98 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    (ordering_field, id) の降順によるキーセット（カーソル）ページネーション
+
+    OFFSET を使わず「前ページ最後の行より後ろ」を索引の範囲検索で読み、COUNT も行わないため、
+    履歴がどれだけ深くなっても1ページあたりの応答時間は一定。
+    ordering_field には DateTimeField を指定し、(絞り込み列, ordering_field, id) の複合索引を用意すること。
+    """
+    ordering_field = 'created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = '無効なカーソルです'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        field = self.ordering_field
+
+        queryset = queryset.order_by(f'-{field}', '-id')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = cursor
+            # (field, id) < (value, pk) を、field の範囲条件を先頭に置いた形で表現する
+            queryset = queryset.filter(**{f'{field}__lte': value}).filter(
+                Q(**{f'{field}__lt': value}) | Q(id__lt=pk)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_cursor = (
+            self.encode_cursor(getattr(results[-1], field), results[-1].id)
+            if self.has_next else None
+        )
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, value, pk):
+        payload = json.dumps({'v': value.isoformat(), 'id': pk}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            value = parse_datetime(payload['v'])
+            pk = int(payload['id'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,32 @@
+import codecs
+import re
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+from .renderers import ORJSONRenderer
+
+# orjson は 64 ビットを超える整数を float に丸めて読むため、19桁以上の数字を含む場合は標準の json で読む
+LONG_NUMBER = re.compile(rb'\d{19,}')
+
+
+class ORJSONParser(JSONParser):
+    """orjson による JSONParser（NaN / Infinity は標準の STRICT_JSON と同様に受け付けない）"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                data = data.decode(encoding).encode()
+            if LONG_NUMBER.search(data):
+                return json.loads(data, parse_constant=json.strict_constant if self.strict else None)
+            return orjson.loads(data)
+        except (ValueError, LookupError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
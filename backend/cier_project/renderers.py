@@ -0,0 +1,37 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    orjson による JSONRenderer
+
+    str / int / dict / list などは orjson がそのまま高速にエンコードし、それ以外の型
+    （Decimal, datetime, UUID, QuerySet, 遅延翻訳文字列など）は DRF の JSONEncoder に
+    委ねるため、これらは標準の JSONRenderer と同じ表現になる。
+    64 ビットを超える整数など orjson が扱えない値を含む場合は標準の JSONRenderer で出力する。
+
+    標準の JSONRenderer と異なる点:
+    - float の表記（1e20 は 1e+20 ではなく 1e20 になる。値は同じ）
+    - NaN / Infinity は null になる（標準ではエラー）
+    """
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder.default, option=option)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JavaScript に埋め込んでも安全なよう、標準の JSONRenderer と同様に U+2028/U+2029 をエスケープ
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
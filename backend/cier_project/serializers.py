@@ -0,0 +1,50 @@
+class SparseFieldsetsMixin:
+    """
+    ?fields= / ?expand= によるレスポンスの絞り込み・展開
+
+    - fields: 返すフィールドをカンマ区切りで指定する（例: ?fields=id,customer.display_name）。
+      ドット区切りでネストしたシリアライザーのフィールドも指定でき、指定のない階層は全フィールドを返す。
+    - expand: Meta.expandable_fields に定義したフィールドを詳細表現に差し替える（例: ?expand=customer,stylist.user）。
+      未指定のネストしたユーザー等は概要表現のまま返す。
+
+    除外したフィールドは値の計算自体が行われない。どちらも context に request がある場合のみ有効。
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None:
+            return fields
+
+        path = self.field_path()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in self.requested_names(request, 'expand', path) & set(expandable):
+            declared = fields[name]
+            fields[name] = expandable[name](*declared._args, **declared._kwargs)
+
+        only = self.requested_names(request, 'fields', path)
+        if only:
+            for name in set(fields) - only:
+                fields.pop(name)
+        return fields
+
+    def field_path(self):
+        """ルートのシリアライザーから自身までのフィールド名（many=True の ListSerializer は飛ばす）"""
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return '.'.join(reversed(names))
+
+    @staticmethod
+    def requested_names(request, param, path):
+        """クエリパラメータのうち path 直下のフィールド名"""
+        prefix = f'{path}.' if path else ''
+        names = set()
+        for entry in request.query_params.get(param, '').split(','):
+            entry = entry.strip()
+            if entry.startswith(prefix) and len(entry) > len(prefix):
+                names.add(entry[len(prefix):].split('.')[0])
+        return names
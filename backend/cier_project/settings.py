@@ -11,8 +11,10 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from urllib.parse import urlparse, unquote
+from decouple import config, Csv
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,7 +29,7 @@ SECRET_KEY = config('SECRET_KEY', default="django-insecure-#*=#zk#h+%g7m7^(95zr*
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = config('DEBUG', default=True, cast=bool)
 
-ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1,0.0.0.0', cast=Csv())
 
 
 # Application definition
@@ -51,6 +53,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "cier_project.middleware.WhiteNoiseMiddleware",
+    "cier_project.middleware.GZipMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -80,15 +84,145 @@ WSGI_APPLICATION = "cier_project.wsgi.application"
 
 
 # Database
-# https://docs.djangoproject.com/en/5.0/ref/settings/#databases
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# DATABASE_URL（例: postgresql://user:password@db:5432/cier_db）があればそれを使用し、
+# なければローカル開発用の SQLite を使用する
+
+def parse_database_url(url):
+    """PostgreSQL の接続URLを DATABASES の設定に変換"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('postgres', 'postgresql', 'pgsql'):
+        raise ImproperlyConfigured(f"DATABASE_URL のスキーム '{parsed.scheme}' には対応していません")
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": unquote(parsed.path.lstrip('/')),
+        "USER": unquote(parsed.username or ''),
+        "PASSWORD": unquote(parsed.password or ''),
+        "HOST": parsed.hostname or '',
+        "PORT": str(parsed.port or ''),
+    }
+
+
+DATABASE_URL = config('DATABASE_URL', default='')
+
+if DATABASE_URL:
+    DATABASES = {"default": parse_database_url(DATABASE_URL)}
+
+    if config('DB_POOL', default=True, cast=bool):
+        # psycopg3 のコネクションプール（プールと永続接続は併用できないため CONN_MAX_AGE は 0）
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                "max_size": config('DB_POOL_MAX_SIZE', default=10, cast=int),
+                "timeout": config('DB_POOL_TIMEOUT', default=10, cast=int),
+            },
+        }
+    else:
+        # プールを使わない場合は永続接続を再利用し、再利用前に接続を確認する
+        DATABASES["default"]["CONN_MAX_AGE"] = config('CONN_MAX_AGE', default=60, cast=int)
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # ロック待ちの秒数（busy timeout）
+                "timeout": 20,
+                # 書き込みトランザクションは開始時に書き込みロックを取得し、途中でのデッドロックを避ける
+                "transaction_mode": "IMMEDIATE",
+                # WAL モードで読み込みが書き込みにブロックされないようにする
+                "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            },
+            # 同時予約のテストでスレッドごとに別接続を使えるよう、テストDBはファイルにする
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
+        }
+    }
+
 
-DATABASES = {
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# 既定はプロセス内メモリ。共有キャッシュを使う場合は CACHE_BACKEND / CACHE_LOCATION を指定
+# （例: django.core.cache.backends.redis.RedisCache / redis://redis:6379/1）
+
+# アプリケーションのワーカープロセス数（gunicorn.conf.py と同じ環境変数）
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+
+CACHE_BACKEND = config('CACHE_BACKEND', default="django.core.cache.backends.locmem.LocMemCache")
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": config('CACHE_LOCATION', default="cier-default"),
     }
 }
 
+if CACHE_BACKEND.endswith("LocMemCache"):
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": 10000}
+    # 書き込み時の無効化（バージョントークンの差し替え）は同じプロセスにしか届かず、
+    # 他のワーカーが予約済みの時間枠を返し続けるため、複数ワーカーでは共有キャッシュを必須にする
+    if WEB_CONCURRENCY > 1:
+        raise ImproperlyConfigured(
+            "WEB_CONCURRENCY > 1 ではプロセス内メモリのキャッシュは使えません。"
+            "CACHE_BACKEND / CACHE_LOCATION で Redis などの共有キャッシュを指定してください"
+        )
+
+# 予約可能時間キャッシュの保持秒数（書き込み時はシグナルで即時無効化される）
+AVAILABILITY_CACHE_TIMEOUT = config('AVAILABILITY_CACHE_TIMEOUT', default=300, cast=int)
+
+# 紹介コード → 紹介者の対応キャッシュの保持秒数（存在しないコードは短時間のみ）。
+# プロセス内メモリのキャッシュでは他のプロセス（管理画面・コマンド）での無効化が届かないため短くする
+REFERRAL_CODE_CACHE_TIMEOUT = config(
+    'REFERRAL_CODE_CACHE_TIMEOUT', default=60 if CACHE_BACKEND.endswith("LocMemCache") else 3600, cast=int
+)
+REFERRAL_CODE_MISSING_TIMEOUT = config('REFERRAL_CODE_MISSING_TIMEOUT', default=60, cast=int)
+
+# 通知ストリームの Pub/Sub。複数ワーカーでは既定で notifications.pubsub.RedisBroker を使う
+# （プロセス内の LocalBroker では、別のワーカーに接続した購読者へ通知が届かない）
+NOTIFICATION_BROKER = config(
+    'NOTIFICATION_BROKER',
+    default="notifications.pubsub.RedisBroker" if WEB_CONCURRENCY > 1 else "notifications.pubsub.LocalBroker"
+)
+NOTIFICATION_BROKER_URL = config('NOTIFICATION_BROKER_URL', default="redis://localhost:6379/0")
+if WEB_CONCURRENCY > 1 and NOTIFICATION_BROKER.endswith("LocalBroker"):
+    raise ImproperlyConfigured(
+        "WEB_CONCURRENCY > 1 ではプロセス内の LocalBroker は使えません。"
+        "NOTIFICATION_BROKER に notifications.pubsub.RedisBroker などを指定してください"
+    )
+# 通知ストリームの接続用トークンの有効期間（秒）。EventSource の接続開始時にだけ使う
+NOTIFICATION_STREAM_TOKEN_MAX_AGE = config('NOTIFICATION_STREAM_TOKEN_MAX_AGE', default=60, cast=int)
+# 通知ストリームで接続維持のコメントを送る間隔（秒）
+NOTIFICATION_STREAM_HEARTBEAT = config('NOTIFICATION_STREAM_HEARTBEAT', default=15, cast=int)
+
+# 通知の外部配信（deliver_notifications ワーカーが送信する）
+NOTIFICATION_DELIVERY_CHANNELS = ['email', 'sms']
+NOTIFICATION_DELIVERY_MAX_ATTEMPTS = config('NOTIFICATION_DELIVERY_MAX_ATTEMPTS', default=5, cast=int)
+# 再試行の間隔（秒）。失敗のたびに倍にする
+NOTIFICATION_DELIVERY_RETRY_DELAY = config('NOTIFICATION_DELIVERY_RETRY_DELAY', default=60, cast=int)
+# 取り出したジョブを他のワーカーに渡さない時間（秒）。1バッチの送信にかかる時間より長くする
+NOTIFICATION_DELIVERY_LEASE = config('NOTIFICATION_DELIVERY_LEASE', default=300, cast=int)
+
+# 既読通知の保存日数（種類ごと。None なら削除しない）。purge_notifications コマンドで削除する
+NOTIFICATION_RETENTION_DAYS = {
+    'default': config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int),
+    'reminder': 30,
+    'system': 180,
+    'review': 180,
+}
+# 削除前に NotificationArchive へ退避するか
+NOTIFICATION_ARCHIVE = config('NOTIFICATION_ARCHIVE', default=False, cast=bool)
+
+EMAIL_BACKEND = config('EMAIL_BACKEND', default="django.core.mail.backends.console.EmailBackend")
+EMAIL_HOST = config('EMAIL_HOST', default="localhost")
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default="")
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default="")
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default="noreply@cier.example")
+# SMS 送信ゲートウェイ（notifications.sms.BaseSMSBackend のサブクラス）
+SMS_BACKEND = config('SMS_BACKEND', default="notifications.sms.ConsoleSMSBackend")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -127,9 +261,29 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# 静的ファイルは WhiteNoise で配信（本番は collectstatic で圧縮・ハッシュ付きファイル名にしたものを長期キャッシュ）
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+            else "whitenoise.storage.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
+
+# 開発時は collectstatic なしで finders から配信する（STORAGES と同じく設定読み込み時の DEBUG で決める）
+WHITENOISE_USE_FINDERS = DEBUG
+
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# 予約のホットパスの索引は INCLUDE 列付き（PostgreSQL 用）。SQLite では INCLUDE なしの索引になるため、
+# 開発・テスト環境で毎回出る models.W040 は抑止する
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -150,6 +304,21 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# サービス・スタイリスト一覧を再検証なしで使ってよい秒数（以降は ETag で再検証）
+CATALOG_MAX_AGE = config('CATALOG_MAX_AGE', default=60, cast=int)
+
+# JSON のエンコード/デコードに orjson を使う（FAST_JSON=False で DRF 標準の json モジュールに戻す）
+if config('FAST_JSON', default=True, cast=bool):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'cier_project.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'cier_project.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
 # Simple JWT
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
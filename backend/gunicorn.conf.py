@@ -0,0 +1,42 @@
+"""
+Gunicorn 設定（本番用）
+
+    gunicorn -c gunicorn.conf.py
+
+cier_project.asgi の ASGI アプリケーションを Uvicorn ワーカーで実行する。
+各値は環境変数で上書きできる。
+"""
+import multiprocessing
+import os
+from decouple import config as env
+
+wsgi_app = env('GUNICORN_APP', default='cier_project.asgi:application')
+worker_class = env('GUNICORN_WORKER_CLASS', default='uvicorn_worker.UvicornWorker')
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000')
+
+# 同期ビューはワーカーごとに1スレッドで実行されるため、CPU数に応じてプロセスを増やす。
+# ただしキャッシュの無効化・通知の配信はプロセス間で共有されるキャッシュ（Redis など）が前提のため、
+# プロセス内メモリのキャッシュのままなら1ワーカーにする
+shared_cache = not env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache').endswith('LocMemCache')
+workers = env('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1 if shared_cache else 1, cast=int)
+# Django の設定（settings.WEB_CONCURRENCY）でも同じ値を使い、共有キャッシュなしの複数ワーカーは起動時に拒否する
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# 開発時（docker-compose）はコードの変更でワーカーを再起動する
+reload = env('GUNICORN_RELOAD', default=False, cast=bool)
+
+# Keep-Alive とタイムアウト（秒）
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+
+# メモリリーク対策として一定数のリクエストごとにワーカーを入れ替える
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+max_requests_jitter = env('GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int)
+
+# コネクションプールをワーカー間で共有しないよう、アプリはワーカーごとに読み込む
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = env('GUNICORN_LOG_LEVEL', default='info')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationPreference, NotificationDelivery, NotificationArchive
 
 
 @admin.register(Notification)
@@ -15,3 +15,19 @@ class NotificationAdmin(admin.ModelAdmin):
 class NotificationPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'email_notifications', 'appointment_reminders', 'cancellation_alerts']
     search_fields = ['user__username']
+
+
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['notification', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['channel', 'status']
+    raw_id_fields = ['notification']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'type', 'created_at', 'archived_at']
+    list_filter = ['type']
+    search_fields = ['title', 'user__username']
+    raw_id_fields = ['user']
@@ -0,0 +1,30 @@
+"""
+通知ストリームの接続用トークン
+
+ブラウザの EventSource はヘッダーを付けられないため、JWT の代わりに
+認証済みの API で発行した短時間の署名付きトークンをクエリ文字列で渡す。
+トークンはユーザー ID に署名したもの（TimestampSigner）で、通知ストリーム以外では使えない。
+"""
+from django.conf import settings
+from django.core import signing
+
+from accounts.models import User
+
+STREAM_TOKEN_SALT = 'notifications.stream'
+
+
+def stream_token_max_age():
+    return getattr(settings, 'NOTIFICATION_STREAM_TOKEN_MAX_AGE', 60)
+
+
+def stream_token_for(user):
+    return signing.TimestampSigner(salt=STREAM_TOKEN_SALT).sign(str(user.pk))
+
+
+def user_for_stream_token(token):
+    """トークンのユーザー。改ざん・期限切れ・無効なユーザーなら None"""
+    try:
+        user_id = signing.TimestampSigner(salt=STREAM_TOKEN_SALT).unsign(token, max_age=stream_token_max_age())
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
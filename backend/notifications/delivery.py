@@ -0,0 +1,199 @@
+"""
+通知の外部配信（メール・SMS）
+
+通知の作成時は、ユーザーが通知設定で有効にしたチャネルの分だけ NotificationDelivery を登録し、
+送信は deliver_notifications ワーカーが行う。リクエストの応答時間は外部への送信に左右されない。
+通知設定のないユーザーにはメール・SMS を送らない。
+
+ワーカーは送信期限の来たジョブをまとめて取り出して（リースで確保し、トランザクションの外で送る）、
+- 通知設定を一括で読み直し、登録後に配信しなくなったジョブは skipped にする
+- メールは1本の SMTP 接続、SMS は1つのゲートウェイ接続でまとめて送る
+- 失敗したジョブは間隔を倍々に延ばして再試行し、上限回数で failed にする
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import NotificationDelivery, NotificationPreference
+from .sms import SMSMessage, get_sms_connection
+
+# 通知の種類ごとの受信設定（対応がない種類は常に配信）
+TYPE_PREFERENCES = {
+    'reminder': 'appointment_reminders',
+    'cancellation': 'cancellation_alerts',
+    'review': 'review_notifications',
+    'system': 'system_notifications',
+}
+
+
+def _channels():
+    return getattr(settings, 'NOTIFICATION_DELIVERY_CHANNELS', ['email', 'sms'])
+
+
+def preferences_for(user_ids):
+    """ユーザーごとの通知設定を1回のクエリで読み込む"""
+    return {
+        preference.user_id: preference
+        for preference in NotificationPreference.objects.filter(user_id__in=set(user_ids))
+    }
+
+
+def channels_for(notification, preference):
+    """
+    通知を配信するチャネル
+
+    通知設定のないユーザーにはメール・SMS を送らない（設定画面で有効にしたユーザーのみ）。
+    """
+    if preference is None:
+        return []
+    type_preference = TYPE_PREFERENCES.get(notification.type)
+    if type_preference and not getattr(preference, type_preference):
+        return []
+    enabled = {'email': preference.email_notifications, 'sms': preference.sms_notifications}
+    return [channel for channel in _channels() if enabled.get(channel)]
+
+
+def enqueue_deliveries(notifications):
+    """
+    通知の配信ジョブを1回の INSERT でまとめて登録（呼び出し元のトランザクション内）
+
+    登録時に通知設定を読み、有効なチャネルの分だけジョブを作る。
+    """
+    preferences = preferences_for(notification.user_id for notification in notifications)
+    return NotificationDelivery.objects.bulk_create([
+        NotificationDelivery(notification=notification, channel=channel)
+        for notification in notifications
+        for channel in channels_for(notification, preferences.get(notification.user_id))
+    ])
+
+
+def destination_for(delivery, preference):
+    """配信先（メールアドレス・電話番号）。登録後に設定が変わったなどで配信しない場合は None"""
+    notification = delivery.notification
+    if delivery.channel not in channels_for(notification, preference):
+        return None
+    user = notification.user
+    if delivery.channel == 'email':
+        return user.email or None
+    if delivery.channel == 'sms':
+        return user.phone_number or None
+    return None
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'NOTIFICATION_DELIVERY_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 6 * 60 * 60))
+
+
+def _mark_sent(delivery, now):
+    delivery.status = 'sent'
+    delivery.attempts += 1
+    delivery.sent_at = now
+    delivery.last_error = ''
+
+
+def _mark_failed(delivery, now, error):
+    delivery.attempts += 1
+    delivery.last_error = str(error)
+    if delivery.attempts >= getattr(settings, 'NOTIFICATION_DELIVERY_MAX_ATTEMPTS', 5):
+        delivery.status = 'failed'
+    else:
+        delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+
+
+def _send_batch(jobs, connection, build_message, now):
+    """同じ接続でジョブを1件ずつ送り、ジョブごとに成否を記録する"""
+    processed = 0
+    try:
+        with connection:
+            for delivery, destination in jobs:
+                try:
+                    connection.send_messages([build_message(delivery.notification, destination)])
+                except Exception as exc:
+                    _mark_failed(delivery, now, exc)
+                else:
+                    _mark_sent(delivery, now)
+                processed += 1
+    except Exception as exc:
+        # 接続できなかった場合は未処理のジョブをすべて再試行に回す
+        for delivery, _ in jobs[processed:]:
+            _mark_failed(delivery, now, exc)
+
+
+def _email_message(notification, destination):
+    return EmailMessage(subject=notification.title, body=notification.message, to=[destination])
+
+
+def _sms_message(notification, destination):
+    return SMSMessage(to=destination, body=f'{notification.title}\n{notification.message}')
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_DELIVERY_LEASE', 300))
+
+
+def claim_pending(batch_size=100, now=None):
+    """
+    送信期限の来たジョブを最大 batch_size 件取り出し、送信中として確保する
+
+    短いトランザクションで next_attempt_at をリース期限まで先送りし、他のワーカーには
+    期限が来ていないジョブに見えるようにする。ワーカーが送信途中で停止しても、
+    リース期限を過ぎれば再び取り出される。
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        deliveries = list(
+            NotificationDelivery.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                status='pending',
+                next_attempt_at__lte=now
+            ).select_related('notification__user').order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if deliveries:
+            NotificationDelivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).update(
+                next_attempt_at=now + lease_duration()
+            )
+    return deliveries
+
+
+def deliver_pending(batch_size=100, now=None):
+    """
+    送信期限の来たジョブを最大 batch_size 件送信し、結果の件数を返す
+
+    取り出し（claim_pending）と結果の保存はそれぞれ短いトランザクションで行い、
+    SMTP・SMS の送信中はトランザクションも行ロックも保持しない。結果は bulk_update でまとめて保存する。
+    """
+    now = now or timezone.now()
+    counts = {'sent': 0, 'skipped': 0, 'retry': 0, 'failed': 0}
+    deliveries = claim_pending(batch_size, now)
+    if not deliveries:
+        return counts
+
+    preferences = preferences_for(delivery.notification.user_id for delivery in deliveries)
+
+    jobs = {'email': [], 'sms': []}
+    for delivery in deliveries:
+        destination = destination_for(delivery, preferences.get(delivery.notification.user_id))
+        if destination:
+            jobs[delivery.channel].append((delivery, destination))
+        else:
+            delivery.status = 'skipped'
+
+    if jobs['email']:
+        _send_batch(jobs['email'], get_connection(), _email_message, now)
+    if jobs['sms']:
+        _send_batch(jobs['sms'], get_sms_connection(), _sms_message, now)
+
+    with transaction.atomic():
+        NotificationDelivery.objects.bulk_update(
+            deliveries, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+
+    for delivery in deliveries:
+        if delivery.status == 'pending':
+            counts['retry'] += 1
+        else:
+            counts[delivery.status] += 1
+    return counts
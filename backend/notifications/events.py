@@ -0,0 +1,67 @@
+"""
+通知ストリームへ流すイベント
+
+- notification: 作成された通知（NotificationSerializer の表現）
+- unread_count: 未読通知数 {"count": 現在の件数, "delta": 今回の増減}
+
+イベントはコミット後に送信し、ロールバックされた変更は流さない。
+フレームは1回だけ整形し、購読者全員に同じ bytes を配る。
+"""
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from .pubsub import get_broker
+from .serializers import NotificationSerializer
+
+
+def channel_for(user_id):
+    return f'user:{user_id}'
+
+
+def sse_frame(event, data):
+    return b'event: ' + event.encode() + b'\ndata: ' + JSONRenderer().render(data) + b'\n\n'
+
+
+def _publish_unread_count(broker, user_id, delta):
+    count = User.objects.filter(pk=user_id).values_list('unread_notification_count', flat=True).first()
+    if count is not None:
+        broker.publish(channel_for(user_id), sse_frame('unread_count', {'count': count, 'delta': delta}))
+
+
+def publish_unread_count(user_id, delta):
+    """未読通知数の変化をコミット後に送信（購読者がいなければ件数も読まない）"""
+    def publish():
+        broker = get_broker()
+        if broker.has_subscribers(channel_for(user_id)):
+            _publish_unread_count(broker, user_id, delta)
+
+    if user_id is not None and delta:
+        transaction.on_commit(publish)
+
+
+def publish_notifications(notifications):
+    """
+    作成された通知と、それに伴う未読通知数をコミット後に送信
+
+    一括作成分は各ユーザー1件ずつの想定で、購読中のユーザーの未読通知数を1回のクエリで読む。
+    """
+    def publish():
+        broker = get_broker()
+        subscribed = [n for n in notifications if broker.has_subscribers(channel_for(n.user_id))]
+        if not subscribed:
+            return
+        counts = dict(User.objects.filter(
+            pk__in={n.user_id for n in subscribed}
+        ).values_list('pk', 'unread_notification_count'))
+        for notification in subscribed:
+            channel = channel_for(notification.user_id)
+            broker.publish(channel, sse_frame('notification', NotificationSerializer(notification).data))
+            if not notification.read and notification.user_id in counts:
+                broker.publish(channel, sse_frame('unread_count', {'count': counts[notification.user_id], 'delta': 1}))
+
+    transaction.on_commit(publish)
+
+
+def publish_notification(notification):
+    publish_notifications([notification])
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from accounts.models import User
+from notifications.services import broadcast_notification
+from notifications.views import create_notification
+
+
+class Command(BaseCommand):
+    help = '一斉配信の作成速度を、1件ずつの create_notification と bulk_create による配信で比較します（データはロールバックされます）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000, help='配信対象のユーザー数（既定5000）')
+        parser.add_argument('--batch-size', type=int, default=1000, help='bulk_create のバッチサイズ（既定1000）')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(username=f'benchmark-broadcast-{i}') for i in range(options['users'])
+            ])
+            user_ids = [user.pk for user in users]
+
+            # 1件ずつの作成は時間がかかるため先頭の一部だけ計測する
+            sample = users[:min(len(users), 500)]
+            self.run('1件ずつ', len(sample), lambda: [
+                create_notification(user, 'system', '臨時休業のお知らせ', '明日は臨時休業です') for user in sample
+            ])
+            self.run('一斉配信', len(user_ids), lambda: broadcast_notification(
+                user_ids, 'system', '臨時休業のお知らせ', '明日は臨時休業です', batch_size=options['batch_size']
+            ))
+            transaction.set_rollback(True)
+
+    def run(self, label, count, func):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label:<6} {count:>6} 件  {elapsed * 1000:9.1f} ms  {count / elapsed:10,.0f} 件/s  '
+            f'{len(context.captured_queries):>5} queries'
+        )
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from notifications.delivery import deliver_pending
+
+
+class Command(BaseCommand):
+    help = '通知の配信ジョブ（メール・SMS）を送信するワーカー。--once を付けると送信待ちがなくなった時点で終了します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='1回に取り出すジョブ数（既定100）')
+        parser.add_argument('--interval', type=float, default=5, help='送信待ちがないときの待機秒数（既定5）')
+        parser.add_argument('--once', action='store_true', help='送信待ちがなくなったら終了する')
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            counts = deliver_pending(batch_size=options['batch_size'])
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+            if sum(counts.values()):
+                self.stdout.write(
+                    f"送信 {counts['sent']} / 対象外 {counts['skipped']} / 再試行 {counts['retry']} / 失敗 {counts['failed']}"
+                )
+                continue
+            if options['once']:
+                break
+            # 待機中に切れた・寿命を過ぎた DB 接続は次の取り出し前に閉じる
+            close_old_connections()
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f"送信 {totals.get('sent', 0)} 件 / 対象外 {totals.get('skipped', 0)} 件 / "
+            f"再試行 {totals.get('retry', 0)} 件 / 失敗 {totals.get('failed', 0)} 件"
+        ))
@@ -0,0 +1,39 @@
+import time
+from argparse import BooleanOptionalAction
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.retention import purge_expired_notifications, retention_days
+
+
+class Command(BaseCommand):
+    help = '保存期間を過ぎた既読通知を、小さなバッチに分けて削除（または退避）します。cron から稼働中に実行できます'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='1トランザクションで削除する件数（既定1000）')
+        parser.add_argument('--pause', type=float, default=0.1, help='バッチ間の待機秒数（既定0.1）')
+        parser.add_argument(
+            '--archive', action=BooleanOptionalAction, default=getattr(settings, 'NOTIFICATION_ARCHIVE', False),
+            help='削除前に NotificationArchive へ退避する（既定は settings.NOTIFICATION_ARCHIVE）'
+        )
+
+    def handle(self, *args, **options):
+        days = ', '.join(f'{notification_type}={value}日' for notification_type, value in retention_days().items())
+        self.stdout.write(f'保存期間: {days}')
+
+        totals = {}
+        started = time.perf_counter()
+        for notification_type, deleted in purge_expired_notifications(
+            batch_size=options['batch_size'], archive=options['archive'], pause=options['pause']
+        ):
+            totals[notification_type] = totals.get(notification_type, 0) + deleted
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{notification_type}: {deleted} 件')
+        elapsed = time.perf_counter() - started
+
+        total = sum(totals.values())
+        breakdown = ', '.join(f'{notification_type} {count}' for notification_type, count in totals.items())
+        action = '退避・削除' if options['archive'] else '削除'
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} 件の通知を{action}しました（{breakdown or "対象なし"}）'
+            f'  {elapsed:.1f} 秒  {total / elapsed if elapsed else 0:,.0f} 件/s'
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'read', 'created_at'], name='notif_user_read_created_idx'),
+        ),
+    ]
@@ -14,7 +14,10 @@ class Notification(models.Model):
         ('review', 'レビュー'),
     ]
     
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
+    # user 単独の検索は notif_user_created_idx（先頭列が user）で足りるため、外部キーの索引は作らない
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications', db_index=False
+    )
     type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
     title = models.CharField(max_length=200)
     message = models.TextField()
@@ -25,6 +28,14 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # 未読の絞り込み・一括既読（user, read）と新着順の一覧（created_at）
+            models.Index(fields=['user', 'read', 'created_at'], name='notif_user_read_created_idx'),
+            # 通知一覧のカーソルページネーション（(created_at, id) の降順）。種類での絞り込みもこの順に読む
+            models.Index(fields=['user', '-created_at', '-id'], name='notif_user_created_idx'),
+            # 保存期間を過ぎた既読通知の削除（種類ごとに古い順で取り出す）
+            models.Index(fields=['type', 'created_at'], condition=models.Q(read=True), name='notif_retention_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -41,3 +52,59 @@ class NotificationPreference(models.Model):
     
     def __str__(self):
         return f"通知設定 - {self.user.username}"
+
+
+class NotificationDelivery(models.Model):
+    """
+    通知の外部配信ジョブ（メール・SMS）
+
+    通知の作成と同じトランザクションで登録し、deliver_notifications ワーカーが
+    チャネルごとにまとめて送信する。送信に失敗したジョブは間隔を延ばしながら再試行する。
+    """
+    CHANNEL_CHOICES = [
+        ('email', 'メール'),
+        ('sms', 'SMS'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', '送信待ち'),
+        ('sent', '送信済み'),
+        ('skipped', '対象外'),
+        ('failed', '失敗'),
+    ]
+
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='deliveries')
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # ワーカーが送信期限の来たジョブを取り出す
+            models.Index(fields=['status', 'next_attempt_at'], name='notif_delivery_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} - {self.notification_id} ({self.status})"
+
+
+class NotificationArchive(models.Model):
+    """保存期間を過ぎた既読通知の退避先（purge_notifications --archive で移す）"""
+    original_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_notifications')
+    type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    urgent = models.BooleanField(default=False)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} - {self.user_id}"
@@ -0,0 +1,160 @@
+"""
+通知ストリームの Pub/Sub
+
+メッセージは送信済みの形（SSE のフレーム bytes）で配信し、購読者ごとに整形し直さない。
+publish は同期コード（リクエスト処理のスレッド）から呼べ、購読は各プロセスのイベントループ上で行う。
+
+- LocalBroker: プロセス内の配信のみ（1ワーカーでの既定。開発・テスト用の代替でもある）
+- RedisBroker: Redis の PUBLISH でプロセス間に配信し、各プロセスでは LocalBroker と同じ方法で購読者へ配る
+  （複数ワーカーでの既定。redis パッケージが必要）
+
+使用するブローカーは settings.NOTIFICATION_BROKER（クラスのドット区切りパス）で切り替える。
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """1接続分の購読。受信側のイベントループ上のキューにメッセージを積む"""
+
+    def __init__(self, broker, channel, max_pending):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, message):
+        """任意のスレッドから呼べる"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # 接続側のイベントループが終了済み
+            pass
+
+    def _put(self, message):
+        # 読み出しが追いつかない接続は古いメッセージから捨てる（件数は次の unread_count で揃う）
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """プロセス内の Pub/Sub"""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def has_subscribers(self, channel):
+        """publish 前に余計な問い合わせを省くための判定（他プロセスの購読者がいる場合は常に True）"""
+        return bool(self._subscriptions.get(channel))
+
+    def subscribe(self, channel):
+        """async with で使う購読を作成（イベントループ上で呼ぶ）"""
+        subscription = Subscription(self, channel, self.max_pending)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        """このプロセスの購読者へ配る"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Redis 経由でプロセス間に配信する Pub/Sub
+
+    publish は Redis へ送るだけで、自プロセスの購読者にも Redis から戻ってきたメッセージを配る。
+    購読はプロセスごとに1本の接続（パターン購読）でまとめて受ける。
+    """
+
+    def __init__(self, url=None, prefix='notifications:', max_pending=100):
+        super().__init__(max_pending=max_pending)
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as exc:
+            raise ImproperlyConfigured('RedisBroker を使うには redis パッケージが必要です') from exc
+
+        self.url = url or getattr(settings, 'NOTIFICATION_BROKER_URL', 'redis://localhost:6379/0')
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(self.url)
+        self._async_redis = redis.asyncio
+        self._listener = None
+
+    def has_subscribers(self, channel):
+        return True
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        if self._listener is None or self._listener.done():
+            self._listener = subscription.loop.create_task(self._listen())
+        return subscription
+
+    def publish(self, channel, message):
+        try:
+            self._client.publish(f'{self.prefix}{channel}', message)
+        except Exception:
+            # 通知の保存自体は成功しているため、配信の失敗でリクエストを失敗させない
+            logger.exception('通知の配信に失敗しました: channel=%s', channel)
+
+    async def _listen(self):
+        retry_delay = 1
+        while True:
+            client = self._async_redis.Redis.from_url(self.url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f'{self.prefix}*')
+                    retry_delay = 1
+                    async for message in pubsub.listen():
+                        if message['type'] == 'pmessage':
+                            channel = message['channel'].decode()[len(self.prefix):]
+                            self.deliver(channel, message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('通知の購読が切断されました。%s 秒後に再接続します', retry_delay)
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+            finally:
+                await client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    broker_class = import_string(getattr(settings, 'NOTIFICATION_BROKER', 'notifications.pubsub.LocalBroker'))
+    return broker_class()
@@ -0,0 +1,95 @@
+"""
+通知の保存期間と削除・退避
+
+既読の通知は種類ごとの保存期間（settings.NOTIFICATION_RETENTION_DAYS）を過ぎたら削除する。
+未読の通知は期間を過ぎても残す（未読通知数の整合を崩さないため）。
+
+稼働中でも実行できるよう、1バッチごとに短いトランザクションで
+- 対象を古い順に batch_size 件だけ行ロックして取り出し（ロック中の行は飛ばす）
+- 必要なら NotificationArchive へ bulk_create で退避し
+- 通知を ID 指定の QuerySet.delete() で消す（配信ジョブはカスケードで消える）
+を繰り返す。テーブル全体を長時間ロックする一括 DELETE は行わない。
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive
+
+DEFAULT_RETENTION_DAYS = 90
+
+
+def retention_days():
+    """通知の種類ごとの保存日数"""
+    configured = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})
+    default = configured.get('default', DEFAULT_RETENTION_DAYS)
+    return {
+        notification_type: configured.get(notification_type, default)
+        for notification_type, _ in Notification.NOTIFICATION_TYPES
+    }
+
+
+def expired_notifications(notification_type, cutoff):
+    return Notification.objects.filter(type=notification_type, read=True, created_at__lt=cutoff)
+
+
+def archive_rows(notifications):
+    return [
+        NotificationArchive(
+            original_id=notification.id,
+            user_id=notification.user_id,
+            type=notification.type,
+            title=notification.title,
+            message=notification.message,
+            urgent=notification.urgent,
+            data=notification.data,
+            created_at=notification.created_at,
+        )
+        for notification in notifications
+    ]
+
+
+def purge_batch(notification_type, cutoff, batch_size, archive=False):
+    """期限切れの既読通知を最大 batch_size 件削除（archive=True なら退避してから）し、件数を返す"""
+    with transaction.atomic():
+        batch = expired_notifications(notification_type, cutoff).select_for_update(skip_locked=True).order_by(
+            'created_at'
+        )[:batch_size]
+        if archive:
+            notifications = list(batch)
+            ids = [notification.id for notification in notifications]
+        else:
+            ids = list(batch.values_list('id', flat=True))
+        if not ids:
+            return 0
+
+        if archive:
+            NotificationArchive.objects.bulk_create(archive_rows(notifications), ignore_conflicts=True)
+        # 既読の通知しか選んでいないため未読通知数は変わらない
+        _, deleted = Notification.objects.filter(pk__in=ids).delete()
+        return deleted.get(Notification._meta.label, 0)
+
+
+def purge_expired_notifications(batch_size=1000, archive=False, pause=0, now=None):
+    """
+    保存期間を過ぎた既読通知をバッチ単位で削除し、バッチごとに (種類, 件数) を返すジェネレーター
+
+    pause 秒ずつバッチの間を空け、稼働中のリクエストに DB を譲る。
+    """
+    now = now or timezone.now()
+    for notification_type, days in retention_days().items():
+        if days is None:
+            continue
+        cutoff = now - timedelta(days=days)
+        while True:
+            deleted = purge_batch(notification_type, cutoff, batch_size, archive=archive)
+            if not deleted:
+                break
+            yield notification_type, deleted
+            if deleted < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from accounts.models import Salon
 from .models import Notification, NotificationPreference
 
 
@@ -16,3 +17,50 @@ class NotificationPreferenceSerializer(serializers.ModelSerializer):
             'email_notifications', 'sms_notifications', 'appointment_reminders', 
             'cancellation_alerts', 'review_notifications', 'system_notifications'
         ]
+
+
+class NotificationBulkSerializer(serializers.Serializer):
+    """一括既読・削除の対象（ID リストまたは条件のいずれかが必要）"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    type = serializers.ChoiceField(choices=Notification.NOTIFICATION_TYPES, required=False)
+    read = serializers.BooleanField(required=False, allow_null=True, default=None)
+    before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not any(attrs.get(name) is not None for name in ('ids', 'type', 'read', 'before')):
+            raise serializers.ValidationError('ids または絞り込み条件（type / read / before）を指定してください')
+        return attrs
+
+
+class NotificationBulkMarkSerializer(NotificationBulkSerializer):
+    mark_read = serializers.BooleanField(default=True)
+
+
+BROADCAST_SEGMENTS = [
+    ('salon_stylists', 'サロンのスタイリスト'),
+    ('appointment_customers', '期間内に予約のある顧客'),
+    ('all', '全ユーザー'),
+]
+
+
+class NotificationBroadcastSerializer(serializers.Serializer):
+    """一斉配信の対象と内容"""
+    segment = serializers.ChoiceField(choices=BROADCAST_SEGMENTS)
+    salon = serializers.PrimaryKeyRelatedField(queryset=Salon.objects.all(), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    type = serializers.ChoiceField(choices=Notification.NOTIFICATION_TYPES, default='system')
+    title = serializers.CharField(max_length=200)
+    message = serializers.CharField()
+    urgent = serializers.BooleanField(default=False)
+    data = serializers.DictField(required=False, default=dict)
+
+    def validate(self, attrs):
+        if attrs['segment'] == 'salon_stylists' and not attrs.get('salon'):
+            raise serializers.ValidationError({'salon': 'サロンを指定してください'})
+        if attrs['segment'] == 'appointment_customers':
+            if not attrs.get('date_from') or not attrs.get('date_to'):
+                raise serializers.ValidationError({'date_from': '期間を指定してください'})
+            if attrs['date_from'] > attrs['date_to']:
+                raise serializers.ValidationError({'date_to': '終了日は開始日以降を指定してください'})
+        return attrs
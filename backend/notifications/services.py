@@ -0,0 +1,116 @@
+"""
+通知の一括操作
+
+既読・未読・削除は1件の操作も一括の操作も、対象を絞り込んだ1文の UPDATE / DELETE で行い、
+影響行数から User.unread_notification_count を同じトランザクション内で差分更新する。
+UPDATE / DELETE は read の値も条件に含めるため、同時に実行されても二重に数えない。
+未読通知数の変化は通知ストリームへも送る。
+
+一斉配信は対象ユーザーを1回のクエリで求め、通知・配信ジョブの bulk_create と
+未読通知数の UPDATE をバッチ単位で行う（1件ずつの create_notification は使わない）。
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from accounts.stats import adjust_counter, adjust_counters
+from bookings.availability import day_bounds
+from .delivery import enqueue_deliveries
+from .events import publish_notifications, publish_unread_count
+from .models import Notification
+
+
+def notifications_for(user, ids=None, type=None, read=None, before=None):
+    """ID リストまたは条件（種類・既読状態・作成日時の上限）でユーザーの通知を絞り込む"""
+    notifications = Notification.objects.filter(user=user)
+    if ids is not None:
+        notifications = notifications.filter(pk__in=ids)
+    if type:
+        notifications = notifications.filter(type=type)
+    if read is not None:
+        notifications = notifications.filter(read=read)
+    if before is not None:
+        notifications = notifications.filter(created_at__lt=before)
+    return notifications.order_by()
+
+
+@transaction.atomic
+def mark_notifications(user, mark_read=True, **filters):
+    """対象の通知をまとめて既読（mark_read=False なら未読）にし、変更した件数を返す"""
+    updated = notifications_for(user, **filters).filter(read=not mark_read).update(read=mark_read)
+    delta = -updated if mark_read else updated
+    adjust_counter(user.pk, 'unread_notification_count', delta)
+    publish_unread_count(user.pk, delta)
+    return updated
+
+
+@transaction.atomic
+def delete_notifications(user, **filters):
+    """
+    対象の通知をまとめて削除し、削除した件数を返す
+
+    対象の ID と既読状態を行ロック付きで読んでから削除するため、同時に既読化されても
+    未読で消えた件数は正確になる。配信ジョブは QuerySet.delete() のカスケードで消える
+    （通知には削除シグナルの受信側がないため、1件ずつの処理にはならない）。
+    """
+    rows = list(notifications_for(user, **filters).select_for_update().values_list('pk', 'read'))
+    if not rows:
+        return 0
+    Notification.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+    unread_deleted = sum(1 for _, read in rows if not read)
+    adjust_counter(user.pk, 'unread_notification_count', -unread_deleted)
+    publish_unread_count(user.pk, -unread_deleted)
+    return len(rows)
+
+
+def segment_recipients(segment, salon=None, date_from=None, date_to=None):
+    """一斉配信の対象ユーザー ID（有効なユーザーのみ）"""
+    users = User.objects.filter(is_active=True)
+    if segment == 'salon_stylists':
+        users = users.filter(new_stylist_profile__salon=salon)
+    elif segment == 'appointment_customers':
+        # 同じ予約について期間と状態を判定するため1回の filter() に書く。
+        # 列を日付に変換すると (customer, appointment_date) の索引を使えないため、半開区間で比較する
+        users = users.filter(
+            appointments__appointment_date__gte=day_bounds(date_from)[0],
+            appointments__appointment_date__lt=day_bounds(date_to)[1],
+            appointments__status__in=['RESERVED', 'PAID', 'COMPLETED']
+        ).distinct()
+    elif segment != 'all':
+        raise ValueError(f'unknown segment: {segment}')
+    return users.order_by('pk').values_list('pk', flat=True)
+
+
+def broadcast_notification(user_ids, notification_type, title, message, urgent=False, data=None, batch_size=1000):
+    """
+    同じ内容の通知を複数ユーザーへまとめて作成し、作成した件数を返す
+
+    バッチごとに通知の INSERT・配信ジョブの INSERT・未読通知数の UPDATE を1回ずつ行う。
+    bulk_create はシグナルを送らないため、シグナルで行っている処理はここで行う。
+    バッチごとにコミットし（ストリームへの送信もバッチのコミット後）、全体を1つの長いトランザクションにしない。
+    途中のバッチで失敗した場合、それまでのバッチは作成済みのまま残る。
+    """
+    user_ids = list(user_ids)
+    created_at = timezone.now()
+    data = data or {}
+    created = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id,
+                    type=notification_type,
+                    title=title,
+                    message=message,
+                    urgent=urgent,
+                    data=data,
+                    created_at=created_at
+                )
+                for user_id in batch
+            ])
+            adjust_counters(batch, 'unread_notification_count', 1)
+            enqueue_deliveries(notifications)
+            publish_notifications(notifications)
+        created += len(notifications)
+    return created
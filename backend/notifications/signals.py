@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from accounts.stats import adjust_counter
+from .delivery import enqueue_deliveries
+from .events import publish_notification
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, **kwargs):
+    """
+    通知の作成時に未読通知数を増やし、ストリームへの送信と配信ジョブの登録を行う
+
+    既読・未読の切り替えと削除は notifications.services の関数で行い、UPDATE / DELETE が
+    実際に変更した行数から未読通知数を増減する（読み込み済みのインスタンスの状態は使わない）。
+    それ以外の経路（管理画面など）での変更によるずれは recompute_user_stats で修復する。
+    """
+    if not created:
+        return
+    if not instance.read:
+        adjust_counter(instance.user_id, 'unread_notification_count', 1)
+    publish_notification(instance)
+    enqueue_deliveries([instance])
@@ -0,0 +1,68 @@
+"""
+SMS 送信ゲートウェイのアダプター
+
+django.core.mail のバックエンドと同じ形で、settings.SMS_BACKEND のクラスを
+get_sms_connection() で取得し、open() した接続で send_messages() をまとめて呼ぶ。
+実際の SMS 事業者を使う場合は BaseSMSBackend を継承して send_messages を実装する。
+"""
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SMSMessage:
+    to: str
+    body: str
+
+
+class BaseSMSBackend:
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send_messages(self, messages):
+        """送信した件数を返す"""
+        raise NotImplementedError
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """ログへ出力するだけのバックエンド（開発用）"""
+
+    def send_messages(self, messages):
+        for message in messages:
+            logger.info('SMS to %s: %s', message.to, message.body)
+        return len(messages)
+
+
+# LocMemSMSBackend が送信したメッセージ（テスト用）
+outbox = []
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    """送信したメッセージを outbox に貯めるバックエンド（テスト用）"""
+
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return len(messages)
+
+
+def get_sms_connection(backend=None, fail_silently=False, **kwargs):
+    backend_class = import_string(backend or getattr(settings, 'SMS_BACKEND', 'notifications.sms.ConsoleSMSBackend'))
+    return backend_class(fail_silently=fail_silently, **kwargs)
@@ -1,3 +1,566 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from accounts.models import User, Salon, StylistProfile
+from bookings.availability import day_bounds
+from bookings.models import Appointment, Service, Stylist
+from . import sms
+from .delivery import claim_pending, deliver_pending
+from .models import Notification, NotificationArchive, NotificationDelivery, NotificationPreference
+from .pubsub import get_broker
+from .retention import purge_expired_notifications
+from .services import broadcast_notification, mark_notifications, segment_recipients
+from .views import create_notification
 
-# Create your tests here.
+
+class UnreadCounterTest(TestCase):
+    """未読通知数が作成・既読・削除・一括操作で保守され、取得時に集計しないことを確認"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='customer')
+        self.client.force_authenticate(self.user)
+        self.notifications = [
+            create_notification(self.user, notification_type, f'通知{i}', '本文')
+            for i, notification_type in enumerate(['appointment', 'appointment', 'reminder', 'system'])
+        ]
+
+    def unread_count(self):
+        self.user.refresh_from_db()
+        return self.user.unread_notification_count
+
+    def test_counter_follows_changes(self):
+        self.assertEqual(self.unread_count(), 4)
+        first, second = self.notifications[:2]
+        self.client.patch(reverse('mark-notification-read', args=[first.id]))
+        self.client.patch(reverse('mark-notification-read', args=[first.id]))
+        self.assertEqual(self.unread_count(), 3)
+
+        self.client.delete(reverse('delete-notification', args=[first.id]))
+        self.assertEqual(self.unread_count(), 3)
+        self.client.delete(reverse('delete-notification', args=[second.id]))
+        self.assertEqual(self.unread_count(), 2)
+
+        response = self.client.get(reverse('get-unread-count'))
+        self.assertEqual(response.json(), {'count': 2})
+
+    def test_single_changes_after_bulk_changes(self):
+        first = self.notifications[0]
+        mark_notifications(self.user)
+        self.assertEqual(self.client.patch(reverse('mark-notification-read', args=[first.id])).status_code, 200)
+        self.assertEqual(self.unread_count(), 0)
+        self.client.delete(reverse('delete-notification', args=[first.id]))
+        self.assertEqual(self.unread_count(), 0)
+        self.assertEqual(self.client.get(reverse('get-unread-count')).json(), {'count': 0})
+
+        response = self.client.patch(reverse('mark-notification-read', args=[first.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.delete(reverse('delete-notification', args=[first.id])).status_code, 404)
+
+    def test_mark_all_read(self):
+        response = self.client.patch(reverse('mark-all-notifications-read'))
+        self.assertEqual(response.json()['updated_count'], 4)
+        self.assertEqual(self.unread_count(), 0)
+        self.assertFalse(Notification.objects.filter(read=False).exists())
+
+    def test_bulk_mark_by_ids_and_filter(self):
+        ids = [n.id for n in self.notifications[:3]]
+        response = self.client.post(reverse('bulk-mark-notifications'), {'ids': ids}, format='json')
+        self.assertEqual(response.json()['updated_count'], 3)
+        self.assertEqual(self.unread_count(), 1)
+
+        response = self.client.post(
+            reverse('bulk-mark-notifications'), {'type': 'appointment', 'mark_read': False}, format='json'
+        )
+        self.assertEqual(response.json()['updated_count'], 2)
+        self.assertEqual(self.unread_count(), 3)
+
+    def test_bulk_delete(self):
+        self.client.post(reverse('bulk-mark-notifications'), {'type': 'reminder'}, format='json')
+        # 対象のロック付き読み出し、削除の収集、配信ジョブと通知の DELETE のみ（未読が消えなければ未読通知数は更新しない）
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('bulk-delete-notifications'), {'type': 'reminder'}, format='json')
+        self.assertEqual(response.json()['deleted_count'], 1)
+        self.assertEqual(self.unread_count(), 3)
+
+        response = self.client.post(reverse('bulk-delete-notifications'), {'read': False}, format='json')
+        self.assertEqual(response.json()['deleted_count'], 3)
+        self.assertEqual(self.unread_count(), 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_bulk_requires_target(self):
+        response = self.client.post(reverse('bulk-delete-notifications'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Notification.objects.count(), 4)
+
+    def test_other_users_untouched(self):
+        other = User.objects.create_user(username='other')
+        notification = create_notification(other, 'system', '他人の通知', '本文')
+        self.client.post(reverse('bulk-delete-notifications'), {'ids': [notification.id]}, format='json')
+        self.assertTrue(Notification.objects.filter(pk=notification.pk).exists())
+
+
+class ConcurrentUnreadCounterTest(TransactionTestCase):
+    """同じ通知への既読化・一括既読化・削除が同時に実行されても未読通知数がずれないことを確認"""
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('インメモリSQLiteではスレッドごとの接続を分けられないため')
+        self.user = User.objects.create_user(username='customer')
+        self.notifications = [create_notification(self.user, 'system', f'通知{i}', '本文') for i in range(3)]
+
+    def request(self, method, url, barrier, errors):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            barrier.wait()
+            getattr(client, method)(url)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    def test_counter_matches_rows(self):
+        first, second, _ = self.notifications
+        requests = [
+            ('patch', reverse('mark-notification-read', args=[first.id])),
+            ('patch', reverse('mark-notification-read', args=[first.id])),
+            ('patch', reverse('mark-all-notifications-read')),
+            ('patch', reverse('mark-notification-read', args=[second.id])),
+            ('delete', reverse('delete-notification', args=[second.id])),
+            ('delete', reverse('delete-notification', args=[second.id])),
+        ]
+        barrier = threading.Barrier(len(requests))
+        errors = []
+        threads = [
+            threading.Thread(target=self.request, args=(method, url, barrier, errors))
+            for method, url in requests
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notification_count, 0)
+        self.assertEqual(Notification.objects.filter(user=self.user, read=False).count(), 0)
+
+
+class NotificationStreamTest(TestCase):
+    """通知の作成・既読化がコミット後にストリームへ送信されることを確認（プロセス内ブローカーを使用）"""
+
+    def setUp(self):
+        get_broker.cache_clear()
+        self.addCleanup(get_broker.cache_clear)
+        self.user = User.objects.create_user(username='customer')
+        create_notification(self.user, 'system', '既存の通知', '本文')
+        self.token = str(AccessToken.for_user(self.user))
+
+    def create_and_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.user, 'appointment', '新しい予約', '15:00 カット')
+
+    def mark_all_and_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_notifications(self.user)
+
+    async def next_event(self, stream):
+        frame = await asyncio.wait_for(anext(stream), 1)
+        event, data = frame.decode().strip().split('\n')
+        return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    async def test_stream_pushes_events(self):
+        response = await self.async_client.get(
+            reverse('notification-stream'), headers={'Authorization': f'Bearer {self.token}'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 1, 'delta': 0}))
+
+            await sync_to_async(self.create_and_commit)()
+            event, data = await self.next_event(stream)
+            self.assertEqual((event, data['title']), ('notification', '新しい予約'))
+            self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 2, 'delta': 1}))
+
+            await sync_to_async(self.mark_all_and_commit)()
+            self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 0, 'delta': -2}))
+        finally:
+            await stream.aclose()
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('notification-stream'))
+        self.assertEqual(response.status_code, 401)
+
+    def issue_stream_token(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(reverse('notification-stream-token'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()['token']
+
+    async def test_stream_accepts_query_token(self):
+        # EventSource はヘッダーを付けられないため、発行したトークンをクエリ文字列で渡す
+        token = await sync_to_async(self.issue_stream_token)()
+        response = await self.async_client.get(reverse('notification-stream'), {'token': token})
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await self.next_event(stream), ('unread_count', {'count': 1, 'delta': 0}))
+        finally:
+            await stream.aclose()
+
+    async def test_rejects_invalid_or_expired_token(self):
+        token = await sync_to_async(self.issue_stream_token)()
+        response = await self.async_client.get(reverse('notification-stream'), {'token': token + 'x'})
+        self.assertEqual(response.status_code, 401)
+        # JWT はストリーム用のトークンとして使えない
+        response = await self.async_client.get(reverse('notification-stream'), {'token': self.token})
+        self.assertEqual(response.status_code, 401)
+        with patch('django.core.signing.time.time', return_value=time.time() + 61):
+            response = await self.async_client.get(reverse('notification-stream'), {'token': token})
+        self.assertEqual(response.status_code, 401)
+
+    def test_multiple_workers_use_shared_broker(self):
+        def load_broker(**environ):
+            env = {key: value for key, value in os.environ.items() if key != 'NOTIFICATION_BROKER'}
+            env.update(DJANGO_SETTINGS_MODULE='cier_project.settings', WEB_CONCURRENCY='2',
+                       CACHE_BACKEND='django.core.cache.backends.redis.RedisCache', **environ)
+            return subprocess.run(
+                [sys.executable, '-c', 'import django; django.setup(); from django.conf import settings; '
+                                       'print(settings.NOTIFICATION_BROKER)'],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+            )
+
+        result = load_broker()
+        self.assertEqual(result.stdout.strip(), 'notifications.pubsub.RedisBroker')
+        result = load_broker(NOTIFICATION_BROKER='notifications.pubsub.LocalBroker')
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('ImproperlyConfigured', result.stderr)
+
+    def test_no_publish_without_subscribers(self):
+        # 購読者がいなければコミット後に未読通知数を読み直さない
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_notification(self.user, 'appointment', '新しい予約', '本文')
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    SMS_BACKEND='notifications.sms.LocMemSMSBackend',
+)
+class NotificationDeliveryTest(TestCase):
+    """通知の作成時は配信ジョブの登録のみ行い、ワーカーが設定に従ってまとめて送信することを確認"""
+
+    def setUp(self):
+        sms.outbox.clear()
+        self.customer = User.objects.create_user(username='customer', email='customer@example.com', phone_number='09012345678')
+        self.stylist = User.objects.create_user(username='stylist', email='stylist@example.com')
+        self.guest = User.objects.create_user(username='guest', email='guest@example.com')
+        NotificationPreference.objects.create(user=self.customer, sms_notifications=True, review_notifications=False)
+        NotificationPreference.objects.create(user=self.stylist)
+
+    def test_enqueue_by_preferences(self):
+        # 有効なチャネルの分だけ登録し、種類で無効にした通知と通知設定のないユーザーには登録しない
+        create_notification(self.customer, 'appointment', '予約確定', '15:00 カット')
+        create_notification(self.customer, 'review', 'レビューのお願い', '本文')
+        create_notification(self.stylist, 'appointment', '新しい予約', '15:00 カット')
+        create_notification(self.guest, 'appointment', '予約確定', '15:00 カット')
+        self.assertEqual(
+            sorted(NotificationDelivery.objects.values_list('notification__user__username', 'channel')),
+            [('customer', 'email'), ('customer', 'sms'), ('stylist', 'email')]
+        )
+
+    def test_deliver_by_preferences(self):
+        create_notification(self.customer, 'appointment', '予約確定', '15:00 カット')
+        create_notification(self.stylist, 'appointment', '新しい予約', '15:00 カット')
+        create_notification(self.stylist, 'system', 'お知らせ', '本文')
+        self.assertEqual(len(mail.outbox), 0)
+        # 登録後に無効にした設定は送信時に反映する
+        NotificationPreference.objects.filter(user=self.stylist).update(system_notifications=False)
+
+        # 取り出し（ジョブ・通知・ユーザーの取得とリースの設定）、通知設定の一括読み込み、結果の一括更新。
+        # 取り出しと保存は別々の短いトランザクション（テストではそれぞれセーブポイント2文）
+        with self.assertNumQueries(8):
+            counts = deliver_pending()
+        self.assertEqual(counts, {'sent': 3, 'skipped': 1, 'retry': 0, 'failed': 0})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['customer@example.com', 'stylist@example.com'])
+        self.assertEqual([message.to for message in sms.outbox], ['09012345678'])
+        self.assertEqual(deliver_pending(), {'sent': 0, 'skipped': 0, 'retry': 0, 'failed': 0})
+
+    def test_retry_with_backoff(self):
+        create_notification(self.stylist, 'appointment', '新しい予約', '本文')
+        now = timezone.now()
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('接続できません')):
+            self.assertEqual(deliver_pending(now=now)['retry'], 1)
+            delivery = NotificationDelivery.objects.get(channel='email')
+            self.assertEqual(delivery.attempts, 1)
+            self.assertEqual(delivery.next_attempt_at, now + timedelta(seconds=60))
+
+            # 期限前は取り出さない
+            self.assertEqual(deliver_pending(now=now)['retry'], 0)
+            deliver_pending(now=delivery.next_attempt_at)
+            delivery.refresh_from_db()
+            self.assertEqual(delivery.next_attempt_at - now, timedelta(seconds=60 + 120))
+
+        deliver_pending(now=delivery.next_attempt_at)
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), ('sent', 3))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_claimed_jobs_are_leased(self):
+        create_notification(self.stylist, 'system', 'お知らせ', '本文')
+        now = timezone.now()
+        claimed = []
+
+        def send_messages(messages):
+            # 送信中は他のワーカーから取り出せない
+            claimed.extend(claim_pending(now=now))
+            return len(messages)
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=send_messages):
+            self.assertEqual(deliver_pending(now=now)['sent'], 1)
+        self.assertEqual(claimed, [])
+
+        # 送信途中で停止したワーカーのジョブは、リース期限を過ぎれば取り出し直される
+        create_notification(self.stylist, 'system', 'お知らせ', '本文')
+        now = timezone.now()
+        self.assertEqual(len(claim_pending(now=now)), 1)
+        self.assertEqual(claim_pending(now=now + timedelta(seconds=299)), [])
+        self.assertEqual(deliver_pending(now=now + timedelta(seconds=300))['sent'], 1)
+
+    def test_worker_command(self):
+        create_notification(self.stylist, 'system', 'お知らせ', '本文')
+        out = StringIO()
+        call_command('deliver_notifications', '--once', stdout=out)
+        self.assertIn('送信 1 件', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class BroadcastTest(TestCase):
+    """一斉配信が対象を1回のクエリで求め、バッチ単位でまとめて作成することを確認"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.owner = User.objects.create_user(username='owner', is_owner=True)
+        self.client.force_authenticate(self.owner)
+        self.salon = Salon.objects.create(name='CiER', address='東京都', phone_number='0312345678', email='salon@example.com')
+        other_salon = Salon.objects.create(name='別店舗', address='大阪府', phone_number='0612345678', email='other@example.com')
+        self.stylists = [User.objects.create_user(username=f'stylist{i}', user_type='stylist') for i in range(3)]
+        for user in self.stylists:
+            StylistProfile.objects.create(user=user, salon=self.salon)
+        StylistProfile.objects.create(user=User.objects.create_user(username='other', user_type='stylist'), salon=other_salon)
+
+    def broadcast(self, **params):
+        return self.client.post(reverse('broadcast-notifications'), {
+            'title': '臨時休業のお知らせ', 'message': '明日は臨時休業です', **params
+        }, format='json')
+
+    def test_salon_stylists(self):
+        response = self.broadcast(segment='salon_stylists', salon=self.salon.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['recipient_count'], 3)
+        self.assertEqual(
+            set(Notification.objects.values_list('user__username', flat=True)),
+            {'stylist0', 'stylist1', 'stylist2'}
+        )
+        self.assertEqual(
+            list(User.objects.filter(pk__in=[u.pk for u in self.stylists]).values_list('unread_notification_count', flat=True)),
+            [1, 1, 1]
+        )
+
+    def test_no_deliveries_without_preferences(self):
+        # 通知設定のないユーザーにはメール・SMS の配信ジョブを作らない
+        self.broadcast(segment='salon_stylists', salon=self.salon.id)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(NotificationDelivery.objects.exists())
+
+        NotificationPreference.objects.create(user=self.stylists[0], sms_notifications=True)
+        NotificationPreference.objects.create(user=self.stylists[1], system_notifications=False)
+        self.broadcast(segment='salon_stylists', salon=self.salon.id)
+        self.assertEqual(
+            sorted(NotificationDelivery.objects.values_list('notification__user__username', 'channel')),
+            [('stylist0', 'email'), ('stylist0', 'sms')]
+        )
+
+    def test_batches(self):
+        # 対象の取得、バッチごとに通知の INSERT・未読通知数の UPDATE・通知設定の読み込み
+        # （通知設定がないため配信ジョブの INSERT はない）
+        # （バッチごとのトランザクションはテストではセーブポイント2文）
+        with self.assertNumQueries(1 + 2 * (3 + 2)):
+            created = broadcast_notification(
+                segment_recipients('all'), 'system', 'お知らせ', '本文', batch_size=3
+            )
+        self.assertEqual(created, 5)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_batches_commit_separately(self):
+        # 2つ目のバッチで失敗しても、1つ目のバッチは作成済み・送信予約済みのまま残る
+        with patch('notifications.services.enqueue_deliveries', side_effect=[[], RuntimeError]), \
+                self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError):
+                broadcast_notification(segment_recipients('all'), 'system', 'お知らせ', '本文', batch_size=3)
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_appointment_customers(self):
+        stylist = Stylist.objects.create(user=self.stylists[0])
+        service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        day = timezone.now() + timedelta(days=1)
+        booked = User.objects.create_user(username='booked')
+        cancelled = User.objects.create_user(username='cancelled')
+        for customer, appointment_status in ((booked, 'RESERVED'), (cancelled, 'CANCELLED')):
+            Appointment.objects.create(
+                customer=customer, stylist=stylist, service=service, appointment_date=day,
+                total_amount=service.price, status=appointment_status
+            )
+        date = timezone.localdate(day).isoformat()
+        response = self.broadcast(segment='appointment_customers', date_from=date, date_to=date)
+        self.assertEqual(response.json()['recipient_count'], 1)
+        self.assertEqual(Notification.objects.get().user, booked)
+
+    def test_appointment_customers_day_boundaries(self):
+        # 期間は現地時刻の [開始日 00:00, 終了日の翌日 00:00) で判定する
+        stylist = Stylist.objects.create(user=self.stylists[0])
+        service = Service.objects.create(name='カット', duration_minutes=60, price=5000)
+        day = timezone.localdate() + timedelta(days=1)
+        start, end = day_bounds(day)
+        for username, appointment_date in (
+            ('before', start - timedelta(minutes=1)), ('first', start),
+            ('last', end - timedelta(minutes=1)), ('after', end),
+        ):
+            Appointment.objects.create(
+                customer=User.objects.create_user(username=username), stylist=stylist, service=service,
+                appointment_date=appointment_date, total_amount=service.price, status='RESERVED'
+            )
+        recipients = segment_recipients('appointment_customers', date_from=day, date_to=day)
+        self.assertEqual(
+            set(User.objects.filter(pk__in=recipients).values_list('username', flat=True)), {'first', 'last'}
+        )
+
+    def test_permissions(self):
+        manager = User.objects.create_user(username='manager', is_manager=True)
+        self.client.force_authenticate(manager)
+        self.assertEqual(self.broadcast(segment='all').status_code, 403)
+        self.client.force_authenticate(self.stylists[0])
+        self.assertEqual(self.broadcast(segment='salon_stylists', salon=self.salon.id).status_code, 403)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_broadcast', '--users', '20', '--batch-size', '10', stdout=out)
+        self.assertIn('一斉配信', out.getvalue())
+        self.assertFalse(Notification.objects.exists())
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={'default': 90, 'reminder': 30, 'system': None})
+class RetentionTest(TestCase):
+    """保存期間を過ぎた既読通知だけがバッチ単位で削除・退避されることを確認"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer')
+
+    def notify(self, notification_type, days_ago, read=True):
+        notification = create_notification(self.user, notification_type, f'{notification_type} {days_ago}日前', '本文')
+        Notification.objects.filter(pk=notification.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago), read=read
+        )
+        return notification
+
+    def test_purge(self):
+        expired = [self.notify('appointment', 100 + i) for i in range(5)]
+        kept = [
+            self.notify('appointment', 10),
+            self.notify('appointment', 100, read=False),
+            self.notify('reminder', 20),
+            self.notify('system', 1000),
+        ]
+        expired.append(self.notify('reminder', 40))
+
+        batches = list(purge_expired_notifications(batch_size=2))
+        self.assertEqual(batches, [('appointment', 2), ('appointment', 2), ('appointment', 1), ('reminder', 1)])
+        self.assertEqual(
+            set(Notification.objects.values_list('pk', flat=True)), {notification.pk for notification in kept}
+        )
+        self.assertFalse(NotificationDelivery.objects.filter(notification_id__in=[n.pk for n in expired]).exists())
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_archive_command(self):
+        expired = self.notify('review', 200)
+        self.notify('review', 1)
+        out = StringIO()
+        call_command('purge_notifications', '--archive', '--pause', '0', stdout=out)
+        self.assertIn('1 件の通知を退避・削除しました', out.getvalue())
+        archived = NotificationArchive.objects.get()
+        self.assertEqual((archived.original_id, archived.title), (expired.pk, expired.title))
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class NotificationPaginationTest(TestCase):
+    """通知一覧が既定でカーソルページネーション（COUNT なし）になり、?page= で従来形式も使えることを確認"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='customer')
+        self.client.force_authenticate(self.user)
+        created_at = timezone.now()
+        # 同じ作成日時の通知も id で順序が決まる
+        Notification.objects.bulk_create([
+            Notification(
+                user=self.user, type='reminder' if i % 2 else 'system', title=f'通知{i}', message='本文',
+                read=i % 3 == 0, created_at=created_at - timedelta(minutes=i // 2)
+            )
+            for i in range(7)
+        ])
+
+    def titles(self, params):
+        titles, cursor = [], None
+        while True:
+            query = {**params, 'page_size': 3, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                data = self.client.get(reverse('get-notifications'), query).json()
+            self.assertNotIn('count', data)
+            titles += [notification['title'] for notification in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                return titles
+
+    def test_cursor_pages(self):
+        expected = list(Notification.objects.order_by('-created_at', '-id').values_list('title', flat=True))
+        self.assertEqual(self.titles({}), expected)
+        self.assertEqual(
+            self.titles({'type': 'reminder'}),
+            [title for title in expected if int(title[2:]) % 2]
+        )
+        self.assertEqual(
+            self.titles({'unread_only': 'true'}),
+            [title for title in expected if int(title[2:]) % 3]
+        )
+
+    def test_page_number_compat(self):
+        data = self.client.get(reverse('get-notifications'), {'page': 2, 'page_size': 5}).json()
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(len(data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('get-notifications'), {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 404)
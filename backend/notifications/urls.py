@@ -6,6 +6,11 @@ urlpatterns = [
     path('<int:notification_id>/', views.mark_notification_read, name='mark-notification-read'),
     path('<int:notification_id>/delete/', views.delete_notification, name='delete-notification'),
     path('mark-all-read/', views.mark_all_notifications_read, name='mark-all-notifications-read'),
+    path('bulk-read/', views.bulk_mark_notifications, name='bulk-mark-notifications'),
+    path('bulk-delete/', views.bulk_delete_notifications, name='bulk-delete-notifications'),
+    path('broadcast/', views.broadcast_notifications, name='broadcast-notifications'),
+    path('stream/', views.notification_stream, name='notification-stream'),
+    path('stream/token/', views.create_stream_token, name='notification-stream-token'),
     path('unread-count/', views.get_unread_count, name='get-unread-count'),
     path('preferences/', views.notification_preferences, name='notification-preferences'),
 ]
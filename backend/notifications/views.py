@@ -1,24 +1,48 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
 from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from .models import Notification, NotificationPreference
-from .serializers import NotificationSerializer, NotificationPreferenceSerializer
+from .serializers import (
+    NotificationSerializer, NotificationPreferenceSerializer, NotificationBulkSerializer,
+    NotificationBulkMarkSerializer, NotificationBroadcastSerializer
+)
+from .services import mark_notifications, delete_notifications, segment_recipients, broadcast_notification
+from accounts.permissions import IsSalonManager
+from cier_project.pagination import KeysetPagination
+from .authentication import stream_token_for, stream_token_max_age, user_for_stream_token
+from .events import channel_for, sse_frame
+from .pubsub import get_broker
 
 
 class NotificationPagination(PageNumberPagination):
+    """ページ番号によるページネーション（?page= を指定した場合のみ。互換性のため残している）"""
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
+class NotificationCursorPagination(KeysetPagination):
+    """通知一覧用のカーソルページネーション（(created_at, id) の降順。COUNT を行わない）"""
+    ordering_field = 'created_at'
+    page_size = 20
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_notifications(request):
     """
-    ユーザーの通知一覧を取得
+    ユーザーの通知一覧を取得（無限スクロール用に next_cursor を返す）
     """
     notifications = Notification.objects.filter(user=request.user)
     
@@ -31,8 +55,11 @@ def get_notifications(request):
     if unread_only == 'true':
         notifications = notifications.filter(read=False)
     
-    # ページネーション
-    paginator = NotificationPagination()
+    # ページネーション（既定はカーソル。?page= 指定時のみ従来のページ番号方式）
+    if NotificationPagination.page_query_param in request.query_params:
+        paginator = NotificationPagination()
+    else:
+        paginator = NotificationCursorPagination()
     page = paginator.paginate_queryset(notifications, request)
     
     if page is not None:
@@ -47,21 +74,18 @@ def get_notifications(request):
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, notification_id):
     """
-    通知を既読にする
+    通知を既読にする（未読から既読に変わった場合だけ未読通知数を減らす）
     """
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.read = True
-        notification.save()
-        
-        serializer = NotificationSerializer(notification)
-        return Response(serializer.data)
-    
-    except Notification.DoesNotExist:
+    mark_notifications(request.user, ids=[notification_id])
+    notification = Notification.objects.filter(id=notification_id, user=request.user).first()
+    if notification is None:
         return Response(
             {'error': '通知が見つかりません'},
             status=status.HTTP_404_NOT_FOUND
         )
+    
+    serializer = NotificationSerializer(notification)
+    return Response(serializer.data)
 
 
 @api_view(['PATCH'])
@@ -70,12 +94,44 @@ def mark_all_notifications_read(request):
     """
     すべての通知を既読にする
     """
-    notifications = Notification.objects.filter(user=request.user, read=False)
-    notifications.update(read=True)
+    updated_count = mark_notifications(request.user)
     
     return Response({
-        'message': f'{notifications.count()}件の通知を既読にしました',
-        'updated_count': notifications.count()
+        'message': f'{updated_count}件の通知を既読にしました',
+        'updated_count': updated_count
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_mark_notifications(request):
+    """
+    ID リストまたは条件で通知をまとめて既読にする（"mark_read": false なら未読に戻す）
+    """
+    serializer = NotificationBulkMarkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    mark_read = serializer.validated_data['mark_read']
+    updated_count = mark_notifications(request.user, **serializer.validated_data)
+    
+    return Response({
+        'message': f'{updated_count}件の通知を{"既読" if mark_read else "未読"}にしました',
+        'updated_count': updated_count
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_delete_notifications(request):
+    """
+    ID リストまたは条件で通知をまとめて削除
+    """
+    serializer = NotificationBulkSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    deleted_count = delete_notifications(request.user, **serializer.validated_data)
+    
+    return Response({
+        'message': f'{deleted_count}件の通知を削除しました',
+        'deleted_count': deleted_count
     })
 
 
@@ -83,10 +139,94 @@ def mark_all_notifications_read(request):
 @permission_classes([IsAuthenticated])
 def get_unread_count(request):
     """
-    未読通知数を取得
+    未読通知数を取得（User の集計カラムを返すため集計クエリは発行しない）
+    """
+    return Response({'count': request.user.unread_notification_count})
+
+
+@api_view(['POST'])
+@permission_classes([IsSalonManager])
+def broadcast_notifications(request):
     """
-    count = Notification.objects.filter(user=request.user, read=False).count()
-    return Response({'count': count})
+    お知らせの一斉配信（サロンのスタイリスト・期間内に予約のある顧客・全ユーザー）
+    """
+    serializer = NotificationBroadcastSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    if params['segment'] == 'all' and not request.user.is_owner:
+        return Response(
+            {'error': '全ユーザーへの配信はオーナーのみ実行できます'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    recipients = segment_recipients(
+        params['segment'],
+        salon=params.get('salon'),
+        date_from=params.get('date_from'),
+        date_to=params.get('date_to')
+    )
+    created_count = broadcast_notification(
+        recipients, params['type'], params['title'], params['message'],
+        urgent=params['urgent'], data=params['data']
+    )
+    return Response({
+        'message': f'{created_count}件の通知を送信しました',
+        'recipient_count': created_count
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_stream_token(request):
+    """
+    通知ストリームの接続用トークンを発行（EventSource の ?token= に渡す）
+    """
+    return Response({
+        'token': stream_token_for(request.user),
+        'expires_in': stream_token_max_age()
+    })
+
+
+@require_GET
+async def notification_stream(request):
+    """
+    通知ストリーム（Server-Sent Events）
+
+    接続直後に現在の未読通知数を送り、以降は通知の作成（notification）と
+    未読通知数の変化（unread_count）をプッシュする。一定間隔でコメント行を送り接続を保つ。
+    認証は ?token=（create_stream_token で発行）または Authorization ヘッダーの JWT。
+    """
+    token = request.GET.get('token')
+    if token:
+        user = await sync_to_async(user_for_stream_token)(token)
+        if user is None:
+            return JsonResponse({'detail': 'トークンが無効か、有効期限が切れています。'}, status=401)
+    else:
+        try:
+            authenticated = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=401)
+        if authenticated is None:
+            return JsonResponse({'detail': '認証情報が含まれていません。'}, status=401)
+        user = authenticated[0]
+
+    heartbeat = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+
+    async def events():
+        # 購読はレスポンスの送信が始まってから登録し、切断時に必ず解除する
+        async with get_broker().subscribe(channel_for(user.pk)) as subscription:
+            yield sse_frame('unread_count', {'count': user.unread_notification_count, 'delta': 0})
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # リバースプロキシでバッファリングさせない
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['DELETE'])
@@ -95,16 +235,12 @@ def delete_notification(request, notification_id):
     """
     通知を削除
     """
-    try:
-        notification = Notification.objects.get(id=notification_id, user=request.user)
-        notification.delete()
-        return Response({'message': '通知を削除しました'})
-    
-    except Notification.DoesNotExist:
+    if not delete_notifications(request.user, ids=[notification_id]):
         return Response(
             {'error': '通知が見つかりません'},
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response({'message': '通知を削除しました'})
 
 
 @api_view(['GET', 'PUT'])
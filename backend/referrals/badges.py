@@ -0,0 +1,60 @@
+"""
+紹介実績バッジの判定
+
+紹介成功数は User.successful_referral_count で保持しているため、バッジは成功数が
+しきい値をまたいだときだけ、まとめて1回の upsert で付与する。Badge.referral_count には
+獲得時点の紹介成功数（しきい値）を記録する。バッジは成功数が減っても取り消さない。
+"""
+from django.db.models import Count
+
+from accounts.models import Badge
+from accounts.stats import refresh_badge_summaries
+from .models import Referral
+
+
+# バッジの基準（紹介成功数）
+BADGE_THRESHOLDS = [
+    ('bronze', 1),
+    ('silver', 5),
+    ('gold', 10),
+    ('platinum', 20),
+]
+
+
+def earned_badges(user_id, previous_count, count):
+    """previous_count から count への変化でまたいだしきい値のバッジ（未保存）"""
+    return [
+        Badge(user_id=user_id, badge_type=badge_type, referral_count=threshold)
+        for badge_type, threshold in BADGE_THRESHOLDS
+        if previous_count < threshold <= count
+    ]
+
+
+def save_badges(badges):
+    """バッジをまとめて upsert し、対象ユーザーの獲得バッジ一覧を更新"""
+    if not badges:
+        return 0
+    Badge.objects.bulk_create(
+        badges,
+        update_conflicts=True,
+        unique_fields=['user', 'badge_type'],
+        update_fields=['referral_count'],
+    )
+    # bulk_create はシグナルを送らないため獲得バッジ一覧はここで更新する
+    refresh_badge_summaries({badge.user_id for badge in badges})
+    return len(badges)
+
+
+def award_badges(user_id, previous_count, count):
+    return save_badges(earned_badges(user_id, previous_count, count))
+
+
+def backfill_badges():
+    """全ユーザーの紹介成功数を1回の集計クエリで求め、到達済みのバッジをすべて付与する"""
+    counts = Referral.objects.filter(is_successful=True).values('referrer').annotate(
+        count=Count('pk')
+    ).order_by()
+    badges = []
+    for row in counts:
+        badges.extend(earned_badges(row['referrer'], 0, row['count']))
+    return save_badges(badges)
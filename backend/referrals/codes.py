@@ -0,0 +1,138 @@
+"""
+紹介コードの発行と参照
+
+コードは secrets による8文字の英大文字・数字。発行時は一意制約の衝突を検知して作り直し、
+まとめて発行する場合は候補を一括生成して既存コードを1クエリで除外する。
+
+公開の検証エンドポイントや予約作成では、コード → 紹介者の対応をキャッシュから引く。
+存在しないコードも短時間キャッシュし、総当たりの問い合わせが DB に届かないようにする。
+無効化はキャッシュの削除で行うため、別プロセスへ即時に届くのは共有キャッシュの場合だけである
+（プロセス内メモリのキャッシュでは保持時間を短くしている。settings.REFERRAL_CODE_CACHE_TIMEOUT）。
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from accounts.serializers import UserSummarySerializer
+from .models import ReferralLink, REFERRAL_CODE_ALPHABET, REFERRAL_CODE_LENGTH, generate_referral_code
+
+MAX_ATTEMPTS = 5
+
+# 存在しないコードのキャッシュ
+MISSING = 'missing'
+
+
+def normalize_code(code):
+    return code.strip().upper()
+
+
+def allocate_codes(count):
+    """既存と重複しない未使用のコードを count 件まとめて生成"""
+    codes = set()
+    while len(codes) < count:
+        candidates = {generate_referral_code() for _ in range(count - len(codes))} - codes
+        taken = set(ReferralLink.objects.filter(referral_code__in=candidates).values_list('referral_code', flat=True))
+        codes |= candidates - taken
+    return list(codes)
+
+
+def create_referral_link(referrer, **fields):
+    """紹介リンクを作成（コードが衝突した場合は作り直す）"""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return ReferralLink.objects.create(referrer=referrer, referral_code=generate_referral_code(), **fields)
+        except IntegrityError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+
+
+def get_or_create_referral_link(referrer):
+    """ユーザーの紹介リンク（なければ作成）"""
+    referral_link = ReferralLink.objects.filter(referrer=referrer).order_by('id').first()
+    if referral_link is None:
+        referral_link = create_referral_link(referrer, is_active=True)
+    return referral_link
+
+
+def bulk_create_referral_links(referrers, batch_size=1000):
+    """
+    紹介リンクのないユーザーにまとめてリンクを発行（コードはバッチごとに一括で事前確保）
+
+    確保から INSERT までの間に同じコードが別に発行された場合は、そのバッチのコードを取り直す。
+    """
+    created = []
+    for start in range(0, len(referrers), batch_size):
+        batch = referrers[start:start + batch_size]
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    created.extend(ReferralLink.objects.bulk_create([
+                        ReferralLink(referrer=referrer, referral_code=code)
+                        for referrer, code in zip(batch, allocate_codes(len(batch)))
+                    ]))
+                break
+            except IntegrityError:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+    return created
+
+
+def _cache_key(code):
+    return f'referral-code:{code}'
+
+
+def _timeout():
+    return getattr(settings, 'REFERRAL_CODE_CACHE_TIMEOUT', 3600)
+
+
+def _missing_timeout():
+    return getattr(settings, 'REFERRAL_CODE_MISSING_TIMEOUT', 60)
+
+
+def lookup_referral_code(code, verify=False):
+    """
+    有効な紹介コードの {link_id, referrer_id, referrer} を返す（無効なら None）
+
+    referrer は紹介者の概要表現（リクエストを使わないため画像URLは相対パス）。
+    verify=True なら、キャッシュから返す前にリンクがまだ有効かを主キーで確認する
+    （紹介の記録など、無効化の反映待ちの間に古いエントリを使ってはいけない書き込み用）。
+    """
+    code = normalize_code(code)
+    if len(code) != REFERRAL_CODE_LENGTH or not set(code) <= set(REFERRAL_CODE_ALPHABET):
+        return None
+
+    entry = cache.get(_cache_key(code))
+    if entry is None:
+        referral_link = ReferralLink.objects.select_related('referrer').filter(
+            referral_code=code,
+            is_active=True
+        ).first()
+        if referral_link is None:
+            cache.set(_cache_key(code), MISSING, _missing_timeout())
+            return None
+        entry = {
+            'code': referral_link.referral_code,
+            'link_id': referral_link.id,
+            'referrer_id': referral_link.referrer_id,
+            'referrer': UserSummarySerializer(referral_link.referrer).data,
+        }
+        cache.set(_cache_key(code), entry, _timeout())
+    elif verify and entry != MISSING and not ReferralLink.objects.filter(
+        pk=entry['link_id'],
+        referral_code=code,
+        is_active=True
+    ).exists():
+        cache.delete(_cache_key(code))
+        return None
+    return None if entry == MISSING else entry
+
+
+def invalidate_referral_codes(*codes):
+    """紹介リンクや紹介者の変更時：キャッシュを削除し、コミット後にもう一度削除する"""
+    keys = [_cache_key(code) for code in codes]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # コミット前のデータから作られたエントリが再度キャッシュされていても消す
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from referrals.badges import backfill_badges
+
+
+class Command(BaseCommand):
+    help = '全ユーザーの紹介成功数を集計し、到達済みの紹介実績バッジをまとめて付与します'
+
+    def handle(self, *args, **options):
+        saved = backfill_badges()
+        self.stdout.write(self.style.SUCCESS(f'{saved} 件のバッジを付与・更新しました'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from referrals.codes import bulk_create_referral_links
+
+
+class Command(BaseCommand):
+    help = '紹介リンクのないユーザーに、一括で確保したコードで紹介リンクを発行します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回で発行する件数（既定1000）')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        created = 0
+        while True:
+            users = list(User.objects.filter(referral_links__isnull=True).order_by('id')[:batch_size])
+            if not users:
+                break
+            created += len(bulk_create_referral_links(users, batch_size=batch_size))
+        self.stdout.write(self.style.SUCCESS(f'{created} 件の紹介リンクを発行しました'))
@@ -1,13 +1,15 @@
 from django.db import models
 from django.conf import settings
+import secrets
 import string
-import random
+
+REFERRAL_CODE_ALPHABET = string.ascii_uppercase + string.digits
+REFERRAL_CODE_LENGTH = 8
 
 
 def generate_referral_code():
-    """シンプルな8文字の英数字コードを生成"""
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(8))
+    """推測されにくい8文字の英数字コードを生成（衝突時の作り直しは referrals.codes で行う）"""
+    return ''.join(secrets.choice(REFERRAL_CODE_ALPHABET) for _ in range(REFERRAL_CODE_LENGTH))
 
 
 class ReferralLink(models.Model):
@@ -18,7 +20,7 @@ class ReferralLink(models.Model):
         related_name='referral_links'
     )
     referral_code = models.CharField(
-        max_length=8,
+        max_length=REFERRAL_CODE_LENGTH,
         unique=True,
         default=generate_referral_code,
         verbose_name='紹介コード'
@@ -0,0 +1,49 @@
+"""
+紹介リンクのQRコード画像
+
+画像は紹介URLだけで決まるため、URLのハッシュをファイル名にしてメディアストレージへ一度だけ保存し、
+以降はファイルを読むだけにする。URLが変われば別のファイル名になるので、配信時は長期キャッシュできる。
+"""
+import hashlib
+import io
+
+import qrcode
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+QR_DIRECTORY = 'referral_qr'
+
+
+def qr_digest(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def qr_image_name(digest):
+    return f'{QR_DIRECTORY}/{digest}.png'
+
+
+def render_qr_png(url):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def ensure_qr_image(url):
+    """URLのQRコード画像を（なければ生成して）保存し、ダイジェストを返す"""
+    digest = qr_digest(url)
+    name = qr_image_name(digest)
+    if not default_storage.exists(name):
+        saved_name = default_storage.save(name, ContentFile(render_qr_png(url)))
+        # 同時に生成された場合、ストレージは別名で保存するので重複分を消す
+        if saved_name != name:
+            default_storage.delete(saved_name)
+    return digest
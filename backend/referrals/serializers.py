@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import ReferralLink, Referral
-from accounts.serializers import UserSerializer
+from accounts.serializers import UserSerializer, UserSummarySerializer
+from cier_project.serializers import SparseFieldsetsMixin
 
 
 class ReferralLinkSerializer(serializers.ModelSerializer):
@@ -11,12 +12,13 @@ class ReferralLinkSerializer(serializers.ModelSerializer):
         fields = ['id', 'referral_code', 'referral_url', 'is_active', 'created_at']
 
 
-class ReferralSerializer(serializers.ModelSerializer):
-    referrer = UserSerializer(read_only=True)
-    referred_user = UserSerializer(read_only=True)
+class ReferralSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    referrer = UserSummarySerializer(read_only=True)
+    referred_user = UserSummarySerializer(read_only=True)
     
     class Meta:
         model = Referral
         fields = [
             'id', 'referrer', 'referred_user', 'is_successful', 'created_at'
         ]
+        expandable_fields = {'referrer': UserSerializer, 'referred_user': UserSerializer}
@@ -1,34 +1,60 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
-from .models import Referral
-from accounts.models import Badge
+from accounts.models import User
+from accounts.stats import adjust_counter, increment_counter
+from .badges import award_badges
+from .codes import invalidate_referral_codes
+from .models import Referral, ReferralLink
+
+
+@receiver(post_init, sender=Referral)
+def remember_referral_state(sender, instance, **kwargs):
+    # 遅延読み込みのフィールドには触れない
+    instance._original_success = (
+        instance.__dict__.get('referrer_id'),
+        instance.__dict__.get('is_successful', False)
+    )
 
 
 @receiver(post_save, sender=Referral)
-def update_referral_badges(sender, instance, **kwargs):
-    """紹介成功時にバッジを更新"""
+def count_successful_referral(sender, instance, created, **kwargs):
+    """紹介の成功・取り消し時に紹介成功数を更新し、しきい値をまたいだらバッジを付与"""
+    original_referrer_id, was_successful = (None, False) if created else instance._original_success
+    if (original_referrer_id, was_successful) != (instance.referrer_id, instance.is_successful):
+        if was_successful:
+            adjust_counter(original_referrer_id, 'successful_referral_count', -1)
+        if instance.is_successful:
+            # 紹介は自動コミットで作成されるため、増分・読み直し・バッジ付与を1つのトランザクションで行い、
+            # 同時に成功した紹介が同じ成功数を読んでしきい値のバッジを取りこぼさないようにする
+            with transaction.atomic():
+                counts = increment_counter(instance.referrer_id, 'successful_referral_count')
+                if counts:
+                    award_badges(instance.referrer_id, *counts)
+    instance._original_success = (instance.referrer_id, instance.is_successful)
+
+
+@receiver(post_delete, sender=Referral)
+def uncount_successful_referral(sender, instance, **kwargs):
     if instance.is_successful:
-        referrer = instance.referrer
-        successful_count = Referral.objects.filter(
-            referrer=referrer,
-            is_successful=True
-        ).count()
-        
-        # バッジの基準
-        badge_thresholds = {
-            'bronze': 1,
-            'silver': 5,
-            'gold': 10,
-            'platinum': 20,
-        }
-        
-        for badge_type, threshold in badge_thresholds.items():
-            if successful_count >= threshold:
-                badge, created = Badge.objects.get_or_create(
-                    user=referrer,
-                    badge_type=badge_type,
-                    defaults={'referral_count': successful_count}
-                )
-                if not created:
-                    badge.referral_count = successful_count
-                    badge.save()
+        adjust_counter(instance.referrer_id, 'successful_referral_count', -1)
+
+
+@receiver(post_init, sender=ReferralLink)
+def remember_referral_code(sender, instance, **kwargs):
+    instance._original_code = instance.__dict__.get('referral_code')
+
+
+@receiver([post_save, post_delete], sender=ReferralLink)
+def invalidate_referral_link(sender, instance, **kwargs):
+    """コードの有効・無効や紹介者の変更をキャッシュへ反映（変更前のコードも消す）"""
+    invalidate_referral_codes(*{instance._original_code, instance.referral_code} - {None})
+    instance._original_code = instance.referral_code
+
+
+@receiver(post_save, sender=User)
+def invalidate_referrer_codes(sender, instance, created, update_fields=None, **kwargs):
+    """紹介者の表示名・画像の変更をキャッシュへ反映（ログイン時刻のみの保存は無視）"""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_referral_codes(*instance.referral_links.values_list('referral_code', flat=True))
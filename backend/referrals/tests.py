@@ -1,3 +1,215 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest.mock import patch
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User, Badge
+from .codes import allocate_codes, bulk_create_referral_links, create_referral_link, lookup_referral_code
+from .models import ReferralLink, Referral
 
-# Create your tests here.
+
+class ReferralBadgeTest(TestCase):
+    """紹介成功数がしきい値をまたいだときだけバッジを書き込むことを確認"""
+
+    def setUp(self):
+        self.referrer = User.objects.create_user(username='referrer')
+        self.link = ReferralLink.objects.create(referrer=self.referrer)
+        self.referral_count = 0
+
+    def refer(self, is_successful=True):
+        self.referral_count += 1
+        referred = User.objects.create_user(username=f'referred{self.referral_count}')
+        return Referral.objects.create(
+            referrer=self.referrer, referred_user=referred,
+            referral_link=self.link, is_successful=is_successful
+        )
+
+    def badge_types(self):
+        return list(Badge.objects.filter(user=self.referrer).order_by('id').values_list('badge_type', flat=True))
+
+    def test_badges_awarded_on_thresholds(self):
+        self.refer()
+        self.assertEqual(self.badge_types(), ['bronze'])
+        for _ in range(4):
+            self.refer()
+        self.assertEqual(self.badge_types(), ['bronze', 'silver'])
+
+        self.referrer.refresh_from_db()
+        self.assertEqual(self.referrer.successful_referral_count, 5)
+        self.assertEqual([b['badge_type'] for b in self.referrer.badge_summary], ['bronze', 'silver'])
+        self.assertEqual(Badge.objects.get(user=self.referrer, badge_type='silver').referral_count, 5)
+
+    def test_no_badge_writes_between_thresholds(self):
+        self.refer()
+        referral = self.refer(is_successful=False)
+        referral.is_successful = True
+        # 紹介の UPDATE と、セーブポイント内の成功数の SELECT（行ロック）/ UPDATE のみ（Badge には触れない）
+        with self.assertNumQueries(5):
+            referral.save()
+
+    def test_backfill(self):
+        for _ in range(10):
+            self.refer()
+        Badge.objects.all().delete()
+        User.objects.update(badge_summary=[])
+
+        call_command('backfill_badges', stdout=StringIO())
+        self.assertEqual(self.badge_types(), ['bronze', 'silver', 'gold'])
+        self.referrer.refresh_from_db()
+        self.assertEqual(len(self.referrer.badge_summary), 3)
+
+
+class ConcurrentReferralBadgeTest(TransactionTestCase):
+    """同時に成功した紹介でも、またいだしきい値のバッジを取りこぼさないことを確認"""
+
+    THREADS = 4
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('インメモリSQLiteではスレッドごとの接続を分けられないため')
+        self.referrer = User.objects.create_user(username='referrer')
+        self.link = ReferralLink.objects.create(referrer=self.referrer)
+        for i in range(3):
+            self.refer(User.objects.create_user(username=f'referred{i}'))
+        self.referred = [User.objects.create_user(username=f'concurrent{i}') for i in range(self.THREADS)]
+
+    def refer(self, referred):
+        return Referral.objects.create(
+            referrer=self.referrer, referred_user=referred, referral_link=self.link, is_successful=True
+        )
+
+    def refer_in_thread(self, referred, barrier, errors):
+        try:
+            barrier.wait()
+            self.refer(referred)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    def test_threshold_crossed_concurrently(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        threads = [
+            threading.Thread(target=self.refer_in_thread, args=(referred, barrier, errors))
+            for referred in self.referred
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.referrer.refresh_from_db()
+        self.assertEqual(self.referrer.successful_referral_count, 3 + self.THREADS)
+        self.assertTrue(Badge.objects.filter(user=self.referrer, badge_type='silver').exists())
+
+
+class ReferralQRCodeTest(TestCase):
+    """QRコード画像が一度だけ生成され、PNG として長期キャッシュ付きで配信されることを確認"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='referrer')
+        self.client.force_authenticate(self.user)
+
+    def test_qr_code_image(self):
+        first = self.client.get(reverse('get_qr_code')).json()
+        second = self.client.get(reverse('get_qr_code')).json()
+        self.assertEqual(first['qr_code'], second['qr_code'])
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'referral_qr'))), 1)
+
+        self.client.force_authenticate(None)
+        response = self.client.get(first['qr_code'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'\x89PNG'))
+
+    def test_unknown_image(self):
+        response = self.client.get(reverse('referral_qr_image', args=['0' * 32]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ReferralCodeTest(TestCase):
+    """紹介コードの発行（衝突時の作り直し・一括確保）と、キャッシュ経由の検証を確認"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.referrer = User.objects.create_user(username='referrer', first_name='花子')
+
+    def test_retry_on_collision(self):
+        existing = ReferralLink.objects.create(referrer=self.referrer, referral_code='AAAAAAAA')
+        with patch('referrals.codes.generate_referral_code', side_effect=['AAAAAAAA', 'BBBBBBBB']):
+            link = create_referral_link(User.objects.create_user(username='other'))
+        self.assertEqual(link.referral_code, 'BBBBBBBB')
+        self.assertNotEqual(link.pk, existing.pk)
+
+    def test_allocate_codes_skips_taken(self):
+        ReferralLink.objects.create(referrer=self.referrer, referral_code='AAAAAAAA')
+        with patch('referrals.codes.generate_referral_code', side_effect=['AAAAAAAA', 'BBBBBBBB', 'CCCCCCCC']):
+            self.assertEqual(sorted(allocate_codes(2)), ['BBBBBBBB', 'CCCCCCCC'])
+
+    def test_bulk_create_retries_on_collision(self):
+        # 事前確保の後に同じコードが発行された場合
+        ReferralLink.objects.create(referrer=self.referrer, referral_code='AAAAAAAA')
+        users = [User.objects.create_user(username=f'user{i}') for i in range(2)]
+        with patch('referrals.codes.allocate_codes', side_effect=[['AAAAAAAA', 'BBBBBBBB'], ['CCCCCCCC', 'DDDDDDDD']]):
+            links = bulk_create_referral_links(users)
+        self.assertEqual(sorted(link.referral_code for link in links), ['CCCCCCCC', 'DDDDDDDD'])
+        self.assertEqual(ReferralLink.objects.count(), 3)
+
+    def test_verify_ignores_stale_entry(self):
+        link = ReferralLink.objects.create(referrer=self.referrer)
+        self.assertIsNotNone(lookup_referral_code(link.referral_code))
+        # シグナルを通らない無効化（別プロセスでの変更でキャッシュの削除が届かない場合と同じ）
+        ReferralLink.objects.filter(pk=link.pk).update(is_active=False)
+        self.assertIsNotNone(lookup_referral_code(link.referral_code))
+        self.assertIsNone(lookup_referral_code(link.referral_code, verify=True))
+        self.assertIsNone(lookup_referral_code(link.referral_code))
+
+    def test_create_referral_links_command(self):
+        User.objects.create_user(username='other')
+        ReferralLink.objects.create(referrer=self.referrer)
+        call_command('create_referral_links', stdout=StringIO())
+        self.assertEqual(ReferralLink.objects.count(), 2)
+        self.assertFalse(User.objects.filter(referral_links__isnull=True).exists())
+
+    def test_validate_cached(self):
+        link = ReferralLink.objects.create(referrer=self.referrer)
+        url = reverse('validate_referral_code', args=[link.referral_code.lower()])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['referrer']['first_name'], '花子')
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        # 紹介者の変更・リンクの無効化はキャッシュへ反映される
+        self.referrer.first_name = '太郎'
+        self.referrer.save()
+        self.assertEqual(self.client.get(url).json()['referrer']['first_name'], '太郎')
+        link.is_active = False
+        link.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_invalid_code(self):
+        response = self.client.get(reverse('validate_referral_code', args=['not-a-code']))
+        self.assertEqual(response.status_code, 404)
+        # 存在しないコードも短時間キャッシュされる
+        self.client.get(reverse('validate_referral_code', args=['ZZZZZZZZ']))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('validate_referral_code', args=['ZZZZZZZZ']))
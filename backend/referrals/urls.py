@@ -1,10 +1,11 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('link/', views.get_referral_link, name='get_referral_link'),
     path('qr-code/', views.get_qr_code, name='get_qr_code'),
+    re_path(r'^qr-code/(?P<digest>[0-9a-f]{32})\.png$', views.referral_qr_image, name='referral_qr_image'),
     path('list/', views.ReferralListView.as_view(), name='referral_list'),
     path('stats/', views.referral_stats, name='referral_stats'),
-    path('validate/<uuid:code>/', views.validate_referral_code, name='validate_referral_code'),
+    path('validate/<str:code>/', views.validate_referral_code, name='validate_referral_code'),
 ]
@@ -2,22 +2,24 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from .models import ReferralLink, Referral
+from .models import Referral
 from .serializers import ReferralLinkSerializer, ReferralSerializer
-from accounts.serializers import UserSerializer
-import qrcode
-import io
-import base64
+from .codes import get_or_create_referral_link, lookup_referral_code
+from .qr import ensure_qr_image, qr_image_name
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+QR_IMAGE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_referral_link(request):
     """紹介リンク取得（なければ作成）"""
-    referral_link, created = ReferralLink.objects.get_or_create(
-        referrer=request.user,
-        defaults={'is_active': True}
-    )
+    referral_link = get_or_create_referral_link(request.user)
     
     serializer = ReferralLinkSerializer(referral_link)
     return Response(serializer.data)
@@ -26,42 +28,37 @@ def get_referral_link(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_qr_code(request):
-    """QRコード生成"""
-    referral_link, _ = ReferralLink.objects.get_or_create(
-        referrer=request.user,
-        defaults={'is_active': True}
-    )
-    
-    # QRコード生成
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(referral_link.referral_url)
-    qr.make(fit=True)
-    
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    
-    # 画像をBase64エンコード
-    buffer = io.BytesIO()
-    qr_img.save(buffer, format='PNG')
-    qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
+    """QRコード画像のURL取得（画像は初回のみ生成してストレージに保存）"""
+    referral_link = get_or_create_referral_link(request.user)
     
+    digest = ensure_qr_image(referral_link.referral_url)
     return Response({
-        'qr_code': f'data:image/png;base64,{qr_code_base64}',
+        'qr_code': request.build_absolute_uri(reverse('referral_qr_image', args=[digest])),
         'referral_url': referral_link.referral_url
     })
 
 
+@require_GET
+def referral_qr_image(request, digest):
+    """QRコード画像（PNG）の配信。ファイル名が内容で決まるため長期キャッシュさせる"""
+    try:
+        image = default_storage.open(qr_image_name(digest))
+    except FileNotFoundError:
+        raise Http404
+    response = FileResponse(image, content_type='image/png')
+    patch_cache_control(response, public=True, max_age=QR_IMAGE_MAX_AGE, immutable=True)
+    return response
+
+
 class ReferralListView(generics.ListAPIView):
     """紹介実績一覧"""
     serializer_class = ReferralSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Referral.objects.filter(referrer=self.request.user)
+        return Referral.objects.filter(
+            referrer=self.request.user
+        ).select_related('referrer', 'referred_user')
 
 
 @api_view(['GET'])
@@ -84,20 +81,20 @@ def referral_stats(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])  # 未ログインユーザーでも利用可能
 def validate_referral_code(request, code):
-    """紹介コード検証"""
-    try:
-        referral_link = ReferralLink.objects.get(
-            referral_code=code,
-            is_active=True
-        )
-        user_serializer = UserSerializer(referral_link.referrer)
-        return Response({
-            'valid': True,
-            'referrer': user_serializer.data,
-            'code': str(referral_link.referral_code)
-        })
-    except ReferralLink.DoesNotExist:
+    """紹介コード検証（コード → 紹介者はキャッシュから引く）"""
+    entry = lookup_referral_code(code)
+    if entry is None:
         return Response({
             'valid': False,
             'message': '無効な紹介コードです'
         }, status=404)
+
+    # 未ログインでも参照できるため、紹介者は概要表現のみ返す
+    referrer = dict(entry['referrer'])
+    if referrer.get('profile_image'):
+        referrer['profile_image'] = request.build_absolute_uri(referrer['profile_image'])
+    return Response({
+        'valid': True,
+        'referrer': referrer,
+        'code': entry['code']
+    })
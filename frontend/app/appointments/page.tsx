@@ -42,7 +42,9 @@ export default function AppointmentsPage() {
     enabled: mounted && !isLoading && !!user && !shouldRedirect
   });
 
-  const appointments = appointmentsResponse?.data || [];
+  const appointments = Array.isArray(appointmentsResponse?.data)
+    ? appointmentsResponse.data
+    : (appointmentsResponse?.data as { results?: Appointment[] })?.results || [];
 
   // Prevent hydration mismatch by not rendering until client-side
   if (!mounted || isLoading || shouldRedirect) {
@@ -15,6 +15,9 @@ export default function NotificationsPage() {
   const [mounted, setMounted] = useState(false);
   const [notifications, setNotifications] = useState<Notification[]>([]);
   const [loading, setLoading] = useState(false);
+  // 次のページのカーソル（最後のページなら null）
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filter, setFilter] = useState<'all' | 'unread' | 'read'>('all');
   const [typeFilter, setTypeFilter] = useState<string>('all');
   const [searchQuery, setSearchQuery] = useState('');
@@ -142,9 +145,10 @@ export default function NotificationsPage() {
       // 実際のAPIを使用
       const response = await notificationsAPI.getAll();
       
-      // APIレスポンスが配列であることを確認
-      const notificationsData = Array.isArray(response.data) ? response.data : [];
+      // 一覧はカーソルページネーション（{ next, next_cursor, results }）
+      const notificationsData = Array.isArray(response.data?.results) ? response.data.results : [];
       setNotifications(notificationsData);
+      setNextCursor(response.data?.next_cursor ?? null);
     } catch (error) {
       console.error('通知の取得に失敗しました:', error);
       // エラー時はダミーデータを使用
@@ -154,6 +158,20 @@ export default function NotificationsPage() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const { data } = await notificationsAPI.getAll(nextCursor);
+      setNotifications(prev => [...prev, ...data.results]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (error) {
+      console.error('通知の追加読み込みに失敗しました:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const markAsRead = async (id: number) => {
     try {
       await notificationsAPI.markAsRead(id);
@@ -441,6 +459,17 @@ export default function NotificationsPage() {
                 ))}
               </div>
             )}
+            {!loading && nextCursor && (
+              <div className="p-4 border-t border-gray-100">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="block w-full py-2 text-center text-sm font-medium text-blue-600 hover:text-blue-700 disabled:text-gray-400"
+                >
+                  {loadingMore ? '読み込み中...' : 'さらに読み込む'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
@@ -6,6 +6,9 @@ import Link from 'next/link';
 import { Notification } from '../lib/types';
 import { notificationsAPI } from '../lib/api';
 
+// 接続が切れたときに再接続するまでの待ち時間（ミリ秒）
+const STREAM_RETRY_DELAY = 5000;
+
 interface NotificationPanelProps {
   className?: string;
 }
@@ -15,6 +18,9 @@ export default function NotificationPanel({ className = '' }: NotificationPanelP
   const [unreadCount, setUnreadCount] = useState(0);
   const [isOpen, setIsOpen] = useState(false);
   const [loading, setLoading] = useState(false);
+  // 次のページのカーソル（最後のページなら null）
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // ダミーデータ（実際のAPIが実装されるまで）
   const dummyNotifications: Notification[] = [
@@ -92,6 +98,51 @@ export default function NotificationPanel({ className = '' }: NotificationPanelP
     loadNotifications();
   }, []);
 
+  // 通知ストリーム（SSE）で新しい通知と未読件数を受け取る
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const scheduleReconnect = () => {
+      if (!closed) {
+        retryTimer = setTimeout(connect, STREAM_RETRY_DELAY);
+      }
+    };
+
+    // EventSource はヘッダーを付けられないため、接続のたびに短時間のトークンを発行してクエリで渡す
+    const connect = async () => {
+      try {
+        const { data } = await notificationsAPI.streamToken();
+        if (closed) return;
+
+        source = new EventSource(notificationsAPI.streamUrl(data.token));
+        source.addEventListener('unread_count', (event) => {
+          setUnreadCount(JSON.parse((event as MessageEvent).data).count);
+        });
+        source.addEventListener('notification', (event) => {
+          const notification: Notification = JSON.parse((event as MessageEvent).data);
+          setNotifications(prev => [notification, ...prev.filter(n => n.id !== notification.id)]);
+        });
+        source.onerror = () => {
+          // ブラウザの自動再接続では期限切れのトークンを使うため、閉じて新しいトークンで接続し直す
+          source?.close();
+          scheduleReconnect();
+        };
+      } catch (error) {
+        console.error('通知ストリームへの接続に失敗しました:', error);
+        scheduleReconnect();
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
+  }, []);
+
   const loadNotifications = async () => {
     try {
       setLoading(true);
@@ -101,11 +152,12 @@ export default function NotificationPanel({ className = '' }: NotificationPanelP
         notificationsAPI.getUnreadCount()
       ]);
       
-      // APIレスポンスが配列であることを確認
-      const notificationsData = Array.isArray(notificationsRes.data) ? notificationsRes.data : [];
+      // 一覧はカーソルページネーション（{ next, next_cursor, results }）
+      const notificationsData = Array.isArray(notificationsRes.data?.results) ? notificationsRes.data.results : [];
       const unreadCountData = unreadCountRes.data?.count || 0;
       
       setNotifications(notificationsData);
+      setNextCursor(notificationsRes.data?.next_cursor ?? null);
       setUnreadCount(unreadCountData);
     } catch (error) {
       console.error('通知の取得に失敗しました:', error);
@@ -117,6 +169,24 @@ export default function NotificationPanel({ className = '' }: NotificationPanelP
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const { data } = await notificationsAPI.getAll(nextCursor);
+      // ストリームで先に追加された通知と重複しないようにする
+      setNotifications(prev => [
+        ...prev,
+        ...data.results.filter(notification => !prev.some(n => n.id === notification.id))
+      ]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (error) {
+      console.error('通知の追加読み込みに失敗しました:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const markAsRead = async (id: number) => {
     try {
       await notificationsAPI.markAsRead(id);
@@ -263,6 +333,15 @@ export default function NotificationPanel({ className = '' }: NotificationPanelP
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="block w-full p-3 text-center text-sm text-blue-600 hover:text-blue-700 hover:bg-gray-50 disabled:text-gray-400"
+                  >
+                    {loadingMore ? '読み込み中...' : 'さらに読み込む'}
+                  </button>
+                )}
               </div>
             )}
           </div>
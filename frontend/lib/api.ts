@@ -0,0 +1,77 @@
+import axios from 'axios';
+import Cookies from 'js-cookie';
+import type { CreateAppointmentRequest, CursorPage, Notification } from './types';
+
+export const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:8001/api';
+
+// すべての API 呼び出しで共有するクライアント（ログイン時に保存したアクセストークンを付ける）
+const api = axios.create({
+  baseURL: API_BASE_URL,
+  headers: {
+    'Content-Type': 'application/json',
+  },
+});
+
+api.interceptors.request.use((config) => {
+  const token = Cookies.get('access_token');
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
+export const authAPI = {
+  login: (credentials: { username: string; password: string }) =>
+    api.post('/accounts/login/', credentials),
+  register: (data: {
+    username: string;
+    email: string;
+    password: string;
+    password_confirm: string;
+    phone_number?: string;
+  }) => api.post('/accounts/register/', data),
+  getProfile: () => api.get('/accounts/profile/'),
+};
+
+export const servicesAPI = {
+  getAll: () => api.get('/bookings/services/'),
+};
+
+export const stylistsAPI = {
+  getAll: () => api.get('/bookings/stylists/'),
+};
+
+export const appointmentsAPI = {
+  getAll: () => api.get('/bookings/appointments/list/'),
+  create: (data: CreateAppointmentRequest) => api.post('/bookings/appointments/', data),
+  cancel: (id: number) => api.post(`/bookings/appointments/${id}/cancel/`),
+  getAvailableTimeSlots: (date: string, stylistId: number, serviceId: number) =>
+    api.get('/bookings/appointments/available-slots/', {
+      params: { date, stylist_id: stylistId, service_id: serviceId },
+    }),
+};
+
+export const referralsAPI = {
+  getMyReferralLink: () => api.get('/referrals/link/'),
+  getQRCode: () => api.get('/referrals/qr-code/'),
+  getMyReferrals: () => api.get('/referrals/list/'),
+  getReferralStats: () => api.get('/referrals/stats/'),
+  validateReferralCode: (code: string) => api.get(`/referrals/validate/${encodeURIComponent(code)}/`),
+};
+
+export const notificationsAPI = {
+  // cursor を省略すると最新のページ。次のページはレスポンスの next_cursor を渡す
+  getAll: (cursor?: string | null) =>
+    api.get<CursorPage<Notification>>('/notifications/', {
+      params: cursor ? { cursor } : undefined,
+    }),
+  getUnreadCount: () => api.get<{ count: number }>('/notifications/unread-count/'),
+  markAsRead: (id: number) => api.patch(`/notifications/${id}/`),
+  markAllAsRead: () => api.patch('/notifications/mark-all-read/'),
+  delete: (id: number) => api.delete(`/notifications/${id}/delete/`),
+  // 通知ストリーム（EventSource）の接続用トークン。EventSource はヘッダーを付けられないため
+  streamToken: () => api.post<{ token: string; expires_in: number }>('/notifications/stream/token/'),
+  streamUrl: (token: string) => `${API_BASE_URL}/notifications/stream/?token=${encodeURIComponent(token)}`,
+};
+
+export default api;
@@ -0,0 +1,119 @@
+// API のレスポンス・リクエストの型（backend の各シリアライザーに対応）
+
+export interface Badge {
+  badge_type: string;
+  earned_date: string;
+  referral_count: number;
+}
+
+export interface User {
+  id: number;
+  username: string;
+  email: string;
+  user_type: 'customer' | 'stylist' | string;
+  phone_number?: string | null;
+  first_name: string;
+  last_name: string;
+  profile_image?: string | null;
+  created_at: string;
+  total_bookings: number;
+  referral_count: number;
+  badges: Badge[];
+  is_manager: boolean;
+  is_owner: boolean;
+  can_manage_staff: boolean;
+  stylist_profile: Record<string, any> | null;
+}
+
+export interface UserSummary {
+  id: number;
+  username: string;
+  first_name: string;
+  last_name: string;
+  display_name: string;
+  profile_image?: string | null;
+}
+
+export interface Service {
+  id: number;
+  name: string;
+  description: string;
+  duration_minutes: number;
+  price: string;
+  is_active: boolean;
+}
+
+export interface StylistService {
+  id: number;
+  service: Service;
+  duration_minutes: number;
+  price_override: string | null;
+  effective_price: string;
+  is_available: boolean;
+}
+
+export interface Stylist {
+  id: number;
+  user: UserSummary;
+  bio: string;
+  experience_years: number;
+  services?: Service[];
+  stylist_services?: StylistService[];
+  is_available: boolean;
+}
+
+export interface Appointment {
+  id: number;
+  customer: UserSummary;
+  stylist: Stylist;
+  service: Service;
+  appointment_date: string;
+  status: 'RESERVED' | 'PAID' | 'COMPLETED' | 'CANCELLED' | string;
+  requires_payment: boolean;
+  total_amount: string;
+  notes: string;
+  created_at: string;
+  updated_at: string;
+}
+
+export interface GuestInfo {
+  first_name: string;
+  last_name: string;
+  email: string;
+  phone_number: string;
+}
+
+export interface CreateAppointmentRequest {
+  service_id: number;
+  stylist_id: number;
+  appointment_date: string;
+  start_time: string;
+  notes?: string;
+  payment_method: 'online' | 'in_person';
+  referral_code?: string;
+  guest_info?: GuestInfo;
+}
+
+export interface TimeSlot {
+  start_time: string;
+  end_time: string;
+  display: string;
+}
+
+export interface Notification {
+  id: number;
+  type: 'appointment' | 'cancellation' | 'reminder' | 'system' | 'review';
+  title: string;
+  message: string;
+  read: boolean;
+  urgent: boolean;
+  data: Record<string, any>;
+  created_at: string;
+}
+
+// カーソルページネーションのレスポンス（next_cursor が null なら最後のページ）
+export interface CursorPage<T> {
+  next: string | null;
+  next_cursor: string | null;
+  results: T[];
+}